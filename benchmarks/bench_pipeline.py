@@ -0,0 +1,222 @@
+"""转换流程分阶段基准测试
+
+对合成语料(或指定目录中的MHT文件)逐阶段计时:
+    read              读取并解码文件 (read_mht_file)
+    extract           extract_html_and_images_from_mht
+    images            process_mht_resources (图片、样式表、字体和框架)
+    css               inject_enhanced_css
+    render            offscreen Qt 下从加载到生成PDF (需要 QtWebEngine)
+以及端到端的每秒文档数.结果写入JSON,可用 --compare 与之前的结果比较.
+
+    python benchmarks/bench_pipeline.py --out bench.json
+    python benchmarks/bench_pipeline.py --corpus D:/reports --no-render --compare bench.json
+"""
+import io
+import os
+import sys
+import json
+import glob
+import time
+import shutil
+import platform
+import tempfile
+import argparse
+import statistics
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mht_parser  # noqa: E402
+from mht_corpus import CORPUS_PROFILES, generate_corpus  # noqa: E402
+
+PARSE_STAGES = ('read', 'extract', 'images', 'css')
+
+
+def summarize(samples):
+    """计算一组耗时(秒)的统计值"""
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'min': ordered[0],
+        'median': statistics.median(ordered),
+        'mean': statistics.fmean(ordered),
+        'p95': ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+        'max': ordered[-1],
+    }
+
+
+def bench_parse_stages(path, repeat):
+    """对单个文件的解析阶段重复计时,返回 {阶段: [耗时]}"""
+    timings = {stage: [] for stage in PARSE_STAGES}
+    for _ in range(repeat):
+        temp_dir = tempfile.mkdtemp(prefix='mht2pdf_bench_')
+        try:
+            # 解析函数会打印进度信息,计时期间屏蔽输出
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                content = mht_parser.read_mht_file(path)
+                timings['read'].append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                html_content, images = mht_parser.extract_html_and_images_from_mht(content)
+                timings['extract'].append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                if html_content and images:
+                    html_content = mht_parser.process_mht_resources(html_content, images, temp_dir)
+                timings['images'].append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                if html_content:
+                    mht_parser.inject_enhanced_css(html_content)
+                timings['css'].append(time.perf_counter() - start)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    return timings
+
+
+def bench_render(paths, concurrency, adaptive=False, warm_up=False):
+    """在offscreen Qt下渲染,返回 (每个文档的耗时, 总耗时, 失败数, 启动指标)
+
+    adaptive 为 True 时由 ConcurrencyController 在 1..concurrency 之间调整并发数;
+    warm_up 为 True 时先预热渲染器,启动指标中的首个PDF耗时包含预热时间.
+    """
+    from mht_converter import MhtConverter, ConcurrencyController
+
+    with MhtConverter(concurrency=1, warm_up=warm_up) as converter:
+        per_document = []
+        for path in paths:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                next(converter.convert_many([path]))
+            per_document.append(time.perf_counter() - start)
+        startup = {
+            'warm_up': warm_up,
+            'warm_up_seconds': converter.warm_up_seconds,
+            'time_to_first_pdf_seconds': converter.time_to_first_pdf,
+        }
+
+    # 端到端吞吐单独测量,允许并发渲染
+    failures = 0
+    controller = ConcurrencyController(1, concurrency) if adaptive else None
+    with MhtConverter(concurrency=concurrency, adaptive=controller) as converter:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for result in converter.convert_many(paths):
+                failures += not result.ok
+        wall_time = time.perf_counter() - start
+
+    return per_document, wall_time, failures, startup
+
+
+def load_corpus(args, work_dir):
+    """返回 [(分组名, 路径)]"""
+    if args.corpus:
+        files = sorted(glob.glob(os.path.join(args.corpus, '**', '*.mht*'), recursive=True))
+        return [('corpus', path) for path in files]
+    profiles = args.profile or sorted(CORPUS_PROFILES)
+    return generate_corpus(work_dir, args.count, profiles)
+
+
+def compare(current, baseline_path):
+    """打印与基线结果的中位数对比"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    print(f"\nComparison with {baseline_path} (median, current / baseline):")
+    for group, stages in current['groups'].items():
+        for stage, stats in stages.items():
+            old = baseline.get('groups', {}).get(group, {}).get(stage)
+            if not old or not old.get('median'):
+                continue
+            ratio = stats['median'] / old['median']
+            print(f"  {group:<16} {stage:<8} {stats['median'] * 1000:9.2f} ms  x{ratio:5.2f}")
+    old_rate = baseline.get('end_to_end', {}).get('documents_per_second')
+    new_rate = current.get('end_to_end', {}).get('documents_per_second')
+    if old_rate and new_rate:
+        print(f"  end-to-end documents/s: {new_rate:.2f} (baseline {old_rate:.2f})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MHT转PDF分阶段基准测试")
+    parser.add_argument('--corpus', help="使用已有的MHT目录,而不是生成合成语料")
+    parser.add_argument('--profile', action='append', choices=sorted(CORPUS_PROFILES),
+                        help="只测试指定的语料规格,可重复")
+    parser.add_argument('--count', type=int, default=3, help="每种规格生成的文件数")
+    parser.add_argument('--repeat', type=int, default=3, help="解析阶段每个文件的重复次数")
+    parser.add_argument('--no-render', action='store_true', help="跳过Qt渲染阶段")
+    parser.add_argument('--concurrency', type=int, default=1, help="端到端测试的并发渲染数")
+    parser.add_argument('--adaptive', action='store_true', help="端到端测试时自动调整并发数,--concurrency 为上限")
+    parser.add_argument('--warm-up', action='store_true', help="渲染前预热渲染器")
+    parser.add_argument('--out', default='bench_results.json', help="结果JSON路径")
+    parser.add_argument('--compare', help="与之前的结果JSON比较")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix='mht2pdf_corpus_')
+    try:
+        files = load_corpus(args, work_dir)
+        if not files:
+            print("No MHT files found")
+            return 1
+
+        groups = {}
+        for group, path in files:
+            timings = bench_parse_stages(path, args.repeat)
+            group_timings = groups.setdefault(group, {stage: [] for stage in PARSE_STAGES})
+            for stage, samples in timings.items():
+                group_timings[stage].extend(samples)
+
+        results = {
+            'meta': {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'files': len(files),
+                'bytes': sum(os.path.getsize(path) for _, path in files),
+                'repeat': args.repeat,
+            },
+            'groups': {group: {stage: summarize(samples) for stage, samples in stages.items()}
+                       for group, stages in groups.items()},
+        }
+
+        if not args.no_render:
+            paths = [path for _, path in files]
+            per_document, wall_time, failures, startup = bench_render(paths, args.concurrency, args.adaptive,
+                                                                      args.warm_up)
+            by_group = {}
+            for (group, _), elapsed in zip(files, per_document):
+                by_group.setdefault(group, []).append(elapsed)
+            for group, samples in by_group.items():
+                results['groups'][group]['render'] = summarize(samples)
+            results['end_to_end'] = {
+                'documents': len(paths),
+                'failures': failures,
+                'concurrency': args.concurrency,
+                'adaptive': args.adaptive,
+                'seconds': wall_time,
+                'documents_per_second': len(paths) / wall_time if wall_time else None,
+            }
+            results['startup'] = startup
+
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+        for group, stages in results['groups'].items():
+            line = '  '.join(f"{stage}={stats['median'] * 1000:.2f}ms" for stage, stats in stages.items())
+            print(f"{group:<16} {line}")
+        if 'end_to_end' in results:
+            print(f"end-to-end: {results['end_to_end']['documents_per_second']:.2f} documents/s")
+            first = results['startup']['time_to_first_pdf_seconds']
+            if first is not None:
+                print(f"time to first PDF: {first:.2f}s (warm-up: {results['startup']['warm_up']})")
+        print(f"Results written to {args.out}")
+
+        if args.compare:
+            compare(results, args.compare)
+        return 0
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,286 @@
+"""端到端性能回归测试
+
+在offscreen Qt下把固定的黄金语料逐个转换为PDF,记录每个文档的:
+    seconds     转换耗时(多次运行的中位数)
+    peak_rss    转换期间本进程及渲染子进程常驻内存之和的峰值
+    pages       PDF页数
+    pdf_bytes   PDF大小
+并与保存的基线比较.任一指标超出容差时打印差异报告并以退出码1结束,
+修改注入的CSS/JS(ENHANCED_CSS、RENDERING_IMPROVEMENTS_JS、FINAL_PRINT_JS)后运行即可发现回归.
+
+    python benchmarks/bench_regression.py --update          # 记录基线
+    python benchmarks/bench_regression.py                   # 与基线比较
+    python benchmarks/bench_regression.py --tolerance seconds=0.5 --report diff.json
+
+默认语料由 mht_corpus 的全部预置规格以固定种子生成,内容每次相同;也可用 --corpus 指定目录.
+基线与机器有关,应在运行回归测试的同一台机器上记录.
+"""
+import io
+import os
+import sys
+import json
+import glob
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import threading
+import statistics
+import contextlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mht_corpus import CORPUS_PROFILES, generate_corpus  # noqa: E402
+from mht_metrics import process_rss  # noqa: E402
+from pdf_postprocess import count_pdf_pages  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regression_baseline.json')
+
+METRICS = ('seconds', 'peak_rss', 'pages', 'pdf_bytes')
+
+# 各指标允许的相对增长;页数任何方向的变化都视为回归
+DEFAULT_TOLERANCES = {'seconds': 0.25, 'peak_rss': 0.25, 'pages': 0.0, 'pdf_bytes': 0.10}
+
+# 低于该绝对差值的变化不视为回归,避免小文档的计时噪声
+ABSOLUTE_SLACK = {'seconds': 0.25, 'peak_rss': 32 * 1024 * 1024, 'pages': 0, 'pdf_bytes': 4 * 1024}
+
+# 内存采样间隔(秒)
+RSS_SAMPLE_INTERVAL = 0.05
+
+
+def child_pids(pid):
+    """返回 pid 的所有后代进程(QtWebEngineProcess 等),只支持Linux"""
+    parents = {}
+    for stat_path in glob.glob('/proc/[0-9]*/stat'):
+        try:
+            with open(stat_path, 'r', encoding='ascii', errors='ignore') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            parents.setdefault(int(fields[1]), []).append(int(stat_path.split('/')[2]))
+        except (OSError, ValueError, IndexError):
+            continue
+    found, pending = [], [pid]
+    while pending:
+        children = parents.get(pending.pop(), [])
+        found.extend(children)
+        pending.extend(children)
+    return found
+
+
+class PeakRssSampler:
+    """在后台线程中定期采样本进程及其子进程的常驻内存之和,记录峰值"""
+
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        pid = os.getpid()
+        pids = [pid] + (child_pids(pid) if sys.platform.startswith('linux') else [])
+        total = sum(process_rss(each) or 0 for each in pids)
+        self.peak = max(self.peak, total)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def __enter__(self):
+        self.peak = 0
+        self.sample()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+
+def load_corpus(args, work_dir):
+    """返回 [(文档名, 路径)],文档名在不同机器上保持一致"""
+    if args.corpus:
+        files = sorted(glob.glob(os.path.join(args.corpus, '**', '*.mht*'), recursive=True))
+        return [(os.path.relpath(path, args.corpus).replace(os.sep, '/'), path) for path in files]
+    files = generate_corpus(work_dir, 1, sorted(CORPUS_PROFILES))
+    return [(os.path.basename(path), path) for _, path in files]
+
+
+def run_corpus(files, repeat):
+    """逐个转换(并发1,先预热),返回 ({文档名: 指标}, 环境信息)"""
+    from mht_converter import MhtConverter
+
+    runs = {name: [] for name, _ in files}
+    with contextlib.redirect_stdout(io.StringIO()), MhtConverter(concurrency=1, warm_up=True) as converter:
+        for _ in range(repeat):
+            for name, path in files:
+                with PeakRssSampler() as sampler:
+                    start = time.perf_counter()
+                    result = next(converter.convert_many([path]))
+                    elapsed = time.perf_counter() - start
+                runs[name].append((result, elapsed, sampler.peak))
+
+    documents = {}
+    for name, samples in runs.items():
+        failed = [result for result, _, _ in samples if not result.ok]
+        if failed:
+            documents[name] = {'error': failed[0].error}
+            continue
+        last = samples[-1][0]
+        stages = {}
+        for result, _, _ in samples:
+            for stage, seconds in result.metrics.seconds.items():
+                stages.setdefault(stage, []).append(seconds)
+        documents[name] = {
+            'seconds': statistics.median(elapsed for _, elapsed, _ in samples),
+            'peak_rss': max(peak for _, _, peak in samples),
+            'pages': count_pdf_pages(last.pdf),
+            'pdf_bytes': len(last.pdf),
+            'stages': {stage: statistics.median(values) for stage, values in stages.items()},
+        }
+    return documents
+
+
+def environment():
+    from PyQt5.QtCore import QT_VERSION_STR
+
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.node(),
+        'qt': QT_VERSION_STR,
+    }
+
+
+def compare(current, baseline, tolerances):
+    """返回回归列表 [(文档名, 指标, 基线值, 当前值, 说明)]"""
+    regressions = []
+    old_documents = baseline.get('documents', {})
+    for name, old in old_documents.items():
+        new = current.get(name)
+        if new is None:
+            regressions.append((name, 'document', None, None, "文档不在本次运行中"))
+            continue
+        if 'error' in new:
+            regressions.append((name, 'document', None, None, f"转换失败: {new['error']}"))
+            continue
+        if 'error' in old:
+            continue
+        for metric in METRICS:
+            before, after = old.get(metric), new.get(metric)
+            if not before or after is None:
+                continue
+            delta = after - before if metric != 'pages' else abs(after - before)
+            allowed = max(before * tolerances[metric], ABSOLUTE_SLACK[metric])
+            if delta > allowed:
+                regressions.append((name, metric, before, after, f"{(after - before) / before:+.1%}"))
+    return regressions
+
+
+def format_value(metric, value):
+    if value is None:
+        return '-'
+    if metric == 'seconds':
+        return f"{value:.2f}s"
+    if metric in ('peak_rss', 'pdf_bytes'):
+        return f"{value / 1024 / 1024:.1f}MB" if value >= 1024 * 1024 else f"{value / 1024:.0f}KB"
+    return str(value)
+
+
+def print_diff(regressions, current, baseline):
+    """打印回归和对应文档各阶段耗时的变化,便于定位是哪一步变慢"""
+    print(f"\n{len(regressions)} regression(s):")
+    for name, metric, before, after, note in regressions:
+        print(f"  {name:<32} {metric:<10} {format_value(metric, before):>10} -> "
+              f"{format_value(metric, after):>10}  {note}")
+    for name in dict.fromkeys(name for name, *_ in regressions):
+        old = baseline.get('documents', {}).get(name, {}).get('stages', {})
+        new = current.get(name, {}).get('stages', {})
+        changed = [(stage, old.get(stage), new.get(stage)) for stage in dict.fromkeys(list(old) + list(new))]
+        line = '  '.join(f"{stage}={format_value('seconds', before)}->{format_value('seconds', after)}"
+                         for stage, before, after in changed)
+        if line:
+            print(f"  {name} stages: {line}")
+
+
+def parse_tolerances(values):
+    tolerances = dict(DEFAULT_TOLERANCES)
+    for value in values or ():
+        metric, sep, ratio = value.partition('=')
+        if not sep or metric not in tolerances:
+            raise SystemExit(f"--tolerance 应为 指标=比例,指标为 {', '.join(METRICS)}: {value!r}")
+        tolerances[metric] = float(ratio)
+    return tolerances
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MHT转PDF端到端性能回归测试")
+    parser.add_argument('--corpus', help="使用已有的MHT目录,而不是生成的黄金语料")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="基线JSON路径")
+    parser.add_argument('--update', action='store_true', help="把本次结果写为新的基线")
+    parser.add_argument('--repeat', type=int, default=3, help="每个文档的转换次数,耗时取中位数")
+    parser.add_argument('--tolerance', action='append', metavar='METRIC=RATIO',
+                        help="允许的相对增长,如 seconds=0.5,可重复;默认 " +
+                        ', '.join(f"{metric}={ratio}" for metric, ratio in DEFAULT_TOLERANCES.items()))
+    parser.add_argument('--report', help="把本次结果和回归列表写入JSON")
+    args = parser.parse_args(argv)
+    tolerances = parse_tolerances(args.tolerance)
+
+    if not args.update and not os.path.exists(args.baseline):
+        print(f"Baseline {args.baseline} not found, run with --update first")
+        return 2
+
+    work_dir = tempfile.mkdtemp(prefix='mht2pdf_golden_')
+    try:
+        files = load_corpus(args, work_dir)
+        if not files:
+            print("No MHT files found")
+            return 2
+        current = run_corpus(files, max(1, args.repeat))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = {'meta': dict(environment(), repeat=args.repeat, tolerances=tolerances), 'documents': current}
+    for name, document in current.items():
+        if 'error' in document:
+            print(f"  {name:<32} FAILED: {document['error']}")
+        else:
+            print(f"  {name:<32} {format_value('seconds', document['seconds']):>8} "
+                  f"{format_value('peak_rss', document['peak_rss']):>9} {document['pages']:>4} pages "
+                  f"{format_value('pdf_bytes', document['pdf_bytes']):>8}")
+
+    if args.update:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('meta', {}).get('machine') != results['meta']['machine']:
+        print(f"Warning: baseline was recorded on {baseline.get('meta', {}).get('machine')!r}")
+    regressions = compare(current, baseline, tolerances)
+    new_documents = sorted(set(current) - set(baseline.get('documents', {})))
+    if new_documents:
+        print(f"Not in baseline: {', '.join(new_documents)}")
+
+    if args.report:
+        results['regressions'] = [dict(zip(('document', 'metric', 'baseline', 'current', 'change'), row))
+                                  for row in regressions]
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+    if regressions:
+        print_diff(regressions, current, baseline)
+        return 1
+    print(f"\nNo regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""各入口的启动时间基准测试
+
+每个入口在新的Python进程中运行,记录墙钟时间和进程结束时已导入的Qt模块:
+    import-parser     import mht_parser
+    import-converter  import mht_converter (不应加载Qt)
+    cli-help          python htm2pdf.py --help
+    cli-parts         python htm2pdf.py parts <合成MHT>
+    cli-inspect       python htm2pdf.py inspect --workers 1 <合成MHT>
+    import-render     import mht_render (加载QtWebEngine)
+    import-gui        import mht_gui (加载全部GUI模块)
+需要Qt的入口在无法导入QtWebEngine的环境中记为失败,不影响其他入口.
+
+    python benchmarks/bench_startup.py --repeat 5 --out startup.json
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mht_corpus import generate_mht  # noqa: E402
+
+# 入口运行完成后打印已导入的Qt模块
+QT_PROBE = "import sys; print('QT_MODULES=' + ','.join(sorted(m for m in sys.modules if m.startswith('PyQt5'))))"
+
+
+def entry_points(sample_path):
+    """返回 [(名称, 命令行, 是否允许加载Qt)]"""
+    python = sys.executable
+    script = os.path.join(ROOT, 'htm2pdf.py')
+
+    def run_main(*argv):
+        # 在同一进程中运行入口,结束后检查导入的模块
+        return (f"import sys; sys.argv = {['htm2pdf.py', *argv]!r}; import htm2pdf\n"
+                f"try:\n    htm2pdf.main()\nexcept SystemExit:\n    pass\n{QT_PROBE}")
+
+    return [
+        ('import-parser', [python, '-c', f"import mht_parser; {QT_PROBE}"], False),
+        ('import-converter', [python, '-c', f"import mht_converter; {QT_PROBE}"], False),
+        ('cli-help', [python, '-c', run_main('--help')], False),
+        ('cli-parts', [python, '-c', run_main('parts', sample_path)], False),
+        ('cli-parts-script', [python, script, 'parts', sample_path], False),
+        ('cli-inspect', [python, '-c', run_main('inspect', '--workers', '1', sample_path)], False),
+        ('import-render', [python, '-c', f"import mht_render; {QT_PROBE}"], True),
+        ('import-gui', [python, '-c', f"import mht_gui; {QT_PROBE}"], True),
+    ]
+
+
+def run_once(command):
+    """运行一次入口,返回 (秒, 返回码, 导入的Qt模块列表或None)"""
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    start = time.perf_counter()
+    completed = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    qt_modules = None
+    for line in completed.stdout.splitlines():
+        if line.startswith('QT_MODULES='):
+            qt_modules = [name for name in line[len('QT_MODULES='):].split(',') if name]
+    return elapsed, completed.returncode, qt_modules
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MHT2PDF各入口启动时间基准测试")
+    parser.add_argument('--repeat', type=int, default=5, help="每个入口的运行次数")
+    parser.add_argument('--out', default='startup_results.json', help="结果JSON路径")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix='mht2pdf_startup_')
+    sample_path = os.path.join(work_dir, 'sample.mht')
+    with open(sample_path, 'wb') as f:
+        f.write(generate_mht())
+
+    # 预热磁盘缓存和 __pycache__
+    subprocess.run([sys.executable, '-c', 'import mht_converter, mht_batch'], cwd=ROOT, capture_output=True)
+
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+        },
+        'entries': {},
+    }
+    status = 0
+    try:
+        baseline = [run_once([sys.executable, '-c', 'pass'])[0] for _ in range(args.repeat)]
+        results['meta']['interpreter_seconds'] = statistics.median(baseline)
+
+        for name, command, qt_allowed in entry_points(sample_path):
+            samples = []
+            returncode, qt_modules = 0, None
+            for _ in range(args.repeat):
+                elapsed, returncode, qt_modules = run_once(command)
+                if returncode:
+                    break
+                samples.append(elapsed)
+            entry = {
+                'ok': returncode == 0,
+                'median': statistics.median(samples) if samples else None,
+                'min': min(samples) if samples else None,
+                'qt_modules': qt_modules,
+            }
+            results['entries'][name] = entry
+
+            if not entry['ok']:
+                print(f"{name:<18} failed (exit code {returncode})")
+                continue
+            loaded = len(qt_modules or [])
+            print(f"{name:<18} {entry['median'] * 1000:8.1f} ms  Qt modules: {loaded}")
+            if loaded and not qt_allowed:
+                print(f"  {name} imported Qt: {', '.join(qt_modules)}")
+                status = 1
+
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"Results written to {args.out}")
+        return status
+    finally:
+        os.remove(sample_path)
+        os.rmdir(work_dir)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
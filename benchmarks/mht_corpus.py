@@ -0,0 +1,187 @@
+"""合成MHT测试语料生成器
+
+可控制文档大小、图片数量与大小、表格单元格数量、HTML部分的传输编码
+(quoted-printable/base64/8bit)以及字符集(utf-8/gbk).
+
+    python benchmarks/mht_corpus.py corpus_dir --count 10 --image-count 4 --encoding base64 --charset gbk
+"""
+import os
+import sys
+import zlib
+import base64
+import quopri
+import random
+import struct
+import argparse
+
+BOUNDARY = "----=_NextPart_000_0000_01DA0000.00000000"
+ENCODINGS = ('quoted-printable', 'base64', '8bit')
+CHARSETS = ('utf-8', 'gbk')
+
+# 预置的语料规格,覆盖常见的报告形态
+CORPUS_PROFILES = {
+    'small-qp-utf8': dict(size_kb=20, image_count=2, image_size=8 * 1024, table_cells=60,
+                          encoding='quoted-printable', charset='utf-8'),
+    'qp-gbk': dict(size_kb=50, image_count=4, image_size=16 * 1024, table_cells=200,
+                   encoding='quoted-printable', charset='gbk'),
+    'base64-utf8': dict(size_kb=50, image_count=4, image_size=16 * 1024, table_cells=200,
+                        encoding='base64', charset='utf-8'),
+    '8bit-utf8': dict(size_kb=50, image_count=4, image_size=16 * 1024, table_cells=200,
+                      encoding='8bit', charset='utf-8'),
+    'image-heavy': dict(size_kb=30, image_count=40, image_size=64 * 1024, table_cells=80,
+                        encoding='quoted-printable', charset='utf-8'),
+    'table-heavy': dict(size_kb=400, image_count=2, image_size=8 * 1024, table_cells=5000,
+                        encoding='quoted-printable', charset='utf-8'),
+}
+
+SAMPLE_TEXT = "检验项目 结果 参考范围 单位 白细胞计数 红细胞 血红蛋白 Hemoglobin Platelet 正常 异常 "
+
+
+def make_png(byte_size, rng):
+    """生成一张约 byte_size 字节的有效PNG(随机像素,几乎不可压缩)"""
+    pixels = max(1, byte_size // 3)
+    width = max(1, int(pixels ** 0.5))
+    height = max(1, pixels // width)
+    raw = b''.join(b'\x00' + rng.randbytes(width * 3) for _ in range(height))
+
+    def chunk(tag, data):
+        return (struct.pack('>I', len(data)) + tag + data +
+                struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) +
+            chunk(b'IDAT', zlib.compress(raw, 1)) + chunk(b'IEND', b''))
+
+
+def make_html(size_kb, image_locations, table_cells, charset, rng):
+    """生成包含表格、图片引用和中文文本的HTML"""
+    columns = 6
+    parts = [
+        '<html><head>',
+        f'<meta http-equiv="Content-Type" content="text/html; charset={charset}">',
+        '<title>检验报告</title></head><body>',
+        '<h1>体检报告 Medical Report</h1>',
+        '<table>',
+    ]
+    for index in range(table_cells):
+        if index % columns == 0:
+            parts.append('<tr>' if index == 0 else '</tr><tr>')
+        start = rng.randrange(len(SAMPLE_TEXT) - 12)
+        parts.append(f'<td>{SAMPLE_TEXT[start:start + 12]}{index}</td>')
+    if table_cells:
+        parts.append('</tr>')
+    parts.append('</table>')
+
+    for location in image_locations:
+        parts.append(f'<p><img src="{location}"></p>')
+
+    # 用段落文本填充到目标大小
+    html = ''.join(parts)
+    target = size_kb * 1024
+    filler = []
+    size = len(html.encode(charset))
+    while size < target:
+        paragraph = f'<p>{SAMPLE_TEXT * 4}</p>\n'
+        filler.append(paragraph)
+        size += len(paragraph.encode(charset))
+    return html + ''.join(filler) + '</body></html>'
+
+
+def encode_body(data, encoding):
+    """按传输编码编码HTML字节,返回文本行"""
+    if encoding == 'quoted-printable':
+        return quopri.encodestring(data).decode('ascii')
+    if encoding == 'base64':
+        return base64.encodebytes(data).decode('ascii')
+    return data.decode('latin1')
+
+
+def generate_mht(size_kb=50, image_count=4, image_size=16 * 1024, table_cells=200,
+                 encoding='quoted-printable', charset='utf-8', seed=0):
+    """生成一个MHT文档,返回字节内容"""
+    if encoding not in ENCODINGS:
+        raise ValueError(f"不支持的传输编码: {encoding}")
+    if charset not in CHARSETS:
+        raise ValueError(f"不支持的字符集: {charset}")
+
+    rng = random.Random(seed)
+    base = "file:///C:/Reports/report_files"
+    image_locations = [f"{base}/image{index:03d}.png" for index in range(image_count)]
+    html = make_html(size_kb, image_locations, table_cells, charset, rng)
+
+    out = [
+        'From: <Saved by Windows Internet Explorer 11>',
+        'Subject: Report',
+        'MIME-Version: 1.0',
+        f'Content-Type: multipart/related; type="text/html"; boundary="{BOUNDARY}"',
+        '',
+        'This is a multi-part message in MIME format.',
+        '',
+        f'--{BOUNDARY}',
+        f'Content-Type: text/html; charset="{charset}"',
+        f'Content-Transfer-Encoding: {encoding}',
+        'Content-Location: file:///C:/Reports/report.htm',
+        '',
+        encode_body(html.encode(charset), encoding),
+    ]
+    for location in image_locations:
+        out += [
+            f'--{BOUNDARY}',
+            'Content-Type: image/png',
+            'Content-Transfer-Encoding: base64',
+            f'Content-Location: {location}',
+            '',
+            base64.encodebytes(make_png(image_size, rng)).decode('ascii'),
+        ]
+    out.append(f'--{BOUNDARY}--')
+    out.append('')
+    return '\r\n'.join(out).encode('latin1')
+
+
+def generate_corpus(out_dir, count=1, profiles=None, **overrides):
+    """按预置规格(或自定义参数)批量生成语料,返回 [(profile名, 文件路径)]"""
+    os.makedirs(out_dir, exist_ok=True)
+    if profiles is None:
+        specs = {'custom': overrides}
+    else:
+        specs = {name: dict(CORPUS_PROFILES[name], **overrides) for name in profiles}
+
+    files = []
+    for name, spec in specs.items():
+        for index in range(count):
+            path = os.path.join(out_dir, f"{name}_{index:04d}.mht")
+            with open(path, 'wb') as f:
+                f.write(generate_mht(seed=index, **spec))
+            files.append((name, path))
+    return files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="生成合成MHT测试语料")
+    parser.add_argument('out_dir')
+    parser.add_argument('--count', type=int, default=1, help="每种规格生成的文件数")
+    parser.add_argument('--profile', action='append', choices=sorted(CORPUS_PROFILES),
+                        help="使用预置规格,可重复;与 --all-profiles 互斥")
+    parser.add_argument('--all-profiles', action='store_true', help="生成所有预置规格")
+    parser.add_argument('--size-kb', type=int)
+    parser.add_argument('--image-count', type=int)
+    parser.add_argument('--image-size', type=int, help="单张图片字节数")
+    parser.add_argument('--table-cells', type=int)
+    parser.add_argument('--encoding', choices=ENCODINGS)
+    parser.add_argument('--charset', choices=CHARSETS)
+    args = parser.parse_args(argv)
+
+    overrides = {key: value for key, value in (
+        ('size_kb', args.size_kb), ('image_count', args.image_count),
+        ('image_size', args.image_size), ('table_cells', args.table_cells),
+        ('encoding', args.encoding), ('charset', args.charset)) if value is not None}
+    profiles = sorted(CORPUS_PROFILES) if args.all_profiles else args.profile
+
+    files = generate_corpus(args.out_dir, args.count, profiles, **overrides)
+    total = sum(os.path.getsize(path) for _, path in files)
+    print(f"Generated {len(files)} files ({total:,} bytes) in {args.out_dir}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
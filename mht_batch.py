@@ -0,0 +1,273 @@
+"""批量转换的任务规划
+
+find_duplicates 找出批量列表中内容完全相同的文件:先按大小分组,
+只有大小相同的文件才比较开头部分的摘要,再对仍然相同的文件计算完整摘要.
+每组重复文件只需渲染一次,结果用 link_or_copy 复制到其余文件的输出路径.
+
+plan_batch 用文件开头的快速扫描估算每个文件的处理量,把大文件排在前面;
+ThroughputEstimator 记录最近的实际耗时,预测剩余时间.
+
+select_shard 按相对于基础目录的路径的稳定哈希把文件分配到 N 个分片,
+多台机器对同一文件列表各自处理一个分片,无需任何协调服务.
+"""
+import os
+import json
+import shutil
+import hashlib
+from collections import deque
+
+from mht_output import part_path_for, fsync_file, discard_part
+
+# 快速比较时读取的开头字节数
+HEAD_BYTES = 64 * 1024
+
+# 计算完整摘要时每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# 估算处理量时最多读取的开头字节数
+SCAN_BYTES = 4 * 1024 * 1024
+
+# 每个part的固定处理量(字节),覆盖头部解析和临时文件创建
+PART_COST = 16 * 1024
+
+# 没有历史数据时的估算参数
+DEFAULT_DOCUMENT_SECONDS = 4.0
+DEFAULT_BYTES_PER_SECOND = 2 * 1024 * 1024
+
+# 吞吐历史的默认保存位置
+DEFAULT_HISTORY_PATH = os.path.join(os.path.expanduser('~'), '.mht2pdf', 'throughput.json')
+
+
+def file_digest(path, limit=None):
+    """计算文件(或其前 limit 字节)的 SHA-256"""
+    digest = hashlib.sha256()
+    remaining = limit
+    with open(path, 'rb') as f:
+        while remaining is None or remaining > 0:
+            size = HASH_CHUNK_SIZE if remaining is None else min(HASH_CHUNK_SIZE, remaining)
+            chunk = f.read(size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+def group_by(paths, key):
+    """按 key(path) 分组,保持原顺序;key 抛出 OSError 的文件单独成组"""
+    groups = {}
+    for path in paths:
+        try:
+            value = key(path)
+        except OSError:
+            value = ('error', path)
+        groups.setdefault(value, []).append(path)
+    return list(groups.values())
+
+
+def find_duplicates(paths):
+    """返回 (唯一文件列表, {唯一文件: [内容相同的其他文件]})
+
+    唯一文件保持在列表中首次出现的位置;同一路径出现多次时只保留一次.
+    """
+    paths = list(dict.fromkeys(paths))
+    duplicates = {}
+    for same_size in group_by(paths, os.path.getsize):
+        if len(same_size) < 2:
+            continue
+        for same_head in group_by(same_size, lambda path: file_digest(path, HEAD_BYTES)):
+            if len(same_head) < 2:
+                continue
+            if os.path.getsize(same_head[0]) <= HEAD_BYTES:
+                groups = [same_head]  # 开头部分即整个文件
+            else:
+                groups = group_by(same_head, file_digest)
+            for group in groups:
+                if len(group) > 1:
+                    duplicates[group[0]] = group[1:]
+
+    skipped = {path for group in duplicates.values() for path in group}
+    unique = [path for path in paths if path not in skipped]
+    return unique, duplicates
+
+
+def link_or_copy(source, destination):
+    """把已生成的PDF硬链接到目标路径,跨卷等无法链接时复制,返回 'link' 或 'copy'
+
+    先链接(或复制)到临时文件再原子地替换目标,目标路径上不会出现不完整的文件.
+    """
+    if os.path.abspath(source) == os.path.abspath(destination):
+        return 'same'
+    os.makedirs(os.path.dirname(destination) or '.', exist_ok=True)
+    part_path = part_path_for(destination)
+    try:
+        try:
+            os.link(source, part_path)
+            method = 'link'
+        except OSError:
+            shutil.copy2(source, part_path)
+            fsync_file(part_path)
+            method = 'copy'
+        os.replace(part_path, destination)
+    except OSError:
+        discard_part(part_path)
+        raise
+    return method
+
+
+def scan_mht_cost(path):
+    """快速扫描MHT开头部分,返回 BatchJob(文件大小、part数、图片字节数)
+
+    只读取前 SCAN_BYTES 字节,文件更大时按比例外推.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        head = f.read(SCAN_BYTES).lower()
+
+    # 每个part的头部都有Content-Type,两个头部之间的距离近似为part的编码大小
+    positions = []
+    pos = head.find(b'content-type:')
+    while pos != -1:
+        positions.append(pos)
+        pos = head.find(b'content-type:', pos + 13)
+    image_bytes = 0
+    for index, start in enumerate(positions):
+        if head.startswith(b'image/', start + 13) or head.startswith(b' image/', start + 13):
+            end = positions[index + 1] if index + 1 < len(positions) else len(head)
+            image_bytes += (end - start) * 3 // 4  # 图片多为base64编码
+    parts = max(0, len(positions) - 1)  # 第一个为顶层multipart头部
+
+    if head and len(head) < size:
+        scale = size / len(head)
+        parts = int(parts * scale)
+        image_bytes = int(image_bytes * scale)
+    return BatchJob(path, size, parts, image_bytes)
+
+
+class BatchJob:
+    """批量中的一个文件及其估算的处理量"""
+
+    def __init__(self, path, size, parts=0, image_bytes=0):
+        self.path = path
+        self.size = size
+        self.parts = parts
+        self.image_bytes = image_bytes
+
+    @property
+    def cost(self):
+        """估算的处理量(字节),图片需要解码、写盘和渲染,额外计入一次"""
+        return self.size + self.image_bytes + self.parts * PART_COST
+
+
+def plan_batch(paths):
+    """扫描每个文件并按估算处理量从大到小排序,返回 [BatchJob]
+
+    大文件先处理,避免批量末尾只剩一个大文件在转换;并发转换时也更均衡.
+    """
+    jobs = []
+    for path in paths:
+        try:
+            jobs.append(scan_mht_cost(path))
+        except OSError:
+            jobs.append(BatchJob(path, 0))
+    jobs.sort(key=lambda job: job.cost, reverse=True)
+    return jobs
+
+
+class ThroughputEstimator:
+    """根据最近转换的文档拟合 耗时 = 固定开销 + 处理量 / 吞吐,用于预测剩余时间
+
+    样本保存在 history_path 中,下次批量开始时即可给出估算.
+    """
+
+    def __init__(self, history_path=None, max_samples=200):
+        self.history_path = history_path
+        self.samples = deque(maxlen=max_samples)  # [(处理量字节, 秒)]
+        self.load()
+
+    def load(self):
+        if not self.history_path:
+            return
+        try:
+            with open(self.history_path, 'r', encoding='utf-8') as f:
+                for cost, seconds in json.load(f):
+                    self.samples.append((float(cost), float(seconds)))
+        except (OSError, ValueError, TypeError):
+            pass
+
+    def save(self):
+        if not self.history_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.history_path), exist_ok=True)
+            with open(self.history_path, 'w', encoding='utf-8') as f:
+                json.dump(list(self.samples), f)
+        except OSError as e:
+            print(f"Failed to save throughput history: {e}")
+
+    def add(self, cost, seconds):
+        if seconds > 0:
+            self.samples.append((cost, seconds))
+
+    def model(self):
+        """返回 (固定开销秒, 每字节秒),样本不足时使用默认值"""
+        if len(self.samples) < 2:
+            return DEFAULT_DOCUMENT_SECONDS, 1.0 / DEFAULT_BYTES_PER_SECOND
+        count = len(self.samples)
+        mean_cost = sum(cost for cost, _ in self.samples) / count
+        mean_seconds = sum(seconds for _, seconds in self.samples) / count
+        variance = sum((cost - mean_cost) ** 2 for cost, _ in self.samples)
+        if variance <= 0:
+            return mean_seconds, 0.0
+        slope = sum((cost - mean_cost) * (seconds - mean_seconds) for cost, seconds in self.samples) / variance
+        slope = max(0.0, slope)
+        return max(0.0, mean_seconds - slope * mean_cost), slope
+
+    def predict(self, cost):
+        base, per_byte = self.model()
+        return base + per_byte * cost
+
+    def eta(self, costs):
+        """预测处理完 costs 中所有文档需要的秒数"""
+        base, per_byte = self.model()
+        costs = list(costs)
+        return base * len(costs) + per_byte * sum(costs)
+
+
+def format_duration(seconds):
+    """把秒数格式化为 '1小时02分' / '3分20秒' / '45秒'"""
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}小时{seconds % 3600 // 60:02d}分"
+    if seconds >= 60:
+        return f"{seconds // 60}分{seconds % 60:02d}秒"
+    return f"{seconds}秒"
+
+
+def parse_shard(text):
+    """解析 'i/N' 形式的分片参数(1 <= i <= N),返回 (i, N)"""
+    index, sep, count = text.partition('/')
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"分片参数应为 i/N 形式: {text!r}") from None
+    if not sep or count < 1 or not 1 <= index <= count:
+        raise ValueError(f"分片参数应满足 1 <= i <= N: {text!r}")
+    return index, count
+
+
+def shard_key(path, base):
+    """分片使用的键: 相对于 base 的路径,统一使用 / 分隔,与机器上的挂载位置无关"""
+    return os.path.relpath(os.path.abspath(path), os.path.abspath(base)).replace(os.sep, '/')
+
+
+def shard_of(path, base, count):
+    """返回文件所属的分片(1..count)"""
+    digest = hashlib.sha1(shard_key(path, base).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count + 1
+
+
+def select_shard(paths, base, index, count):
+    """保持原顺序,返回属于第 index 个分片的文件"""
+    return [path for path in paths if shard_of(path, base, count) == index]
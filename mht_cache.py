@@ -0,0 +1,87 @@
+"""预处理结果的LRU缓存(不依赖Qt)
+
+单文件模式重新导入同一文件时直接使用上次的预处理结果.键为 (绝对路径, 修改时间, 大小),
+文件被修改后键随之变化,不会用到旧结果.每个条目占用一个临时目录,淘汰或清空时删除该目录.
+缓存只在创建它的线程(GUI线程)中使用,不加锁.
+"""
+import os
+import shutil
+from collections import OrderedDict
+
+# 默认最多缓存的文档数
+DEFAULT_CACHE_ENTRIES = 8
+
+# 默认缓存占用的磁盘空间上限(字节)
+DEFAULT_CACHE_BYTES = 1024 * 1024 * 1024
+
+
+def cache_key(path):
+    """返回文件的缓存键 (规范化的绝对路径, st_mtime_ns, st_size)"""
+    st = os.stat(path)
+    return os.path.normcase(os.path.abspath(path)), st.st_mtime_ns, st.st_size
+
+
+def directory_size(path):
+    """目录中所有文件的总字节数"""
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class PreprocessCache:
+    """按缓存键保存预处理后的HTML路径,超过条目数或磁盘空间上限时淘汰最久未使用的条目
+
+    最新放入的条目总是保留,即使它本身超过空间上限.
+    """
+
+    def __init__(self, max_entries=DEFAULT_CACHE_ENTRIES, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # 键 -> (HTML路径, 临时目录字节数)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """返回缓存的HTML路径;未命中或临时文件已被清理时返回 None"""
+        entry = self.entries.get(key)
+        if entry is not None and not os.path.exists(entry[0]):
+            self.remove(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, processed_path):
+        """登记预处理结果,其所在目录归缓存所有;返回被淘汰的HTML路径列表"""
+        if key in self.entries and self.entries[key][0] != processed_path:
+            self.remove(key)
+        self.entries[key] = (processed_path, directory_size(os.path.dirname(processed_path)))
+        self.entries.move_to_end(key)
+        evicted = []
+        while len(self.entries) > 1 and (len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            oldest = next(iter(self.entries))
+            evicted.append(self.entries[oldest][0])
+            self.remove(oldest)
+        return evicted
+
+    @property
+    def total_bytes(self):
+        return sum(size for _path, size in self.entries.values())
+
+    def remove(self, key):
+        """删除条目及其临时目录"""
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            shutil.rmtree(os.path.dirname(entry[0]), ignore_errors=True)
+
+    def clear(self):
+        for key in list(self.entries):
+            self.remove(key)
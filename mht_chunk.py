@@ -0,0 +1,221 @@
+"""超长文档的分段渲染(不依赖Qt)
+
+数千行的检验记录表在一个页面中布局需要数分钟,甚至导致渲染进程内存耗尽.
+split_html 在安全的边界(块级元素之间、表格行之间)把预处理后的HTML切成若干段:
+每段重复 <head>(样式表不变)和被切开的祖先元素的开始标签,被切开的表格重复其表头.
+各段作为独立文档在页面池中并行渲染,再按顺序合并为一个PDF(见 MhtConverter.convert_chunked).
+每段从新的一页开始,分段处的页面可能比整体渲染多出一些空白.
+"""
+import os
+import re
+from pathlib import Path
+from html.parser import HTMLParser
+
+from mht_parser import HEAD_TAG_PATTERN
+
+# 没有结束标签的元素
+VOID_ELEMENTS = frozenset(
+    'area base br col embed hr img input keygen link meta param source track wbr'.split())
+
+# 可以在其子元素之间切开的容器,切开后在下一段重新打开
+SPLITTABLE_CONTAINERS = frozenset(
+    'html body div section article main center form blockquote font span table tbody ul ol dl'.split())
+
+# 在这些元素开始之前可以切分
+SPLIT_BEFORE = frozenset(
+    'tr p div table ul ol dl li h1 h2 h3 h4 h5 h6 section article blockquote pre hr center form'.split())
+
+# 开始标签隐式结束的未闭合元素(只结束栈顶连续的这些元素)
+IMPLIED_END = {
+    'tr': ('td', 'th', 'tr'),
+    'td': ('td', 'th'),
+    'th': ('td', 'th'),
+    'li': ('li',),
+    'thead': ('td', 'th', 'tr', 'thead', 'tbody', 'tfoot'),
+    'tbody': ('td', 'th', 'tr', 'thead', 'tbody', 'tfoot'),
+    'tfoot': ('td', 'th', 'tr', 'thead', 'tbody', 'tfoot'),
+}
+
+# 块级元素开始时隐式结束未闭合的 <p>
+CLOSES_PARAGRAPH = SPLIT_BEFORE - {'tr', 'li'}
+
+# 分段文件名
+CHUNK_FILENAME = 'chunk_{:04d}.html'
+
+
+class _Element:
+    """打开的元素: 标签名、原始开始标签和起始位置"""
+
+    __slots__ = ('tag', 'start_text', 'start', 'header', 'rows', 'has_td', 'has_th')
+
+    def __init__(self, tag, start_text, start):
+        self.tag = tag
+        self.start_text = start_text
+        self.start = start
+        self.header = None  # 表格的表头(<thead> 或只含 <th> 的第一行)原文
+        self.rows = 0
+        self.has_td = False
+        self.has_th = False
+
+
+class _SplitPointFinder(HTMLParser):
+    """扫描HTML,记录每个切分点的位置及此时打开的元素"""
+
+    def __init__(self, html, chunk_chars):
+        super().__init__(convert_charrefs=False)
+        self.html = html
+        self.chunk_chars = chunk_chars
+        self.line_starts = [0] + [match.end() for match in re.finditer('\n', html)]
+        self.stack = []
+        self.body_end = None  # <body> 开始标签之后的位置
+        self.last_split = 0
+        self.splits = []  # [(位置, 打开的元素(body之内), 各表格当时的表头)]
+
+    def position(self):
+        line, column = self.getpos()
+        return self.line_starts[line - 1] + column
+
+    def handle_starttag(self, tag, attrs):
+        start = self.position()
+        start_text = self.get_starttag_text()
+        if tag in VOID_ELEMENTS:
+            return
+        if tag == 'body' and self.body_end is None:
+            self.body_end = start + len(start_text)
+            self.last_split = self.body_end
+        for closes in (IMPLIED_END.get(tag, ()), ('p',) if tag in CLOSES_PARAGRAPH else ()):
+            while self.stack and self.stack[-1].tag in closes:
+                self._pop(start)
+
+        if self.body_end is not None and tag in SPLIT_BEFORE and start - self.last_split >= self.chunk_chars:
+            self._maybe_split(tag, start)
+
+        table = self._table()
+        if tag in ('td', 'th') and self.stack and self.stack[-1].tag == 'tr':
+            row = self.stack[-1]
+            row.has_td |= tag == 'td'
+            row.has_th |= tag == 'th'
+        element = _Element(tag, start_text, start)
+        if tag == 'tr' and table is not None:
+            table.rows += 1
+            element.rows = table.rows
+        self.stack.append(element)
+
+    def handle_startendtag(self, tag, attrs):
+        pass  # <br/> 等自闭合标签不改变嵌套
+
+    def handle_endtag(self, tag):
+        if tag in VOID_ELEMENTS:
+            return
+        for index in range(len(self.stack) - 1, -1, -1):
+            if self.stack[index].tag == tag:
+                start = self.position()
+                end = self.html.find('>', start) + 1 or len(self.html)
+                while len(self.stack) > index:
+                    self._pop(end)
+                return
+
+    def _table(self):
+        for element in reversed(self.stack):
+            if element.tag == 'table':
+                return element
+        return None
+
+    def _pop(self, end):
+        """结束栈顶元素;表头在结束时记录到所属表格"""
+        element = self.stack.pop()
+        table = self._table()
+        if table is None or table.header is not None:
+            return
+        header_row = (element.tag == 'tr' and element.rows == 1 and self.stack[-1].tag != 'thead'
+                      and element.has_th and not element.has_td)
+        if element.tag == 'thead' or header_row:
+            table.header = self.html[element.start:end]
+
+    def _maybe_split(self, tag, start):
+        inner = []
+        for element in self.stack:
+            if element.tag not in SPLITTABLE_CONTAINERS:
+                return
+            if element.tag not in ('html', 'body'):
+                inner.append(element)
+        parent = self.stack[-1].tag if self.stack else None
+        if tag == 'tr' and parent not in ('table', 'tbody'):
+            return
+        if tag == 'li' and parent not in ('ul', 'ol'):
+            return
+        headers = {id(element): element.header for element in inner if element.tag == 'table'}
+        self.splits.append((start, inner, headers))
+        self.last_split = start
+
+
+def _reopen(elements, headers):
+    parts = []
+    for element in elements:
+        parts.append(element.start_text)
+        header = headers.get(id(element))
+        if header:
+            parts.append(header)
+    return ''.join(parts)
+
+
+def _close(elements):
+    return ''.join(f'</{element.tag}>' for element in reversed(elements)) + '</body></html>'
+
+
+def split_html(html, chunk_chars):
+    """在安全的边界把HTML切成每段约 chunk_chars 个字符,返回各段HTML
+
+    没有 <body> 或找不到安全的切分点时返回 [html].
+    """
+    if chunk_chars <= 0 or len(html) < 2 * chunk_chars:
+        return [html]
+    finder = _SplitPointFinder(html, chunk_chars)
+    finder.feed(html)
+    finder.close()
+    if not finder.splits:
+        return [html]
+
+    prefix = html[:finder.body_end]
+    chunks = []
+    previous = (0, [], {})
+    for split in finder.splits + [(len(html), None, None)]:
+        start, elements, headers = previous
+        end = split[0]
+        head = '' if start == 0 else prefix + _reopen(elements, headers)
+        tail = '' if split[1] is None else _close(split[1])
+        chunks.append(head + html[start:end] + tail)
+        previous = split
+    return chunks
+
+
+def insert_base(html, base):
+    """在 <head> 开始处(没有 <head> 时在文档开头)插入 <base>"""
+    match = HEAD_TAG_PATTERN.search(html)
+    pos = match.end() if match else 0
+    return html[:pos] + base + html[pos:]
+
+
+def split_html_file(html_path, chunk_chars, output_dir=None):
+    """把预处理后的HTML文件切分为 output_dir(默认为同一目录)中的分段文件,返回路径列表
+
+    无需切分时返回 [html_path].分段与原文件引用相同的本地资源;写到其他目录时
+    插入 <base>,相对引用仍相对原文件所在目录解析.
+    """
+    with open(html_path, 'r', encoding='utf-8', errors='replace') as f:
+        html = f.read()
+    chunks = split_html(html, chunk_chars)
+    if len(chunks) < 2:
+        return [html_path]
+    source_dir = os.path.dirname(os.path.abspath(html_path))
+    output_dir = output_dir or source_dir
+    if os.path.abspath(output_dir) != source_dir:
+        base = f'<base href="{Path(source_dir).as_uri()}/">'
+        chunks = [insert_base(chunk, base) for chunk in chunks]
+    paths = []
+    for index, chunk in enumerate(chunks, 1):
+        path = os.path.join(output_dir, CHUNK_FILENAME.format(index))
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(chunk)
+        paths.append(path)
+    return paths
@@ -0,0 +1,689 @@
+"""无界面MHT/HTML转PDF转换器
+
+不创建任何窗口,可直接嵌入Python程序或asyncio事件循环中使用:
+
+    from mht_converter import MhtConverter
+
+    with MhtConverter() as converter:
+        pdf_bytes = converter.convert('report.mht')
+        for result in converter.convert_many(['a.mht', 'b.mht']):
+            print(result.source, result.ok)
+
+本模块只包含转换参数、注入脚本和并发控制等不依赖Qt的部分,导入时不加载Qt;
+MhtConverter 等渲染相关的类位于 mht_render,首次访问时才导入QtWebEngine.
+"""
+import os
+import copy
+import time
+import threading
+import statistics
+
+from mht_parser import ENHANCED_CSS
+
+# 首次访问时从 mht_render 导入的名称
+_RENDER_EXPORTS = ('MhtConverter', 'ensure_application')
+
+MHT_EXTENSIONS = ('.mht', '.mhtml')
+
+# 页面加载完成后注入的A4打印优化脚本
+RENDERING_IMPROVEMENTS_JS = """
+// 等待页面完全加载
+if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', applyA4PrintOptimizations);
+} else {
+    applyA4PrintOptimizations();
+}
+
+function applyA4PrintOptimizations() {
+    console.log('Applying A4 print optimizations...');
+    
+    // 保护原有字体样式
+    function preserveOriginalFontStyles() {
+        console.log('Preserving original font styles...');
+        
+        // 首先保护所有已有内联样式的元素
+        var allElements = document.querySelectorAll('*');
+        allElements.forEach(function(element) {
+            var style = element.getAttribute('style');
+            if (style) {
+                // 检查是否包含字体相关的样式
+                if (style.includes('font-size') || style.includes('font-family') || 
+                    style.includes('font-weight') || style.includes('font-style') ||
+                    style.includes('fontSize') || style.includes('fontFamily') ||
+                    style.includes('fontWeight') || style.includes('fontStyle')) {
+                    element.setAttribute('data-preserve-font', 'true');
+                    console.log('Protected element with font style:', element.tagName, style);
+                }
+            }
+            
+            // 检查计算样式中的字体设置
+            var computedStyle = window.getComputedStyle(element);
+            var defaultFontSize = '16px'; // 浏览器默认字体大小
+            
+            // 如果元素的字体大小不是默认值,说明被特别设置过
+            if (computedStyle.fontSize && computedStyle.fontSize !== defaultFontSize) {
+                element.setAttribute('data-preserve-font', 'true');
+                element.setAttribute('data-original-font-size', computedStyle.fontSize);
+                console.log('Protected element with computed font size:', element.tagName, computedStyle.fontSize);
+            }
+            
+            // 保护特殊的字体家族设置
+            if (computedStyle.fontFamily && computedStyle.fontFamily !== 'Times') {
+                element.setAttribute('data-preserve-font', 'true');
+                element.setAttribute('data-original-font-family', computedStyle.fontFamily);
+            }
+            
+            // 保护字体粗细设置
+            if (computedStyle.fontWeight && computedStyle.fontWeight !== 'normal' && computedStyle.fontWeight !== '400') {
+                element.setAttribute('data-preserve-font', 'true');
+                element.setAttribute('data-original-font-weight', computedStyle.fontWeight);
+            }
+        });
+        
+        // 额外保护表格单元格的字体样式
+        var tableCells = document.querySelectorAll('td, th');
+        tableCells.forEach(function(cell) {
+            cell.setAttribute('data-preserve-font', 'true');
+            var computedStyle = window.getComputedStyle(cell);
+            if (computedStyle.fontSize) {
+                cell.setAttribute('data-original-font-size', computedStyle.fontSize);
+            }
+            if (computedStyle.fontFamily) {
+                cell.setAttribute('data-original-font-family', computedStyle.fontFamily);
+            }
+            if (computedStyle.fontWeight) {
+                cell.setAttribute('data-original-font-weight', computedStyle.fontWeight);
+            }
+            console.log('Protected table cell font:', cell.tagName, computedStyle.fontSize, computedStyle.fontFamily);
+        });
+    }
+    
+    // 清理空白表格行
+    function removeEmptyTableRows() {
+        console.log('Removing empty table rows...');
+        var tables = document.querySelectorAll('table');
+        tables.forEach(function(table) {
+            var rows = table.querySelectorAll('tr');
+            rows.forEach(function(row) {
+                // 检查是否为空行
+                var cells = row.querySelectorAll('td, th');
+                var isEmpty = true;
+                
+                for (var i = 0; i < cells.length; i++) {
+                    var cellText = cells[i].textContent.trim();
+                    var cellHTML = cells[i].innerHTML.trim();
+                    
+                    // 如果有文字内容或有意义的HTML内容(不只是空格、换行符、&nbsp;)
+                    if (cellText && cellText !== '' && cellText !== '\\u00A0') {
+                        isEmpty = false;
+                        break;
+                    }
+                    
+                    // 检查是否有图片或其他有意义的元素
+                    if (cells[i].querySelector('img, input, select, textarea')) {
+                        isEmpty = false;
+                        break;
+                    }
+                    
+                    // 检查HTML内容(排除只有空白字符的情况)
+                    var cleanHTML = cellHTML.replace(/&nbsp;/g, '').replace(/\\s/g, '');
+                    if (cleanHTML && cleanHTML !== '') {
+                        isEmpty = false;
+                        break;
+                    }
+                }
+                
+                // 如果是空行,移除它
+                if (isEmpty) {
+                    console.log('Removing empty row');
+                    row.remove();
+                }
+            });
+        });
+    }
+    
+    // 优化表格适配A4纸张
+    function optimizeTablesForA4() {
+        var tables = document.querySelectorAll('table');
+        tables.forEach(function(table) {
+            // 设置表格基本样式
+            table.style.width = '100%';
+            table.style.borderCollapse = 'collapse';
+            table.style.margin = '0 auto 10px auto';
+            table.style.tableLayout = 'auto';
+            
+            // 优化单元格
+            var cells = table.querySelectorAll('td, th');
+            cells.forEach(function(cell) {
+                cell.style.padding = '4px 6px';
+                cell.style.verticalAlign = 'top';
+                cell.style.wordWrap = 'break-word';
+                
+                // 检查是否需要保护原有字体样式
+                var preserveFont = cell.getAttribute('data-preserve-font') === 'true';
+                
+                if (preserveFont) {
+                    // 恢复保存的原始字体设置
+                    var originalFontSize = cell.getAttribute('data-original-font-size');
+                    var originalFontFamily = cell.getAttribute('data-original-font-family');
+                    var originalFontWeight = cell.getAttribute('data-original-font-weight');
+                    
+                    if (originalFontSize) {
+                        cell.style.fontSize = originalFontSize;
+                        console.log('Restored font size:', originalFontSize, 'for', cell.tagName);
+                    }
+                    
+                    if (originalFontFamily) {
+                        cell.style.fontFamily = originalFontFamily;
+                    }
+                    
+                    if (originalFontWeight) {
+                        cell.style.fontWeight = originalFontWeight;
+                    }
+                } else {
+                    // 只在没有保护标记且没有现有字体大小时才设置默认值
+                    if (!cell.style.fontSize && !cell.getAttribute('style')?.includes('font-size')) {
+                        cell.style.fontSize = '12px';
+                    }
+                    
+                    // 只在没有保护标记且没有现有行高时才设置默认值
+                    if (!cell.style.lineHeight && !cell.getAttribute('style')?.includes('line-height')) {
+                        cell.style.lineHeight = '1.2';
+                    }
+                }
+                
+                cell.style.border = '1px solid #000';
+            });
+            
+            // 特殊处理表头
+            var headers = table.querySelectorAll('th');
+            headers.forEach(function(th) {
+                th.style.backgroundColor = '#f0f0f0';
+                
+                // 只在没有保护标记时才设置默认字体粗细和对齐
+                var preserveFont = th.getAttribute('data-preserve-font') === 'true';
+                if (!preserveFont) {
+                    th.style.fontWeight = 'bold';
+                    th.style.textAlign = 'center';
+                }
+            });
+        });
+    }
+    
+    // 优化图片适配表格和A4纸张
+    function optimizeImagesForA4() {
+        var images = document.querySelectorAll('img');
+        images.forEach(function(img) {
+            // 检查图片是否在表格中
+            var isInTable = img.closest('table') !== null;
+            
+            if (isInTable) {
+                // 表格中的图片使用较小尺寸
+                img.style.maxWidth = '120px';
+                img.style.maxHeight = '150px';
+            } else {
+                // 表格外的图片可以稍大一些
+                img.style.maxWidth = '200px';
+                img.style.maxHeight = '250px';
+            }
+            
+            img.style.width = 'auto';
+            img.style.height = 'auto';
+            img.style.display = 'block';
+            img.style.margin = '2px auto';
+            img.style.objectFit = 'contain';
+            
+            // 图片加载错误处理
+            img.onerror = function() {
+                this.style.border = '1px dashed #ccc';
+                this.style.background = '#f9f9f9';
+                this.style.minWidth = '50px';
+                this.style.minHeight = '50px';
+                this.alt = '图片加载失败';
+            };
+        });
+    }
+    
+    // 优化页面布局适配A4
+    function optimizePageLayoutForA4() {
+        var body = document.body;
+        if (body) {
+            body.style.margin = '0';
+            body.style.padding = '10px';
+            body.style.maxWidth = '100%';
+            body.style.width = '100%';
+            
+            // 检查是否需要保护原有字体样式
+            var preserveBodyFont = body.getAttribute('data-preserve-font') === 'true';
+            
+            // 只在没有保护标记且没有现有字体设置时才应用默认字体
+            if (!preserveBodyFont && !body.style.fontFamily && !body.getAttribute('style')?.includes('font-family')) {
+                body.style.fontFamily = '"Microsoft YaHei", "SimSun", Arial, sans-serif';
+            }
+            
+            // 只在没有保护标记且没有现有字体大小时才应用默认大小
+            if (!preserveBodyFont && !body.style.fontSize && !body.getAttribute('style')?.includes('font-size')) {
+                body.style.fontSize = '12px';
+            }
+            
+            // 只在没有保护标记且没有现有行高时才应用默认行高
+            if (!preserveBodyFont && !body.style.lineHeight && !body.getAttribute('style')?.includes('line-height')) {
+                body.style.lineHeight = '1.3';
+            }
+        }
+        
+        // 优化标题 - 保留原有样式,只补充必要的居中和间距
+        var headings = document.querySelectorAll('h1, h2, h3');
+        headings.forEach(function(h) {
+            h.style.textAlign = 'center';
+            h.style.margin = '10px 0';
+            
+            // 检查是否需要保护原有字体样式
+            var preserveHeadingFont = h.getAttribute('data-preserve-font') === 'true';
+            
+            // 只在没有保护标记且没有现有字体大小时才设置默认大小
+            if (!preserveHeadingFont && !h.style.fontSize && !h.getAttribute('style')?.includes('font-size')) {
+                h.style.fontSize = '16px';
+            }
+            
+            // 只在没有保护标记且没有现有字体粗细时才设置粗体
+            if (!preserveHeadingFont && !h.style.fontWeight && !h.getAttribute('style')?.includes('font-weight')) {
+                h.style.fontWeight = 'bold';
+            }
+        });
+    }
+    
+    // 确保打印颜色保真度
+    function ensurePrintColorFidelity() {
+        var style = document.createElement('style');
+        style.type = 'text/css';
+        style.innerHTML = `
+            /* A4打印专用样式 */
+            @media print {
+                @page {
+                    size: A4 portrait;
+                    margin: 1cm 1.5cm;
+                }
+                
+                * {
+                    -webkit-print-color-adjust: exact !important;
+                    color-adjust: exact !important;
+                }
+                
+                body {
+                    margin: 0 !important;
+                    padding: 5px !important;
+                    width: 100% !important;
+                }
+                
+                table {
+                    width: 100% !important;
+                    page-break-inside: avoid !important;
+                }
+                
+                tr {
+                    page-break-inside: avoid !important;
+                }
+                
+                td, th {
+                    page-break-inside: avoid !important;
+                    padding: 3px 5px !important;
+                }
+                
+                img {
+                    max-width: 100px !important;
+                    max-height: 120px !important;
+                    page-break-inside: avoid !important;
+                }
+            }
+        `;
+        
+        if (document.head) {
+            document.head.appendChild(style);
+        }
+    }
+    
+    // 执行所有A4优化
+    preserveOriginalFontStyles();  // 首先保护原始字体样式
+    removeEmptyTableRows();  // 清理空白表格行
+    optimizeTablesForA4();
+    optimizeImagesForA4();
+    optimizePageLayoutForA4();
+    ensurePrintColorFidelity();
+    
+    console.log('A4 print optimizations applied successfully');
+    
+    // 计算和显示页面信息
+    setTimeout(function() {
+        var pageHeight = document.body.scrollHeight;
+        var a4Height = 297 * 3.78; // A4高度转换为像素(约1122px)
+        console.log('Page height: ' + pageHeight + 'px, A4 height: ~' + a4Height + 'px');
+        
+        if (pageHeight > a4Height * 0.9) {
+            console.log('Warning: Content may exceed A4 page size');
+        }
+    }, 500);
+}
+"""
+
+# 导出PDF之前注入的最终样式
+FINAL_PRINT_JS = """
+            console.log('Applying final A4 print optimizations...');
+            
+            function applyFinalStyles() {
+                var finalStyle = document.createElement('style');
+                finalStyle.innerHTML = `
+                    @page {
+                        size: A4 portrait;
+                        margin: 1cm 1.5cm;
+                    }
+                    
+                    body {
+                        margin: 0 !important;
+                        padding: 10px !important;
+                        background: white !important;
+                        max-width: 100% !important;
+                    }
+                    
+                    table {
+                        width: 100% !important;
+                        border-collapse: collapse !important;
+                        margin: 0 auto 8px auto !important;
+                        table-layout: auto !important;
+                    }
+                    
+                    td, th {
+                        border: 1px solid #000 !important;
+                        padding: 4px 6px !important;
+                        word-wrap: break-word !important;
+                        vertical-align: top !important;
+                    }
+                    
+                    th {
+                        background-color: #f0f0f0 !important;
+                    }
+                    
+                    img {
+                        max-width: 120px !important;
+                        max-height: 150px !important;
+                        width: auto !important;
+                        height: auto !important;
+                        display: block !important;
+                        margin: 2px auto !important;
+                        object-fit: contain !important;
+                    }
+                `;
+                
+                if (document.head) {
+                    document.head.appendChild(finalStyle);
+                }
+            }
+            
+            applyFinalStyles();
+"""
+
+# 预热文档: 与真实报告相同的增强CSS、中文字体栈、表格和内嵌图片,
+# 让渲染进程启动、字体回退查找和图片解码在第一个真实文档之前完成
+WARMUP_HTML = f"""<html><head><meta charset="UTF-8">{ENHANCED_CSS}</head><body>
+<h1>体检报告 Medical Report</h1>
+<table>
+<tr><th>检验项目</th><th>结果</th><th>参考范围</th></tr>
+<tr><td style="font-family: 'Microsoft YaHei'">白细胞计数 WBC</td><td>6.5</td><td>3.5-9.5</td></tr>
+<tr><td style="font-family: SimSun">血红蛋白 Hemoglobin</td><td><b>142</b></td><td>130-175</td></tr>
+</table>
+<p>正常 异常 阴性 阳性 ↑ ↓ ① ② 0123456789</p>
+<img src="data:image/gif;base64,R0lGODlhAQABAIAAAP///wAAACH5BAEAAAAALAAAAAABAAEAAAICRAEAOw==">
+</body></html>"""
+
+
+class ConversionError(Exception):
+    """文档转换失败"""
+
+
+class ConversionProfile:
+    """PDF转换参数,默认值与GUI批量转换保持一致"""
+
+    def __init__(self, page_size='A4', landscape=False, optimize_js=True,
+                 settle_ms=2000, print_delay_ms=1000, large_file_mb=64, memory_budget_mb=512,
+                 postprocess_pdf=False, linearize_pdf=False, offline=False, timeouts=None, chunk_kb=0,
+                 thumbnails=None):
+        self.page_size = page_size
+        self.landscape = landscape
+        self.optimize_js = optimize_js
+        self.settle_ms = settle_ms  # 加载完成后等待布局稳定的时间
+        self.print_delay_ms = print_delay_ms  # 注入最终样式后等待打印的时间
+        self.large_file_mb = large_file_mb  # 达到该大小的MHT使用内存映射的大文件模式
+        self.memory_budget_mb = memory_budget_mb  # 大文件模式下单个文档的内存预算
+        self.postprocess_pdf = postprocess_pdf  # 导出后重新压缩并合并重复对象(需要pikepdf)
+        self.linearize_pdf = linearize_pdf  # 后处理时线性化输出
+        self.offline = offline  # 立即拦截所有远程请求,不等待网络超时
+        self.timeouts = timeouts or StageTimeouts()  # 各阶段的超时,超时的文档记为失败并继续下一个
+        self.chunk_kb = chunk_kb  # 超长文档按约该大小(KB)的HTML分段并行渲染后合并,0为不分段
+        self.thumbnails = thumbnails  # ThumbnailOptions,从同一次渲染的PDF生成缩略图(需要PyMuPDF)
+
+    def replace(self, **changes):
+        """返回修改了部分参数的副本"""
+        profile = copy.copy(self)
+        for name, value in changes.items():
+            setattr(profile, name, value)
+        return profile
+
+    def page_layout(self):
+        """生成printToPdf使用的页面布局"""
+        from PyQt5.QtCore import QMarginsF
+        from PyQt5.QtGui import QPageLayout, QPageSize
+
+        orientation = QPageLayout.Landscape if self.landscape else QPageLayout.Portrait
+        page_size = QPageSize(getattr(QPageSize, self.page_size))
+        return QPageLayout(page_size, orientation, QMarginsF())
+
+
+class ConversionResult:
+    """单个文档的转换结果"""
+
+    def __init__(self, source, pdf=None, error=None, metrics=None):
+        self.source = source
+        self.pdf = pdf
+        self.error = error
+        self.metrics = metrics  # DocumentMetrics,各阶段耗时
+        self.thumbnails = []  # [(文件名后缀, PNG字节)]
+
+    @property
+    def ok(self):
+        return self.error is None and bool(self.pdf)
+
+    @property
+    def blocked_urls(self):
+        """离线模式下被拦截的远程URL"""
+        return self.metrics.blocked_urls if self.metrics else []
+
+    def __repr__(self):
+        status = f"{len(self.pdf):,} bytes" if self.ok else f"error={self.error!r}"
+        return f"<ConversionResult {self.source!r} {status}>"
+
+
+class RecyclePolicy:
+    """渲染页面回收策略
+
+    页面处理满 max_documents 个文档,或其渲染进程RSS超过 max_rss_mb 时销毁并重建,
+    使任意长度的批量转换都只占用有限的内存.设为0或None表示不按该条件回收.
+    """
+
+    def __init__(self, max_documents=100, max_rss_mb=1024):
+        self.max_documents = max_documents
+        self.max_rss_mb = max_rss_mb
+
+    def reason(self, documents, rss):
+        """返回需要回收的原因,无需回收时返回None"""
+        if self.max_documents and documents >= self.max_documents:
+            return f"已处理 {documents} 个文档"
+        if self.max_rss_mb and rss and rss >= self.max_rss_mb * 1024 * 1024:
+            return f"渲染进程内存 {rss / 1024 / 1024:.0f} MB"
+        return None
+
+
+# 超时和错误信息中的阶段名称
+STAGE_LABELS = {'preprocess': "预处理", 'load': "页面加载", 'optimize': "渲染优化", 'print': "PDF打印"}
+
+
+class StageTimeouts:
+    """渲染流程各阶段的超时(秒),设为0或None表示该阶段不限时
+
+    预处理在后台线程中进行,超时后放弃等待(线程结束后再清理临时文件);
+    加载、优化(包括等待布局稳定的时间)和打印超时后销毁并替换渲染页面.
+    """
+
+    STAGES = ('preprocess', 'load', 'optimize', 'print')
+
+    def __init__(self, preprocess=300, load=120, optimize=60, print=180):
+        self.preprocess = preprocess
+        self.load = load
+        self.optimize = optimize
+        self.print = print
+
+    def seconds(self, stage):
+        return getattr(self, stage, None)
+
+    def describe(self, stage):
+        return f"{STAGE_LABELS.get(stage, stage)}超时(超过 {self.seconds(stage)} 秒)"
+
+
+class BackgroundTask:
+    """在守护线程中运行 fn(*args),供Qt事件循环轮询 done()
+
+    等待超时后调用 abandon(cleanup) 放弃结果: 线程仍会运行到结束(Python线程无法强制终止),
+    结束时执行 cleanup,例如删除它写出的临时文件.每个任务使用独立线程,
+    卡住的任务不会占用后续任务的线程.
+    """
+
+    def __init__(self, fn, *args):
+        self._lock = threading.Lock()
+        self._done = False
+        self._result = None
+        self._error = None
+        self._cleanup = None
+        self._thread = threading.Thread(target=self._run, args=(fn, args), daemon=True)
+        self._thread.start()
+
+    def _run(self, fn, args):
+        result = error = None
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            error = e
+        with self._lock:
+            self._done = True
+            self._result, self._error = result, error
+            cleanup = self._cleanup
+        if cleanup is not None:
+            cleanup()
+
+    def done(self):
+        with self._lock:
+            return self._done
+
+    def result(self):
+        """返回 fn 的结果,fn 抛出异常时重新抛出"""
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def abandon(self, cleanup=None):
+        """放弃结果;任务已结束时立即执行 cleanup,否则在任务结束时执行"""
+        cleanup = cleanup or (lambda: None)
+        with self._lock:
+            if not self._done:
+                self._cleanup = cleanup
+                return
+        cleanup()
+
+
+class ConcurrencyController:
+    """在批量转换过程中根据系统负载和吞吐调整并发渲染数
+
+    每完成 max(window, 当前并发数) 个文档评估一次:
+    - 可用内存低于 min_free_mb,或渲染进程RSS总和超过 max_renderer_mb 时减少并发;
+    - CPU使用率达到 cpu_high 时不再增加;
+    - 否则按吞吐(文档/秒)爬山: 增加后吞吐提高则继续增加,没有提高则退回并保持
+      hold_windows 个窗口;延迟明显上升而吞吐没有提高时减少.
+    并发数始终在 [min_workers, max_workers] 内.
+    """
+
+    def __init__(self, min_workers=1, max_workers=None, window=4, cpu_high=85.0,
+                 min_free_mb=1024, max_renderer_mb=None, hold_windows=5):
+        self.min_workers = max(1, int(min_workers))
+        self.max_workers = max(self.min_workers, int(max_workers or os.cpu_count() or 1))
+        self.current = self.min_workers
+        self.window = window
+        self.cpu_high = cpu_high
+        self.min_free_mb = min_free_mb
+        self.max_renderer_mb = max_renderer_mb
+        self.hold_windows = hold_windows
+        self._latencies = []
+        self._window_started = time.monotonic()
+        self._previous = None  # 上一个窗口的 (并发数, 吞吐, 延迟中位数)
+        self._last_step = 0  # 上一次调整的方向
+        self._hold = 0
+
+    def record(self, seconds):
+        """记录一个完成的文档及其耗时"""
+        self._latencies.append(seconds)
+
+    def due(self):
+        return len(self._latencies) >= max(self.window, self.current)
+
+    def adjust(self, cpu=None, free_memory=None, renderer_rss=None):
+        """评估最近一个窗口,返回 (新并发数, 原因);不调整时原因为None"""
+        now = time.monotonic()
+        elapsed = max(now - self._window_started, 1e-6)
+        throughput = len(self._latencies) / elapsed
+        latency = statistics.median(self._latencies) if self._latencies else 0.0
+        self._latencies = []
+        self._window_started = now
+        previous = self._previous
+        self._previous = (self.current, throughput, latency)
+
+        target, reason = self.current, None
+        if self.min_free_mb and free_memory is not None and free_memory < self.min_free_mb * 1024 * 1024:
+            target, reason = self.current - 1, f"可用内存 {free_memory / 1024 / 1024:.0f} MB"
+        elif self.max_renderer_mb and renderer_rss and renderer_rss > self.max_renderer_mb * 1024 * 1024:
+            target, reason = self.current - 1, f"渲染进程内存 {renderer_rss / 1024 / 1024:.0f} MB"
+        elif previous is None:
+            target, reason = self.current + 1, f"初始探测, 吞吐 {throughput:.2f} 文档/秒"
+        elif self._last_step > 0 and previous[0] != self.current:
+            if throughput > previous[1] * 1.05:
+                target, reason = self.current + 1, f"吞吐提高 {previous[1]:.2f} -> {throughput:.2f} 文档/秒"
+            else:
+                target, reason = previous[0], f"吞吐未提高 ({previous[1]:.2f} -> {throughput:.2f} 文档/秒)"
+                self._hold = self.hold_windows
+        elif self._hold > 0:
+            self._hold -= 1
+        elif latency > previous[2] * 1.5 and throughput <= previous[1]:
+            target, reason = self.current - 1, f"延迟上升 {previous[2]:.1f} -> {latency:.1f} 秒"
+        else:
+            target, reason = self.current + 1, f"探测更高并发, 吞吐 {throughput:.2f} 文档/秒"
+
+        if target > self.current and cpu is not None and cpu >= self.cpu_high:
+            target = self.current  # CPU已饱和
+        target = max(self.min_workers, min(self.max_workers, target))
+        self._last_step = (target > self.current) - (target < self.current)
+        if target == self.current:
+            return self.current, None
+        self.current = target
+        return target, reason
+
+
+def configure_page_settings(settings):
+    """与GUI预览保持一致的WebEngine设置"""
+    settings.setAttribute(settings.JavascriptEnabled, True)
+    settings.setAttribute(settings.AutoLoadImages, True)
+    settings.setAttribute(settings.LocalContentCanAccessRemoteUrls, True)
+    settings.setAttribute(settings.LocalContentCanAccessFileUrls, True)
+
+
+def __getattr__(name):
+    """延迟导入渲染相关的名称,只解析或检查文档时不加载Qt"""
+    if name in _RENDER_EXPORTS:
+        import mht_render
+        return getattr(mht_render, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,1620 @@
+"""MHT2PDF 图形界面
+
+由 htm2pdf.py 在不带子命令启动时导入;导入本模块会加载 PyQt5 和 QtWebEngine.
+"""
+import os
+import sys
+import subprocess
+import shutil
+import re
+import glob
+import time
+import tempfile
+from PyQt5.QtWidgets import (QApplication, QWidget, QPushButton, QVBoxLayout, QHBoxLayout, 
+                             QFileDialog, QLabel, QProgressBar, QTextEdit, QCheckBox, QGroupBox,
+                             QTabWidget, QListWidget, QListWidgetItem, QSplitter, QComboBox, QMessageBox)
+from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEnginePage
+from PyQt5.QtCore import QUrl, QTimer, pyqtSignal, QThread, Qt, QMarginsF
+from PyQt5.QtGui import QPageLayout, QPageSize, QFont
+
+from mht_parser import preprocess_mht_file, MemoryBudgetExceeded
+from mht_converter import (RENDERING_IMPROVEMENTS_JS, FINAL_PRINT_JS, WARMUP_HTML, RecyclePolicy,
+                           StageTimeouts, BackgroundTask, configure_page_settings)
+from mht_render import (OfflineRequestInterceptor, install_request_interceptor, StageWatchdog, poll_task,
+                        TASK_POLL_MS)
+from mht_cache import PreprocessCache, cache_key
+from mht_metrics import DocumentMetrics, BatchReport, process_rss
+from pdf_postprocess import POSTPROCESS_AVAILABLE, PdfPostprocessor, record_result
+from mht_queue import JobQueue, gui_queue_path, remove_queue, host_worker_id
+from mht_output import OutputCommitter, resolve_output_paths, discard_part, PART_SUFFIX
+from mht_batch import (find_duplicates, link_or_copy, plan_batch, ThroughputEstimator,
+                       format_duration, DEFAULT_HISTORY_PATH)
+
+class BatchConverter(QThread):
+    """批量转换线程"""
+    progress_updated = pyqtSignal(int, int, str)  # 当前进度,总数,当前文件
+    conversion_completed = pyqtSignal(str)  # 转换完成信息
+    
+    def __init__(self, mht_files, output_dir, delete_original=False):
+        super().__init__()
+        self.mht_files = mht_files
+        self.output_dir = output_dir
+        self.delete_original = delete_original
+        self.converter_instance = None
+        
+    def run(self):
+        total_files = len(self.mht_files)
+        success_count = 0
+        failed_files = []
+        
+        for i, mht_file in enumerate(self.mht_files):
+            try:
+                self.progress_updated.emit(i + 1, total_files, os.path.basename(mht_file))
+                
+                # 创建临时转换器实例
+                if self.convert_single_file(mht_file):
+                    success_count += 1
+                    if self.delete_original:
+                        try:
+                            os.remove(mht_file)
+                        except Exception as e:
+                            print(f"删除原文件失败 {mht_file}: {e}")
+                else:
+                    failed_files.append(mht_file)
+                    
+            except Exception as e:
+                failed_files.append(mht_file)
+                print(f"转换失败 {mht_file}: {e}")
+        
+        # 发送完成信号
+        result_msg = f"批量转换完成!\n成功: {success_count}/{total_files}"
+        if failed_files:
+            result_msg += f"\n失败文件: {len(failed_files)}个"
+        if self.delete_original and success_count > 0:
+            result_msg += f"\n已删除原始文件: {success_count}个"
+            
+        self.conversion_completed.emit(result_msg)
+    
+    def convert_single_file(self, mht_file):
+        """转换单个文件"""
+        try:
+            # 这里需要实现单个文件的转换逻辑
+            # 由于WebEngine需要在主线程运行,这里先返回True作为占位
+            return True
+        except Exception as e:
+            print(f"转换文件失败 {mht_file}: {e}")
+            return False
+
+class HTMLtoPDFConverter(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.started = time.monotonic()
+        self.warm_up_seconds = None
+        self.warm_up_page = None
+        self.init_ui()
+        # 窗口显示后预热渲染进程,第一个文档不再承担冷启动开销
+        QTimer.singleShot(0, self.warm_up_renderer)
+
+    def warm_up_renderer(self):
+        """在不可见的页面中用相同的打印参数渲染一次预热文档(结果丢弃)"""
+        start = time.monotonic()
+        page = QWebEnginePage(self.web_view.page().profile(), self)
+        configure_page_settings(page.settings())
+        self.warm_up_page = page
+
+        def on_printed(_data):
+            self.warm_up_seconds = time.monotonic() - start
+            print(f"Renderer warm-up finished in {self.warm_up_seconds:.2f}s")
+            self.warm_up_page = None
+            page.deleteLater()
+
+        def on_loaded(ok):
+            if ok:
+                # 与导出一致使用默认页面布局
+                page.printToPdf(on_printed)
+            else:
+                on_printed(None)
+
+        page.loadFinished.connect(on_loaded)
+        page.setHtml(WARMUP_HTML, QUrl('file:///'))
+
+    def init_ui(self):
+        """初始化中文界面"""
+        # 设置窗口标题和图标
+        self.setWindowTitle("MHT2PDF - github.com/LeeKaiGit")
+        self.setGeometry(300, 300, 800, 600)
+        
+        # 设置窗口图标 - 支持打包后的exe文件
+        from PyQt5.QtGui import QIcon, QPixmap
+        try:
+            # 尝试从多个位置加载图标
+            icon_loaded = False
+            
+            # 1. 尝试从打包后的临时目录加载
+            if hasattr(sys, '_MEIPASS'):
+                icon_path = os.path.join(sys._MEIPASS, 'pdf.ico')
+                if os.path.exists(icon_path):
+                    self.setWindowIcon(QIcon(icon_path))
+                    icon_loaded = True
+            
+            # 2. 尝试从当前脚本目录加载
+            if not icon_loaded:
+                icon_path = os.path.join(os.path.dirname(__file__), 'pdf.ico')
+                if os.path.exists(icon_path):
+                    self.setWindowIcon(QIcon(icon_path))
+                    icon_loaded = True
+            
+            # 3. 尝试从当前工作目录加载
+            if not icon_loaded:
+                icon_path = 'pdf.ico'
+                if os.path.exists(icon_path):
+                    self.setWindowIcon(QIcon(icon_path))
+                    icon_loaded = True
+            
+            # 4. 如果都失败,创建一个简单的默认图标
+            if not icon_loaded:
+                pixmap = QPixmap(32, 32)
+                pixmap.fill()  # 填充为白色
+                self.setWindowIcon(QIcon(pixmap))
+                
+        except Exception as e:
+            print(f"加载图标失败: {e}")
+        
+        main_layout = QVBoxLayout()
+        
+        # 创建选项卡
+        self.tab_widget = QTabWidget()
+        
+        # 单文件转换选项卡
+        self.single_tab = QWidget()
+        self.init_single_tab()
+        self.tab_widget.addTab(self.single_tab, "单文件转换")
+        
+        # 批量转换选项卡
+        self.batch_tab = QWidget()
+        self.init_batch_tab()
+        self.tab_widget.addTab(self.batch_tab, "批量转换")
+        
+        main_layout.addWidget(self.tab_widget)
+        
+        # 添加作者署名(右下角)
+        author_label = QLabel("github.com/LeeKaiGit")
+        author_label.setStyleSheet("""
+            QLabel {
+                color: #ff0000;
+                font-size: 20px;
+                font-style: italic;
+                font-weight: bold;
+                padding: 5px;
+            }
+        """)
+        author_label.setAlignment(Qt.AlignRight | Qt.AlignBottom)
+        main_layout.addWidget(author_label)
+        
+        self.setLayout(main_layout)
+        
+        # 设置窗口属性
+        self.setWindowTitle("MHT2PDF")
+        self.resize(1400, 900)
+        
+        # 变量初始化
+        self.last_directory = ""
+        self.page_loaded = False
+        self.imported_file_path = None
+        self.batch_files = []
+
+    def init_single_tab(self):
+        """初始化单文件转换选项卡"""
+        layout = QVBoxLayout()
+        
+        # 按钮区域
+        button_layout = QHBoxLayout()
+        
+        self.import_button = QPushButton("导入 MHT/HTML 文件")
+        self.import_button.clicked.connect(self.import_file)
+        button_layout.addWidget(self.import_button)
+
+        self.export_button = QPushButton("导出为 PDF")
+        self.export_button.clicked.connect(self.export_pdf)
+        self.export_button.setEnabled(False)
+        button_layout.addWidget(self.export_button)
+
+        self.optimize_pdf_cb = self.create_optimize_pdf_checkbox()
+        button_layout.addWidget(self.optimize_pdf_cb)
+
+        self.offline_cb = self.create_offline_checkbox()
+        button_layout.addWidget(self.offline_cb)
+
+        layout.addLayout(button_layout)
+
+        # 信息标签
+        self.info_label = QLabel("未导入文件")
+        layout.addWidget(self.info_label)
+
+        # 进度条
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+
+        # 网页预览
+        self.web_view = QWebEngineView()
+        configure_page_settings(self.web_view.settings())
+        self.web_view.page().pdfPrintingFinished.connect(self.on_pdf_printing_finished)
+        self.web_view.page().renderProcessTerminated.connect(self.on_render_process_terminated)
+        layout.addWidget(self.web_view)
+
+        # 离线模式下由拦截器立即阻止远程请求;拦截器安装在配置上,回收页面后仍然有效
+        self.request_interceptor = OfflineRequestInterceptor(self)
+        install_request_interceptor(self.web_view.page().profile(), self.request_interceptor)
+        self.offline_url = None
+
+        # 预处理在后台线程中进行,结果按 路径/修改时间/大小 缓存,重新导入同一文件时直接加载
+        self.preprocess_cache = PreprocessCache()
+        self.single_task = None
+        self.single_poll = None
+        self.single_temp_dir = None
+        self.single_preview = False
+        self.single_scroll = None
+        
+        self.single_tab.setLayout(layout)
+
+    def init_batch_tab(self):
+        """初始化批量转换选项卡"""
+        layout = QVBoxLayout()
+        
+        # 文件选择区域
+        file_group = QGroupBox("文件选择")
+        file_layout = QVBoxLayout()
+        
+        # 选择方式
+        select_layout = QHBoxLayout()
+        
+        self.select_files_btn = QPushButton("选择多个 MHT 文件")
+        self.select_files_btn.clicked.connect(self.select_multiple_files)
+        select_layout.addWidget(self.select_files_btn)
+        
+        self.select_folder_btn = QPushButton("选择文件夹")
+        self.select_folder_btn.clicked.connect(self.select_folder)
+        select_layout.addWidget(self.select_folder_btn)
+        
+        # 子文件夹选项
+        self.include_subfolders = QCheckBox("包含子文件夹")
+        self.include_subfolders.setChecked(True)
+        select_layout.addWidget(self.include_subfolders)
+        
+        file_layout.addLayout(select_layout)
+        
+        # 文件列表
+        self.file_list = QListWidget()
+        file_layout.addWidget(self.file_list)
+        
+        # 清除按钮
+        clear_layout = QHBoxLayout()
+        self.clear_list_btn = QPushButton("清空列表")
+        self.clear_list_btn.clicked.connect(self.clear_file_list)
+        clear_layout.addWidget(self.clear_list_btn)
+        clear_layout.addStretch()
+        file_layout.addLayout(clear_layout)
+        
+        file_group.setLayout(file_layout)
+        layout.addWidget(file_group)
+        
+        # 输出设置区域
+        output_group = QGroupBox("输出设置")
+        output_layout = QVBoxLayout()
+        
+        # 输出目录选择
+        output_dir_layout = QHBoxLayout()
+        self.output_dir_label = QLabel("输出目录: 将自动设置为MHT文件所在目录")
+        output_dir_layout.addWidget(self.output_dir_label)
+        
+        self.select_output_dir_btn = QPushButton("选择输出目录")
+        self.select_output_dir_btn.clicked.connect(self.select_output_directory)
+        output_dir_layout.addWidget(self.select_output_dir_btn)
+        
+        output_layout.addLayout(output_dir_layout)
+        
+        # 删除原文件选项
+        self.delete_original_cb = QCheckBox("转换完成后删除原始 MHT 文件")
+        self.delete_original_cb.setStyleSheet("QCheckBox { color: red; font-weight: bold; }")
+        output_layout.addWidget(self.delete_original_cb)
+        
+        # PDF体积优化选项
+        self.batch_optimize_pdf_cb = self.create_optimize_pdf_checkbox()
+        output_layout.addWidget(self.batch_optimize_pdf_cb)
+
+        self.batch_offline_cb = self.create_offline_checkbox()
+        output_layout.addWidget(self.batch_offline_cb)
+        
+        output_group.setLayout(output_layout)
+        layout.addWidget(output_group)
+        
+        # 批量转换控制
+        batch_control_layout = QHBoxLayout()
+        
+        self.start_batch_btn = QPushButton("开始批量转换")
+        self.start_batch_btn.clicked.connect(self.start_batch_conversion)
+        self.start_batch_btn.setEnabled(False)
+        batch_control_layout.addWidget(self.start_batch_btn)
+        
+        batch_control_layout.addStretch()
+        layout.addLayout(batch_control_layout)
+        
+        # 批量转换进度
+        self.batch_progress = QProgressBar()
+        self.batch_progress.setVisible(False)
+        layout.addWidget(self.batch_progress)
+        
+        self.batch_status_label = QLabel("就绪")
+        layout.addWidget(self.batch_status_label)
+        
+        # 转换日志
+        log_group = QGroupBox("转换日志")
+        log_layout = QVBoxLayout()
+        
+        self.log_text = QTextEdit()
+        self.log_text.setMaximumHeight(150)
+        self.log_text.setReadOnly(True)
+        # 限制日志行数,长时间批量转换时避免内存持续增长
+        self.log_text.document().setMaximumBlockCount(5000)
+        log_layout.addWidget(self.log_text)
+        
+        log_group.setLayout(log_layout)
+        layout.addWidget(log_group)
+        
+        self.batch_tab.setLayout(layout)
+        
+        # 初始化变量
+        self.output_directory = ""
+        self.recycle_policy = RecyclePolicy()
+        self.batch_temp_dir = None
+        self.batch_part_path = None
+        self.batch_export_target = None  # (最终PDF路径, 源文件),打印完成信号到达时提交
+        self.batch_postprocess = False
+        self.pdf_postprocessor = PdfPostprocessor()
+        # 定时取回后处理结果,后处理在进程池中与下一个文档的渲染并行
+        self.postprocess_timer = QTimer(self)
+        self.postprocess_timer.setInterval(200)
+        self.postprocess_timer.timeout.connect(self.collect_pdf_postprocess)
+        # 每个阶段限时,超时或渲染进程崩溃时记录失败并继续下一个文件
+        self.batch_watchdog = StageWatchdog(StageTimeouts(), self.on_batch_stage_timeout)
+        # 每开始或结束一个文件加一,之前文件的延迟回调据此失效
+        self.batch_token = 0
+        self.batch_task = None
+        self.batch_poll = None
+
+    def create_optimize_pdf_checkbox(self):
+        """创建"优化PDF体积"选项,默认不勾选;未安装 pikepdf 时不可用"""
+        checkbox = QCheckBox("优化PDF体积")
+        checkbox.setChecked(False)
+        checkbox.setEnabled(POSTPROCESS_AVAILABLE)
+        if POSTPROCESS_AVAILABLE:
+            checkbox.setToolTip("导出后重新压缩、合并重复的图片和字体")
+        else:
+            checkbox.setToolTip("需要安装 pikepdf")
+        return checkbox
+
+    def create_offline_checkbox(self):
+        """创建"离线模式"选项"""
+        checkbox = QCheckBox("离线模式")
+        checkbox.setToolTip("立即拦截所有远程请求(脚本、字体、统计等),不等待网络超时")
+        return checkbox
+
+    def watch_offline(self, url, offline):
+        """加载新页面前调用: 停止拦截上一个页面,离线模式下开始拦截 url 页面的远程请求"""
+        if self.offline_url is not None:
+            self.request_interceptor.release(self.offline_url)
+        self.offline_url = url if offline else None
+        if offline:
+            self.request_interceptor.watch(url)
+
+    def submit_pdf_postprocess(self, pdf_path, metrics=None):
+        """提交PDF后处理任务,metrics 为 None 表示单文件导出"""
+        self.pdf_postprocessor.submit(pdf_path, metrics)
+        if not self.postprocess_timer.isActive():
+            self.postprocess_timer.start()
+
+    def collect_pdf_postprocess(self, block=False):
+        """取回已完成的后处理结果并记录"""
+        for metrics, result in self.pdf_postprocessor.collect(block):
+            name = os.path.basename(result.path) if result.path else "PDF"
+            if metrics is None:
+                # 单文件导出
+                if result.error:
+                    print(f"PDF optimization failed: {result.error}")
+                else:
+                    self.info_label.setText(
+                        f"{self.info_label.text()}\nOptimized: {result.before:,} -> {result.after:,} bytes"
+                    )
+            else:
+                if result.error:
+                    self.log_text.append(f"警告: 优化 {name} 失败: {result.error}")
+                else:
+                    record_result(metrics, result)
+                    self.log_text.append(
+                        f"优化: {name} {result.before / 1024:.0f} KB -> {result.after / 1024:.0f} KB"
+                    )
+                pdf_path = self.batch_pending_duplicates.pop(metrics.source, None)
+                if pdf_path:
+                    self.copy_duplicate_outputs(pdf_path, self.batch_duplicates[metrics.source])
+        if not self.pdf_postprocessor.pending:
+            self.postprocess_timer.stop()
+
+    def set_batch_controls_enabled(self, enabled):
+        """设置批量转换控件的启用状态"""
+        self.select_files_btn.setEnabled(enabled)
+        self.select_folder_btn.setEnabled(enabled)
+        self.select_output_dir_btn.setEnabled(enabled)
+        self.clear_list_btn.setEnabled(enabled)
+        self.include_subfolders.setEnabled(enabled)
+        self.delete_original_cb.setEnabled(enabled)
+        self.batch_optimize_pdf_cb.setEnabled(enabled and POSTPROCESS_AVAILABLE)
+        self.batch_offline_cb.setEnabled(enabled)
+        if enabled:
+            self.update_batch_button_state()
+        else:
+            self.start_batch_btn.setEnabled(False)
+
+    def select_multiple_files(self):
+        """选择多个MHT文件"""
+        options = QFileDialog.Options()
+        files, _ = QFileDialog.getOpenFileNames(
+            self, 
+            "选择多个 MHT 文件", 
+            self.last_directory, 
+            "MHT Files (*.mht *.mhtml);;All Files (*.*)", 
+            options=options
+        )
+        
+        if files:
+            self.last_directory = os.path.dirname(files[0])
+            
+            # 自动设置输出目录为第一个文件所在的目录
+            if not self.output_directory:
+                self.output_directory = os.path.dirname(files[0])
+                self.output_dir_label.setText(f"输出目录: {self.output_directory} (自动设置)")
+            
+            for file in files:
+                if file not in [self.file_list.item(i).text() for i in range(self.file_list.count())]:
+                    item = QListWidgetItem(file)
+                    self.file_list.addItem(item)
+            
+            self.update_batch_button_state()
+            self.log_text.append(f"添加了 {len(files)} 个文件")
+
+    def select_folder(self):
+        """选择文件夹"""
+        folder = QFileDialog.getExistingDirectory(
+            self, 
+            "选择包含 MHT 文件的文件夹", 
+            self.last_directory
+        )
+        
+        if folder:
+            self.last_directory = folder
+            
+            # 自动设置输出目录为选择的文件夹
+            if not self.output_directory:
+                self.output_directory = folder
+                self.output_dir_label.setText(f"输出目录: {folder} (自动设置)")
+            
+            # 搜索MHT文件
+            pattern = "**/*.mht" if self.include_subfolders.isChecked() else "*.mht"
+            mht_files = glob.glob(os.path.join(folder, pattern), recursive=self.include_subfolders.isChecked())
+            
+            # 同时搜索mhtml文件
+            pattern_mhtml = "**/*.mhtml" if self.include_subfolders.isChecked() else "*.mhtml"
+            mhtml_files = glob.glob(os.path.join(folder, pattern_mhtml), recursive=self.include_subfolders.isChecked())
+            
+            all_files = mht_files + mhtml_files
+            
+            if all_files:
+                for file in all_files:
+                    if file not in [self.file_list.item(i).text() for i in range(self.file_list.count())]:
+                        item = QListWidgetItem(file)
+                        self.file_list.addItem(item)
+                
+                self.update_batch_button_state()
+                self.log_text.append(f"从文件夹 {folder} 找到 {len(all_files)} 个 MHT 文件")
+            else:
+                self.log_text.append(f"在文件夹 {folder} 中未找到 MHT 文件")
+
+    def select_output_directory(self):
+        """选择输出目录"""
+        directory = QFileDialog.getExistingDirectory(
+            self, 
+            "选择 PDF 输出目录", 
+            self.last_directory
+        )
+        
+        if directory:
+            self.output_directory = directory
+            self.output_dir_label.setText(f"输出目录: {directory} (手动设置)")
+            self.update_batch_button_state()
+
+    def clear_file_list(self):
+        """清空文件列表"""
+        self.file_list.clear()
+        # 清空输出目录设置
+        self.output_directory = ""
+        self.output_dir_label.setText("输出目录: 将自动设置为MHT文件所在目录")
+        self.update_batch_button_state()
+        self.log_text.append("已清空文件列表")
+
+    def update_batch_button_state(self):
+        """更新批量转换按钮状态"""
+        has_files = self.file_list.count() > 0
+        # 如果有文件,输出目录可以自动设置,所以只需要检查是否有文件
+        self.start_batch_btn.setEnabled(has_files)
+
+    def start_batch_conversion(self):
+        """开始批量转换"""
+        if self.file_list.count() == 0:
+            self.log_text.append("错误: 没有选择文件")
+            return
+        
+        # 禁用界面控件
+        self.set_batch_controls_enabled(False)
+        
+        # 如果没有设置输出目录,自动设置为第一个文件所在的目录
+        if not self.output_directory:
+            first_file = self.file_list.item(0).text()
+            self.output_directory = os.path.dirname(first_file)
+            self.output_dir_label.setText(f"输出目录: {self.output_directory} (自动设置)")
+            self.log_text.append(f"自动设置输出目录为: {self.output_directory}")
+        
+        # 获取文件列表
+        files = [self.file_list.item(i).text() for i in range(self.file_list.count())]
+        
+        # 显示进度
+        self.batch_progress.setVisible(True)
+        self.batch_progress.setMaximum(len(files))
+        self.batch_progress.setValue(0)
+        
+        self.start_batch_btn.setEnabled(False)
+        self.batch_status_label.setText("正在批量转换...")
+        
+        delete_original = self.delete_original_cb.isChecked()
+        
+        self.log_text.append(f"开始批量转换 {len(files)} 个文件...")
+        if delete_original:
+            self.log_text.append("警告: 将在转换成功后删除原始文件")
+        
+        # 由于WebEngine限制,这里需要改为同步处理
+        self.process_batch_files(files, delete_original)
+
+    def process_batch_files(self, files, delete_original):
+        """处理批量文件转换"""
+        # 批量转换与单文件预览共用同一个页面
+        self.cancel_single_preprocess()
+        self.batch_current_index = 0
+        self.batch_total_files = len(files)
+        # 内容相同的文件只转换一次,PDF再链接或复制到其余文件的输出路径
+        unique_files, self.batch_duplicates = find_duplicates(files)
+        self.batch_pending_duplicates = {}
+        # 批量状态保存在用户目录的任务队列中(按输出目录区分),批量正常结束后删除;
+        # 上次批量被中断(关闭窗口或崩溃)时,由用户选择继续(跳过已完成的文件)或重新开始
+        try:
+            queue_path = gui_queue_path(self.output_directory)
+            resume = os.path.exists(queue_path)
+            self.batch_queue = JobQueue(queue_path)
+            if resume and not self.confirm_resume_batch(unique_files):
+                self.batch_queue.close()
+                remove_queue(queue_path)
+                self.batch_queue = JobQueue(queue_path)
+            self.batch_queue.enqueue(unique_files)
+            # 重新开始批量时,之前放弃的文件再尝试一次
+            self.batch_queue.retry_dead(unique_files)
+            states = self.batch_queue.states(unique_files)
+        except Exception as e:
+            self.log_text.append(f"错误: 无法打开任务队列: {str(e)}")
+            self.batch_progress.setVisible(False)
+            self.batch_status_label.setText("批量转换未开始")
+            self.set_batch_controls_enabled(True)
+            return
+        self.batch_job = None
+        finished = [path for path in unique_files if states.get(path) == 'done']
+        if finished:
+            unique_files = [path for path in unique_files if states.get(path) != 'done']
+            self.batch_total_files -= len(finished) + sum(len(self.batch_duplicates.get(path, [])) for path in finished)
+        # 按估算处理量从大到小排序,并根据吞吐历史预测剩余时间
+        jobs = plan_batch(unique_files)
+        self.batch_jobs = {job.path: job for job in jobs}
+        self.batch_files_list = [job.path for job in jobs]
+        self.batch_estimator = ThroughputEstimator(DEFAULT_HISTORY_PATH)
+        self.batch_processed_bytes = 0
+        self.batch_delete_original = delete_original
+        self.batch_postprocess = self.batch_optimize_pdf_cb.isChecked() and POSTPROCESS_AVAILABLE
+        self.batch_offline = self.batch_offline_cb.isChecked()
+        self.batch_success_count = 0
+        self.batch_skipped_count = 0
+        self.batch_failed_files = []
+        self.batch_report = BatchReport()
+        self.batch_current_metrics = None
+        self.batch_page_documents = 0
+        
+        # 计算基础目录(所有文件的公共父目录)
+        if len(files) == 1:
+            # 单个文件时,基础目录是文件所在目录
+            self.batch_base_directory = os.path.dirname(files[0])
+        else:
+            # 多个文件时,找到公共父目录
+            self.batch_base_directory = os.path.commonpath([os.path.dirname(f) for f in files])
+        
+        self.log_text.append(f"基础目录: {self.batch_base_directory}")
+        self.log_text.append(f"将保持原有的子文件夹结构")
+        # 输出先写入 .part 再原子重命名,原始文件在检查点确认输出落盘后才删除
+        self.batch_committer = OutputCommitter()
+        self.batch_output_paths = resolve_output_paths(files, self.batch_pdf_path)
+        for source, pdf_path in self.batch_output_paths.items():
+            if pdf_path != self.batch_pdf_path(source):
+                self.log_text.append(f"输出文件名冲突: {os.path.basename(source)} -> {os.path.basename(pdf_path)}")
+        duplicate_count = sum(len(group) for group in self.batch_duplicates.values())
+        if duplicate_count:
+            self.log_text.append(f"发现 {duplicate_count} 个重复文件,相同内容只转换一次")
+        if finished:
+            self.log_text.append(f"任务队列: 跳过之前已完成的 {len(finished)} 个文件")
+        self.batch_progress.setMaximum(len(self.batch_files_list))
+        eta = self.batch_estimator.eta(job.cost for job in jobs)
+        self.log_text.append(f"已按文件大小和图片数量排序,大文件优先;预计耗时 {format_duration(eta)}")
+        
+        # 开始处理第一个文件
+        self.process_next_batch_file()
+
+    def confirm_resume_batch(self, files):
+        """上次中断的批量中已有文件完成时询问是否继续,返回 True 表示继续"""
+        finished = sum(1 for state in self.batch_queue.states(files).values() if state == 'done')
+        if not finished:
+            return False
+        reply = QMessageBox.question(
+            self, "继续上次的批量转换",
+            f"上次转换到该输出目录的批量未完成,其中 {finished} 个文件已转换.\n"
+            "选择\"是\"继续上次的转换(跳过已完成的文件),选择\"否\"重新转换所有文件.",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+        return reply == QMessageBox.Yes
+
+    def process_next_batch_file(self):
+        """处理下一个批量文件"""
+        if self.batch_current_index >= len(self.batch_files_list):
+            # 列表处理完后,等待退避时间再重试暂时失败的文件
+            retry = self.batch_queue.next_retry(self.batch_jobs)
+            if retry is not None:
+                source, wait = retry
+                self.batch_files_list.append(source)
+                self.batch_progress.setMaximum(len(self.batch_files_list))
+                self.batch_status_label.setText(f"{wait:.0f} 秒后重试: {os.path.basename(source)}")
+                QTimer.singleShot(int(wait * 1000) + 100, self.process_next_batch_file)
+                return
+            # 批量处理完成
+            self.finish_batch_conversion()
+            return
+        
+        current_file = self.batch_files_list[self.batch_current_index]
+        file_name = os.path.basename(current_file)
+        
+        # 在队列中领取该文件;已完成、已放弃或正由其他进程处理时跳过
+        self.batch_job = self.batch_queue.claim_source(host_worker_id('gui'), current_file)
+        if self.batch_job is None:
+            self.log_text.append(f"跳过: {file_name} (任务队列中已完成或正在处理)")
+            # 跳过的文件及其重复文件不计入本次批量的总数
+            skipped = 1 + len(self.batch_duplicates.get(current_file, []))
+            self.batch_total_files -= skipped
+            self.batch_skipped_count += skipped
+            self.batch_current_index += 1
+            QTimer.singleShot(0, self.process_next_batch_file)
+            return
+        
+        # 更新进度
+        self.batch_progress.setValue(self.batch_current_index + 1)
+        self.batch_status_label.setText(
+            f"正在转换: {file_name} ({self.batch_current_index + 1}/{len(self.batch_files_list)}) "
+            f"{self.batch_eta_text()}"
+        )
+        self.log_text.append(f"开始转换: {file_name}")
+        
+        # 清理上一个文件的临时目录
+        self.cleanup_batch_temp_dir()
+        
+        # 记录当前文件的分阶段耗时
+        self.batch_current_metrics = DocumentMetrics(current_file)
+        
+        # 设置当前文件
+        self.imported_file_path = current_file
+        self.batch_token += 1
+        
+        # 在后台线程中处理MHT文件,界面保持响应,卡住时由看门狗放弃
+        metrics = self.batch_current_metrics
+        self.batch_watchdog.enter('preprocess')
+        self.batch_task = BackgroundTask(lambda: preprocess_mht_file(current_file, metrics=metrics))
+        self.batch_poll = poll_task(self.batch_task, lambda task: self.on_batch_file_prepared(task, current_file))
+
+    def on_batch_file_prepared(self, task, current_file):
+        """后台预处理完成,加载到WebView"""
+        file_name = os.path.basename(current_file)
+        self.batch_task = self.batch_poll = None
+        try:
+            processed_path = task.result()
+        except Exception as e:
+            self.fail_batch_file(current_file, f"错误: 处理文件 {file_name} 失败: {str(e)}", permanent=True)
+            return
+        if not processed_path:
+            self.fail_batch_file(current_file, f"错误: 无法处理文件 {file_name}", permanent=True)
+            return
+        
+        try:
+            self.batch_temp_dir = os.path.dirname(processed_path)
+            # 加载文件到WebView
+            try:
+                self.web_view.loadFinished.disconnect()
+            except:
+                pass
+            self.web_view.loadFinished.connect(self.on_batch_file_loaded)
+            self.batch_watchdog.enter('load')
+            self.batch_current_metrics.begin('load')
+            url = QUrl.fromLocalFile(processed_path)
+            self.watch_offline(url, self.batch_offline)
+            self.web_view.load(url)
+        except Exception as e:
+            self.fail_batch_file(current_file, f"错误: 处理文件 {file_name} 失败: {str(e)}")
+
+    def batch_later(self, ms, callback):
+        """延迟执行当前文件的下一步;文件已结束(失败、超时或崩溃)时不再执行"""
+        token = self.batch_token
+        QTimer.singleShot(ms, lambda: callback() if token == self.batch_token else None)
+
+    def end_batch_file(self):
+        """停止当前文件的看门狗,使其尚未执行的延迟回调失效"""
+        self.batch_watchdog.stop()
+        self.batch_token += 1
+        self.batch_part_path = None
+        self.batch_export_target = None
+
+    def fail_batch_file(self, original_file, message, status='failed', permanent=None):
+        """记录批量文件转换失败并继续处理下一个文件"""
+        self.end_batch_file()
+        self.log_text.append(message)
+        self.queue_batch_failure(original_file, message, permanent)
+        self.record_batch_metrics(status, message)
+        self.batch_current_index += 1
+        QTimer.singleShot(100, self.process_next_batch_file)
+
+    def on_batch_stage_timeout(self, stage):
+        """当前文件的某个阶段超时: 放弃该文件,必要时替换卡住的渲染页面"""
+        current_file = self.batch_files_list[self.batch_current_index]
+        if stage == 'preprocess':
+            # 预处理线程无法强制终止,结束后再删除它写出的临时目录
+            task, self.batch_task = self.batch_task, None
+            if self.batch_poll is not None:
+                self.batch_poll.stop()
+                self.batch_poll = None
+            if task is not None:
+                task.abandon(lambda: self.remove_abandoned_output(task))
+        else:
+            self.batch_current_metrics.end(stage)
+            try:
+                self.web_view.loadFinished.disconnect()
+            except TypeError:
+                pass
+            self.web_view.stop()
+            self.recycle_web_page()
+            self.batch_page_documents = 0
+        message = f"错误: {os.path.basename(current_file)} {self.batch_watchdog.timeouts.describe(stage)}"
+        self.fail_batch_file(current_file, message, status='timeout')
+
+    @staticmethod
+    def remove_abandoned_output(task):
+        """删除已放弃的预处理任务写出的临时目录"""
+        try:
+            processed_path = task.result()
+        except Exception:
+            return
+        if processed_path:
+            shutil.rmtree(os.path.dirname(processed_path), ignore_errors=True)
+
+    def on_render_process_terminated(self, status, exit_code):
+        """渲染进程退出: 替换页面;批量转换中则记录当前文件失败并继续"""
+        if status == QWebEnginePage.NormalTerminationStatus:
+            return
+        # 不在信号处理中替换发出信号的页面
+        QTimer.singleShot(0, self.recycle_web_page)
+        message = f"渲染进程异常退出(状态 {int(status)}, 退出码 {exit_code})"
+        stage = self.batch_watchdog.stage
+        if stage in ('load', 'optimize', 'print'):
+            self.batch_current_metrics.end(stage)
+            self.batch_page_documents = 0
+            current_file = self.batch_files_list[self.batch_current_index]
+            self.fail_batch_file(current_file, f"错误: {os.path.basename(current_file)} {message}", status='crashed')
+        else:
+            self.info_label.setText(f"{message},已重新创建预览页面")
+
+    def queue_batch_failure(self, original_file, error, permanent=None):
+        """在任务队列中记录失败;可重试时稍后重试,否则计入失败文件"""
+        state = self.batch_queue.fail(self.batch_job, error, permanent) if self.batch_job else 'dead'
+        self.batch_job = None
+        if state == 'dead':
+            self.batch_failed_files.append(original_file)
+            self.batch_failed_files.extend(self.batch_duplicates.get(original_file, []))
+        else:
+            self.log_text.append(f"将在批量末尾重试: {os.path.basename(original_file)}")
+
+    def batch_eta_text(self):
+        """剩余时间和吞吐的显示文本"""
+        remaining = self.batch_files_list[self.batch_current_index:]
+        eta = self.batch_estimator.eta(self.batch_jobs[path].cost for path in remaining)
+        text = f"剩余约 {format_duration(eta)}"
+        elapsed = self.batch_report.wall_seconds
+        if self.batch_processed_bytes and elapsed > 0:
+            text += f", {self.batch_processed_bytes / elapsed / 1024 / 1024:.2f} MB/秒"
+        return text
+
+    def record_batch_metrics(self, status, error=None):
+        """结束当前文件的计时并加入批量报告,然后检查渲染进程内存"""
+        metrics = self.batch_current_metrics
+        if metrics is not None:
+            if self.offline_url is not None:
+                metrics.add_blocked_urls(self.request_interceptor.release(self.offline_url))
+                self.offline_url = None
+                if metrics.blocked_urls:
+                    self.log_text.append(f"离线模式: 已拦截 {len(metrics.blocked_urls)} 个远程请求")
+            metrics.finish(status, error)
+            self.batch_report.add(metrics)
+            self.batch_current_metrics = None
+            job = self.batch_jobs.get(metrics.source)
+            if job is not None:
+                self.batch_processed_bytes += job.size
+                if status == 'ok':
+                    self.batch_estimator.add(job.cost, metrics.total_seconds)
+        self.check_renderer_memory()
+
+    def check_renderer_memory(self):
+        """采样渲染进程内存,达到回收条件时替换预览页面"""
+        self.batch_page_documents += 1
+        pid = self.web_view.page().renderProcessPid()
+        rss = process_rss(pid)
+        reason = self.recycle_policy.reason(self.batch_page_documents, rss)
+        self.batch_report.add_memory_sample(pid, rss, reason)
+        if reason:
+            self.log_text.append(f"回收渲染页面: {reason}")
+            self.recycle_web_page()
+            self.batch_page_documents = 0
+
+    def recycle_web_page(self):
+        """用新页面替换预览页面,旧页面及其渲染进程随之释放"""
+        page = QWebEnginePage(self.web_view)
+        configure_page_settings(page.settings())
+        page.pdfPrintingFinished.connect(self.on_pdf_printing_finished)
+        page.renderProcessTerminated.connect(self.on_render_process_terminated)
+        # 旧页面是web_view的子对象,setPage时由Qt负责删除
+        self.web_view.setPage(page)
+        self.web_view.page().profile().clearHttpCache()
+
+    def cleanup_batch_temp_dir(self):
+        """删除批量转换中上一个文件的临时目录"""
+        if self.batch_temp_dir:
+            shutil.rmtree(self.batch_temp_dir, ignore_errors=True)
+            self.batch_temp_dir = None
+
+    def on_batch_file_loaded(self, success):
+        """批量文件加载完成回调"""
+        if self.batch_watchdog.stage != 'load':
+            return  # 已超时放弃的文件
+        current_file = self.batch_files_list[self.batch_current_index]
+        file_name = os.path.basename(current_file)
+        metrics = self.batch_current_metrics
+        metrics.end('load')
+        
+        if success:
+            # 应用渲染优化
+            self.batch_watchdog.enter('optimize')
+            metrics.begin('optimize')
+            self.inject_rendering_improvements(lambda _: metrics.end('optimize'))
+            
+            # 延迟执行PDF导出
+            self.batch_later(2000, self.export_current_batch_file)
+        else:
+            self.fail_batch_file(current_file, f"错误: 文件 {file_name} 加载失败")
+
+    def export_current_batch_file(self):
+        """导出当前批量文件为PDF"""
+        current_file = self.batch_files_list[self.batch_current_index]
+        file_name = os.path.basename(current_file)
+        pdf_path = self.batch_output_paths[current_file]
+        
+        try:
+            # 执行PDF导出
+            self.perform_batch_pdf_export(pdf_path, current_file)
+            
+        except Exception as e:
+            self.fail_batch_file(current_file, f"错误: 导出 {file_name} 失败: {str(e)}")
+
+    def batch_pdf_path(self, current_file):
+        """计算批量文件对应的PDF输出路径"""
+        file_name = os.path.basename(current_file)
+        name_without_ext = os.path.splitext(file_name)[0]
+        
+        # 根据"包含子文件夹"选项决定保存位置
+        if self.include_subfolders.isChecked():
+            # 如果勾选了"包含子文件夹",PDF保存在原文件所在目录
+            pdf_dir = os.path.dirname(current_file)
+            pdf_path = os.path.join(pdf_dir, f"{name_without_ext}.pdf")
+        else:
+            # 如果没有勾选,保存到输出目录,但保持子文件夹结构
+            file_dir = os.path.dirname(current_file)
+            if file_dir.startswith(self.batch_base_directory):
+                # 获取相对路径
+                relative_dir = os.path.relpath(file_dir, self.batch_base_directory)
+                if relative_dir == ".":
+                    # 如果就在基础目录下,直接使用输出目录
+                    pdf_dir = self.output_directory
+                else:
+                    # 在输出目录下创建相同的子文件夹结构
+                    pdf_dir = os.path.join(self.output_directory, relative_dir)
+            else:
+                # 如果不在基础目录下(不应该发生),直接使用输出目录
+                pdf_dir = self.output_directory
+            
+            pdf_path = os.path.join(pdf_dir, f"{name_without_ext}.pdf")
+        
+        return pdf_path
+
+    def perform_batch_pdf_export(self, pdf_path, original_file):
+        """执行批量PDF导出"""
+        try:
+            # 应用最终样式优化
+            metrics = self.batch_current_metrics
+            metrics.begin('optimize')
+            self.web_view.page().runJavaScript(FINAL_PRINT_JS, lambda _: metrics.end('optimize'))
+            
+            # 延迟执行实际的PDF导出
+            self.batch_later(1000, lambda: self.do_batch_pdf_export(pdf_path, original_file))
+            
+        except Exception as e:
+            file_name = os.path.basename(original_file)
+            self.fail_batch_file(original_file, f"错误: 准备导出 {file_name} 失败: {str(e)}")
+
+    def do_batch_pdf_export(self, pdf_path, original_file):
+        """执行实际的批量PDF导出"""
+        try:
+            file_name = os.path.basename(original_file)
+            
+            # 使用简化的WebEngine PDF导出
+            try:
+                # 使用WebEngine的简单printToPdf方法(避免页面布局参数问题)
+                # 写入临时文件,校验通过后再重命名为最终文件名
+                # 由 pdfPrintingFinished 信号提交(见 on_pdf_printing_finished),打印卡住时由看门狗放弃
+                part_path = self.batch_committer.part_path(pdf_path)
+                self.batch_part_path = part_path
+                self.batch_export_target = (pdf_path, original_file)
+                self.batch_watchdog.enter('print')
+                self.batch_current_metrics.begin('print')
+                self.web_view.page().printToPdf(part_path)
+                
+            except Exception as fallback_error:
+                # 如果WebEngine方法失败,记录错误并跳过
+                file_name = os.path.basename(original_file)
+                self.fail_batch_file(original_file, f"错误: 导出 {file_name} 失败: {str(fallback_error)}")
+            
+        except Exception as e:
+            file_name = os.path.basename(original_file)
+            self.fail_batch_file(original_file, f"错误: 导出 {file_name} 失败: {str(e)}")
+
+    def on_pdf_printing_finished(self, file_path, success):
+        """printToPdf写文件完成: 记录打印阶段耗时,批量转换的临时文件在此提交"""
+        if file_path.endswith(PART_SUFFIX) and file_path != self.batch_part_path:
+            # 已超时或失败的文件在之后才写完,临时文件不再提交
+            discard_part(file_path)
+            return
+        metrics = getattr(self, 'batch_current_metrics', None)
+        if metrics is not None:
+            metrics.end('print', os.path.getsize(file_path) if success and os.path.exists(file_path) else 0)
+        if file_path == self.batch_part_path and self.batch_export_target is not None:
+            pdf_path, original_file = self.batch_export_target
+            self.check_pdf_export_result(file_path, pdf_path, original_file, success)
+
+    def check_pdf_export_result(self, part_path, pdf_path, original_file, success=True):
+        """校验临时PDF并原子地重命名为最终文件(用于WebEngine printToPdf方法)"""
+        metrics = self.batch_current_metrics
+        self.end_batch_file()
+        error = None
+        with metrics.stage('verify'):
+            if not success:
+                discard_part(part_path)
+                error = "PDF打印失败"
+            else:
+                try:
+                    self.batch_committer.commit(part_path, pdf_path)
+                except FileNotFoundError:
+                    error = "PDF文件未生成"
+                except (OSError, ValueError) as e:
+                    error = str(e)
+        self.on_batch_export_finished(error is None, pdf_path, original_file, error)
+
+    def on_batch_export_finished(self, success, pdf_path, original_file, error=None):
+        """批量导出完成回调"""
+        file_name = os.path.basename(original_file)
+        
+        if success:
+            self.log_text.append(f"成功: {file_name} -> {os.path.basename(pdf_path)}")
+            self.batch_success_count += 1
+            self.batch_report.mark_first_pdf(time.monotonic() - self.started, self.warm_up_seconds)
+            duplicates = self.batch_duplicates.get(original_file)
+            if self.batch_postprocess:
+                self.submit_pdf_postprocess(pdf_path, self.batch_current_metrics)
+                if duplicates:
+                    # 后处理会替换PDF文件,完成后再链接,避免链接到未优化的旧文件
+                    self.batch_pending_duplicates[original_file] = pdf_path
+            elif duplicates:
+                self.copy_duplicate_outputs(pdf_path, duplicates)
+            if self.batch_job is not None:
+                self.batch_queue.complete(self.batch_job, self.batch_current_metrics.total_seconds)
+                self.batch_job = None
+            self.record_batch_metrics('ok')
+            
+            # 删除原文件(如果选择了该选项),在检查点确认PDF落盘后执行
+            if self.batch_delete_original:
+                self.delete_batch_original(original_file, pdf_path)
+        else:
+            error = error or "PDF文件未生成或为空"
+            self.log_text.append(f"失败: {file_name} ({error})")
+            self.queue_batch_failure(original_file, error)
+            self.record_batch_metrics('failed', error)
+        
+        # 处理下一个文件
+        self.batch_current_index += 1
+        QTimer.singleShot(500, self.process_next_batch_file)
+
+    def delete_batch_original(self, original_file, pdf_path):
+        """登记转换成功的原始文件,累积到检查点时批量删除"""
+        deleted = self.batch_committer.defer_delete(original_file, pdf_path)
+        self.log_deleted_originals(deleted)
+
+    def checkpoint_batch_outputs(self):
+        """fsync已提交的PDF后删除登记的原始文件"""
+        self.log_deleted_originals(self.batch_committer.checkpoint())
+
+    def log_deleted_originals(self, deleted):
+        if deleted:
+            self.log_text.append(f"检查点: 输出已落盘,删除 {len(deleted)} 个原始文件")
+        errors, self.batch_committer.errors = self.batch_committer.errors, []
+        for original_file, error in errors:
+            self.log_text.append(f"警告: 无法删除 {os.path.basename(original_file)}: {error}")
+
+    def copy_duplicate_outputs(self, pdf_path, duplicates):
+        """把已生成的PDF硬链接(或复制)到重复文件各自的输出路径"""
+        for duplicate in duplicates:
+            file_name = os.path.basename(duplicate)
+            metrics = DocumentMetrics(duplicate)
+            target = self.batch_output_paths[duplicate]
+            try:
+                with metrics.stage('link'):
+                    method = link_or_copy(pdf_path, target)
+            except OSError as e:
+                self.log_text.append(f"失败: {file_name} (重复文件,无法写入 {target}: {str(e)})")
+                self.batch_failed_files.append(duplicate)
+                metrics.finish('failed', str(e))
+            else:
+                how = {'link': "硬链接", 'copy': "复制"}.get(method, "同一文件")
+                self.log_text.append(f"成功: {file_name} -> {os.path.basename(target)} (重复文件,{how})")
+                self.batch_success_count += 1
+                metrics.finish('duplicate')
+                if self.batch_delete_original:
+                    self.delete_batch_original(duplicate, target)
+            self.batch_report.add(metrics)
+
+    def finish_batch_conversion(self):
+        """完成批量转换"""
+        total_files = self.batch_total_files
+        
+        # 等待剩余的PDF后处理(以及其后的重复文件链接)完成
+        if self.pdf_postprocessor.pending:
+            self.batch_status_label.setText("正在优化PDF...")
+            QApplication.processEvents()
+            self.collect_pdf_postprocess(block=True)
+        if self.batch_delete_original:
+            self.checkpoint_batch_outputs()
+        
+        self.batch_progress.setVisible(False)
+        # 重新启用界面控件
+        self.set_batch_controls_enabled(True)
+        
+        # 显示结果
+        result_msg = f"批量转换完成!\n成功: {self.batch_success_count}/{total_files}"
+        if self.batch_failed_files:
+            result_msg += f"\n失败: {len(self.batch_failed_files)} 个文件"
+        if self.batch_skipped_count:
+            result_msg += f"\n跳过: {self.batch_skipped_count} 个文件(已由其他进程完成或正在处理)"
+        if self.batch_delete_original and self.batch_committer.deleted:
+            result_msg += f"\n已删除原始文件: {len(self.batch_committer.deleted)} 个"
+        
+        self.batch_status_label.setText(result_msg)
+        self.log_text.append("=" * 50)
+        self.log_text.append(result_msg)
+        
+        if self.batch_failed_files:
+            self.log_text.append("失败的文件:")
+            for failed_file in self.batch_failed_files:
+                self.log_text.append(f"  - {os.path.basename(failed_file)}")
+        
+        self.cleanup_batch_temp_dir()
+        self.batch_estimator.save()
+        self.write_batch_report()
+        # 批量已结束,删除队列;下次对同一输出目录的批量重新转换所有文件
+        self.batch_queue.close()
+        remove_queue(self.batch_queue.path)
+        
+        # 显示完成通知弹窗
+        msg_box = QMessageBox(self)
+        msg_box.setWindowTitle("转换完成")
+        msg_box.setText(result_msg)
+        if self.batch_success_count == total_files:
+            msg_box.setIcon(QMessageBox.Information)
+        else:
+            msg_box.setIcon(QMessageBox.Warning)
+        msg_box.exec_()
+
+    def write_batch_report(self):
+        """输出批量性能报告(JSON/CSV/Prometheus)到输出目录"""
+        report = self.batch_report
+        report.finish()
+        summary = report.summary()
+        
+        self.log_text.append(
+            f"耗时: {summary['wall_seconds']:.1f} 秒, "
+            f"吞吐: {summary['documents_per_second']:.2f} 文件/秒, "
+            f"{summary['bytes_per_second'] / 1024 / 1024:.2f} MB/秒"
+        )
+        for name, stats in summary['stages'].items():
+            self.log_text.append(
+                f"  {name}: p50 {stats['p50'] * 1000:.0f}ms, p95 {stats['p95'] * 1000:.0f}ms, max {stats['max'] * 1000:.0f}ms"
+            )
+        memory = summary['memory']
+        if memory['max_renderer_rss']:
+            self.log_text.append(
+                f"渲染进程内存峰值: {memory['max_renderer_rss'] / 1024 / 1024:.0f} MB, 回收 {memory['recycles']} 次"
+            )
+        startup = summary['startup']
+        if startup['first_pdf_seconds'] is not None:
+            self.log_text.append(f"首个PDF: 批量开始后 {startup['first_pdf_seconds']:.1f} 秒")
+        pdf = summary['pdf']
+        if pdf['postprocessed']:
+            saved = pdf['bytes_before'] - pdf['bytes_after']
+            self.log_text.append(
+                f"PDF优化: {pdf['postprocessed']} 个文件, {pdf['bytes_before'] / 1024 / 1024:.1f} MB -> "
+                f"{pdf['bytes_after'] / 1024 / 1024:.1f} MB (节省 {saved / 1024 / 1024:.1f} MB)"
+            )
+        resources = summary['resources']
+        if resources['unused_bytes']:
+            self.log_text.append(
+                f"资源: 引用 {resources['referenced_bytes'] / 1024 / 1024:.1f} MB, "
+                f"跳过未引用 {resources['unused_bytes'] / 1024 / 1024:.1f} MB"
+            )
+        blocked = summary['blocked']
+        if blocked['requests']:
+            hosts = ', '.join(f"{host} ({count})" for host, count in blocked['hosts'].items())
+            self.log_text.append(
+                f"离线模式: {blocked['documents']} 个文件共拦截 {blocked['requests']} 个远程请求: {hosts}"
+            )
+        if summary['slowest']:
+            self.log_text.append("最慢的文件:")
+            for entry in summary['slowest'][:5]:
+                self.log_text.append(f"  - {os.path.basename(entry['source'])}: {entry['total_seconds']:.1f} 秒")
+        
+        try:
+            paths = report.write_all(self.output_directory)
+            self.log_text.append(f"性能报告: {', '.join(paths)}")
+        except Exception as e:
+            self.log_text.append(f"警告: 无法写入性能报告: {str(e)}")
+
+    def import_file(self):
+        """导入单个文件"""
+        options = QFileDialog.Options()
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, 
+            "导入 MHT/HTML 文件", 
+            self.last_directory, 
+            "MHT/HTML Files (*.mht *.mhtml *.html *.htm);;All Files (*.*)", 
+            options=options
+        )
+        
+        if file_path:
+            self.last_directory = os.path.dirname(file_path)
+            self.imported_file_path = file_path
+            
+            # 显示进度
+            self.progress_bar.setVisible(True)
+            self.progress_bar.setRange(0, 0)
+            self.info_label.setText("正在加载文件...")
+            
+            # 更新文件信息
+            file_name = os.path.basename(file_path)
+            file_dir = os.path.dirname(file_path)
+            file_ext = os.path.splitext(file_path)[1]
+            file_size = os.path.getsize(file_path)
+            
+            self.info_label.setText(
+                f"文件名: {file_name}\n"
+                f"位置: {file_dir}\n"
+                f"扩展名: {file_ext}\n"
+                f"大小: {file_size:,} 字节\n"
+                f"状态: 正在加载..."
+            )
+            
+            self.cancel_single_preprocess()
+            self.page_loaded = False
+            self.export_button.setEnabled(False)
+            
+            # 处理MHT文件
+            if file_ext.lower() in ['.mht', '.mhtml']:
+                self.start_single_preprocess(file_path)
+            else:
+                self.load_single_file(file_path)
+
+    def load_single_file(self, file_path, preview=False):
+        """在预览中加载文件;preview 为真时是预处理完成前的纯文本预览"""
+        if self.single_preview and not preview:
+            # 从文本预览切换到完整页面时保持滚动位置
+            self.single_scroll = self.web_view.page().scrollPosition()
+        self.single_preview = preview
+        
+        # 连接加载完成信号
+        try:
+            self.web_view.loadFinished.disconnect()
+        except:
+            pass
+        
+        self.web_view.loadFinished.connect(self.on_page_loaded)
+        url = QUrl.fromLocalFile(file_path)
+        self.watch_offline(url, self.offline_cb.isChecked())
+        self.web_view.load(url)
+
+    def start_single_preprocess(self, file_path):
+        """缓存命中时直接加载;否则在后台线程中预处理,期间先显示纯文本预览"""
+        try:
+            key = cache_key(file_path)
+        except OSError as e:
+            self.progress_bar.setVisible(False)
+            self.info_label.setText(f"❌ 无法读取文件: {str(e)}")
+            return
+        processed_path = self.preprocess_cache.get(key)
+        if processed_path:
+            print(f"Using cached preprocessing result: {processed_path}")
+            self.load_single_file(processed_path)
+            return
+        
+        self.single_temp_dir = temp_dir = tempfile.mkdtemp(prefix='mht2pdf_')
+        previews = []  # 后台线程写出预览后追加路径,由GUI线程取出
+        task = BackgroundTask(
+            lambda: preprocess_mht_file(file_path, temp_dir, on_preview=previews.append))
+        self.single_task = task
+        self.single_poll = QTimer(self)
+        self.single_poll.setInterval(TASK_POLL_MS)
+        self.single_poll.timeout.connect(
+            lambda: self.poll_single_preprocess(task, file_path, key, previews))
+        self.single_poll.start()
+
+    def poll_single_preprocess(self, task, file_path, key, previews):
+        """显示已写出的文本预览;预处理完成后缓存结果并加载完整页面"""
+        if task is not self.single_task:
+            return
+        if not task.done():
+            if previews and not self.single_preview:
+                self.load_single_file(previews.pop(), preview=True)
+            return
+        
+        self.single_poll.stop()
+        self.single_poll = None
+        self.single_task = None
+        temp_dir, self.single_temp_dir = self.single_temp_dir, None
+        try:
+            processed_path = task.result()
+        except MemoryBudgetExceeded as e:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            self.single_preview = False
+            self.progress_bar.setVisible(False)
+            self.info_label.setText(f"❌ 文件过大,无法处理: {str(e)}")
+            return
+        if processed_path:
+            self.preprocess_cache.put(key, processed_path)
+            self.load_single_file(processed_path)
+        else:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            self.load_single_file(file_path)
+
+    def cancel_single_preprocess(self):
+        """放弃进行中的预处理(例如导入了另一个文件),任务结束后删除其临时目录"""
+        if self.single_poll is not None:
+            self.single_poll.stop()
+            self.single_poll = None
+        task, self.single_task = self.single_task, None
+        temp_dir, self.single_temp_dir = self.single_temp_dir, None
+        if task is not None:
+            task.abandon(lambda: shutil.rmtree(temp_dir, ignore_errors=True))
+        self.single_preview = False
+        self.single_scroll = None
+
+    def closeEvent(self, event):
+        """关闭窗口时删除缓存的预处理结果"""
+        self.cancel_single_preprocess()
+        self.preprocess_cache.clear()
+        super().closeEvent(event)
+
+    def on_page_loaded(self, success):
+        """页面加载完成回调"""
+        self.progress_bar.setVisible(False)
+        
+        if success:
+            self.page_loaded = True
+            self.export_button.setEnabled(True)
+            
+            file_name = os.path.basename(self.imported_file_path)
+            file_dir = os.path.dirname(self.imported_file_path)
+            file_ext = os.path.splitext(self.imported_file_path)[1]
+            file_size = os.path.getsize(self.imported_file_path)
+            
+            self.info_label.setText(
+                f"文件名: {file_name}\n"
+                f"位置: {file_dir}\n"
+                f"扩展名: {file_ext}\n"
+                f"大小: {file_size:,} 字节\n"
+                f"状态: ✅ 加载成功"
+            )
+            if self.offline_url is not None:
+                blocked = self.request_interceptor.blocked_urls(self.offline_url)
+                if blocked:
+                    self.info_label.setText(f"{self.info_label.text()}\n离线模式: 已拦截 {len(blocked)} 个远程请求")
+                    print("Blocked remote requests:\n  " + "\n  ".join(blocked))
+            
+            # 注入渲染改进
+            self.inject_rendering_improvements()
+        else:
+            self.info_label.setText("❌ 文件加载失败,请重试.")
+
+    def export_pdf(self):
+        """导出PDF文件"""
+        if not self.page_loaded or not self.imported_file_path:
+            self.info_label.setText("❌ 请先导入文件")
+            return
+        
+        options = QFileDialog.Options()
+        default_name = os.path.splitext(os.path.basename(self.imported_file_path))[0] + ".pdf"
+        save_path, _ = QFileDialog.getSaveFileName(
+            self, 
+            "保存 PDF 文件", 
+            os.path.join(self.last_directory, default_name), 
+            "PDF Files (*.pdf);;All Files (*.*)", 
+            options=options
+        )
+
+        if save_path:
+            if not save_path.endswith('.pdf'):
+                save_path += '.pdf'
+            
+            self.last_directory = os.path.dirname(save_path)
+            
+            # 显示导出进度
+            self.progress_bar.setVisible(True)
+            self.progress_bar.setRange(0, 0)
+            self.info_label.setText("🔄 正在准备PDF导出...")
+            self.export_button.setEnabled(False)
+            
+            # 延迟执行导出以确保所有渲染完成
+            QTimer.singleShot(2000, lambda: self.perform_pdf_export(save_path))
+
+    def on_page_loaded(self, ok):
+        """页面加载完成回调"""
+        if self.single_preview:
+            # 文本预览已显示,图片等资源仍在后台处理
+            if ok:
+                self.info_label.setText(self.info_label.text().replace("状态: 正在加载...", "状态: 文本预览 - 正在加载图片..."))
+            return
+        self.progress_bar.setVisible(False)
+        if ok:
+            if self.single_scroll is not None:
+                self.web_view.page().runJavaScript(
+                    f"window.scrollTo({self.single_scroll.x()}, {self.single_scroll.y()})")
+                self.single_scroll = None
+            self.page_loaded = True
+            self.export_button.setEnabled(True)
+            
+            # 更新状态信息
+            file_name = os.path.basename(self.imported_file_path)
+            file_dir = os.path.dirname(self.imported_file_path)
+            file_ext = os.path.splitext(self.imported_file_path)[1]
+            file_size = os.path.getsize(self.imported_file_path)
+            
+            self.info_label.setText(
+                f"文件名: {file_name}\n"
+                f"位置: {file_dir}\n"
+                f"扩展名: {file_ext}\n"
+                f"大小: {file_size:,} 字节\n"
+                f"状态: ✓ 加载成功 - 可以导出"
+            )
+            
+            # 注入额外的CSS来进一步改善渲染
+            self.inject_rendering_improvements()
+        else:
+            self.page_loaded = False
+            self.export_button.setEnabled(False)
+            self.info_label.setText("❌ Failed to load file. Please try again.")
+
+    def inject_rendering_improvements(self, callback=None):
+        """注入A4打印优化的JavaScript,callback在脚本执行完成后调用"""
+        if callback is None:
+            self.web_view.page().runJavaScript(RENDERING_IMPROVEMENTS_JS)
+        else:
+            self.web_view.page().runJavaScript(RENDERING_IMPROVEMENTS_JS, callback)
+
+    def export_pdf(self):
+        """导出PDF文件"""
+        if not hasattr(self, 'imported_file_path') or not self.imported_file_path:
+            self.info_label.setText("❌ Please import a file first.")
+            return
+            
+        if not self.page_loaded:
+            self.info_label.setText("⏳ Please wait for the page to load completely before exporting.")
+            return
+                
+        options = QFileDialog.Options()
+        default_name = os.path.splitext(os.path.basename(self.imported_file_path))[0] + ".pdf"
+        save_path, _ = QFileDialog.getSaveFileName(
+            self, 
+            "Save PDF File", 
+            os.path.join(self.last_directory, default_name), 
+            "PDF Files (*.pdf);;All Files (*.*)", 
+            options=options
+        )
+
+        if save_path:
+            if not save_path.endswith('.pdf'):
+                save_path += '.pdf'
+            
+            self.last_directory = os.path.dirname(save_path)
+            
+            # 显示导出进度
+            self.progress_bar.setVisible(True)
+            self.progress_bar.setRange(0, 0)
+            self.info_label.setText("🔄 Preparing PDF export...")
+            self.export_button.setEnabled(False)
+            
+            # 延迟执行导出以确保所有渲染完成
+            QTimer.singleShot(2000, lambda: self.perform_pdf_export(save_path))
+
+    def perform_pdf_export(self, save_path):
+        """执行A4优化的PDF导出"""
+        try:
+            # A4打印优化的最终样式调整
+            final_js = """
+            // A4打印优化最终调整
+            console.log('Applying final A4 print optimizations...');
+            
+            // 动态应用样式,避免覆盖保护的字体设置
+            function applyFinalStyles() {
+                // 应用基本的A4页面样式
+                var finalStyle = document.createElement('style');
+                finalStyle.innerHTML = `
+                    /* A4打印专用最终样式 */
+                    @page {
+                        size: A4 portrait;
+                        margin: 1cm 1.5cm;
+                    }
+                    
+                    /* 确保内容适配A4页面 */
+                    body {
+                        margin: 0 !important;
+                        padding: 10px !important;
+                        background: white !important;
+                        max-width: 100% !important;
+                    }
+                    
+                    /* 表格A4适配 */
+                    table {
+                        width: 100% !important;
+                        border-collapse: collapse !important;
+                        margin: 0 auto 8px auto !important;
+                        page-break-inside: avoid !important;
+                        table-layout: auto !important;
+                    }
+                    
+                    /* 图片A4适配 */
+                    img {
+                        max-width: 120px !important;
+                        max-height: 150px !important;
+                        width: auto !important;
+                        height: auto !important;
+                        display: block !important;
+                        margin: 2px auto !important;
+                        page-break-inside: avoid !important;
+                        object-fit: contain !important;
+                    }
+                `;
+                
+                if (document.head) {
+                    document.head.appendChild(finalStyle);
+                }
+                
+                // 为没有保护标记的单元格应用基本样式
+                var cells = document.querySelectorAll('td, th');
+                cells.forEach(function(cell) {
+                    // 始终应用边框和布局样式
+                    cell.style.border = '1px solid #000';
+                    cell.style.padding = '4px 6px';
+                    cell.style.wordWrap = 'break-word';
+                    cell.style.verticalAlign = 'top';
+                });
+                
+                // 为没有保护标记的表头应用样式
+                var headers = document.querySelectorAll('th');
+                headers.forEach(function(th) {
+                    th.style.backgroundColor = '#f0f0f0';
+                    
+                    var preserveFont = th.getAttribute('data-preserve-font') === 'true';
+                    if (!preserveFont) {
+                        th.style.fontWeight = 'bold';
+                        th.style.textAlign = 'center';
+                    }
+                });
+            }
+            
+            applyFinalStyles();
+            """
+            
+            self.web_view.page().runJavaScript(final_js)
+            
+            # 等待JavaScript执行和布局计算完成后导出
+            QTimer.singleShot(3000, lambda: self.do_pdf_export(save_path))
+            
+        except Exception as e:
+            self.handle_export_error(f"Export preparation failed: {e}")
+
+    def do_pdf_export(self, save_path):
+        """实际执行PDF导出 - A4优化版本"""
+        try:
+            self.info_label.setText("📄 Generating PDF with A4 optimization...")
+            
+            # 使用A4优化设置进行PDF导出
+            self.web_view.page().printToPdf(save_path)
+            
+            # 等待导出完成
+            QTimer.singleShot(4000, lambda: self.on_export_complete(save_path))
+            
+        except Exception as e:
+            self.handle_export_error(f"PDF export failed: {e}")
+
+    def on_export_complete(self, save_path):
+        """导出完成处理"""
+        try:
+            if os.path.exists(save_path) and os.path.getsize(save_path) > 0:
+                self.progress_bar.setVisible(False)
+                self.export_button.setEnabled(True)
+                
+                file_size = os.path.getsize(save_path)
+                self.info_label.setText(f"✅ PDF exported successfully!\nLocation: {save_path}\nSize: {file_size:,} bytes")
+                if self.optimize_pdf_cb.isChecked() and POSTPROCESS_AVAILABLE:
+                    self.submit_pdf_postprocess(save_path)
+                
+                # 打开文件所在文件夹并选中文件
+                subprocess.Popen(f'explorer /select,"{os.path.abspath(save_path)}"', shell=True)
+            else:
+                self.handle_export_error("PDF file was not created or is empty")
+                
+        except Exception as e:
+            self.handle_export_error(f"Post-export processing failed: {e}")
+
+    def handle_export_error(self, error_msg):
+        """处理导出错误"""
+        self.progress_bar.setVisible(False)
+        self.export_button.setEnabled(True)
+        self.info_label.setText(f"❌ Export failed: {error_msg}")
+        print(f"Export error: {error_msg}")
+
+
+def main():
+    """启动图形界面"""
+    app = QApplication(sys.argv)
+    window = HTMLtoPDFConverter()
+    window.show()
+    return app.exec_()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
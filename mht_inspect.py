@@ -0,0 +1,212 @@
+"""MHT结构检查(不依赖Qt)
+
+inspect_mht_file 用内存映射扫描单个文件,只解码HTML、框架HTML和CSS正文,报告:
+文件类型(按开头的magic bytes识别非MHT文件)、可能的生成程序(IE/Word/Excel/Chrome)、
+每个part的类型/字符集/传输编码/大小/位置、未被引用的part、外部URL以及截断迹象.
+iter_inspect 在进程池中并行检查大量文件,结果适合逐行写出为JSONL:
+
+    python htm2pdf.py inspect D:/reports -o triage.jsonl
+"""
+import io
+import os
+import re
+import time
+import mmap
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+
+from mht_parser import (find_mapped_boundary, index_mapped_parts, iter_mapped_body, decode_text,
+                        describe_part, find_referenced_parts, LazyResources, MappedPart)
+
+# 识别文件类型时读取的开头字节数
+SNIFF_BYTES = 64 * 1024
+
+# 每个结果中最多列出的外部URL数
+MAX_EXTERNAL_URLS = 20
+
+# 按开头字节识别的非MHT文件
+MAGIC_BYTES = (
+    (b'%PDF', 'pdf'),
+    (b'PK\x03\x04', 'zip'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'ole'),  # .doc/.xls/.msg
+    (b'{\\rtf', 'rtf'),
+    (b'\x1f\x8b', 'gzip'),
+    (b'\x89PNG', 'png'),
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'GIF8', 'gif'),
+)
+
+# 先按字面前缀找出所有URL,再检查其前面是否为 src/href 属性或CSS url()
+URL_PATTERN = re.compile(r'''https?://[^"'\s<>()]+''', re.IGNORECASE)
+RESOURCE_PREFIX_PATTERN = re.compile(r'''(?:\bsrc\s*=\s*|\bhref\s*=\s*|url\(\s*)["']?$''', re.IGNORECASE)
+
+
+def sniff_kind(head):
+    """根据文件开头判断类型: 'mht'、'html'、'empty'、MAGIC_BYTES中的类型或 'unknown'"""
+    if not head:
+        return 'empty'
+    for magic, kind in MAGIC_BYTES:
+        if head.startswith(magic):
+            return kind
+    text = head.lstrip(b'\xef\xbb\xbf \t\r\n').lower()
+    if b'mime-version:' in head[:4096].lower() or b'content-type: multipart/' in head.lower():
+        return 'mht'
+    if text.startswith((b'<!doctype', b'<html', b'<?xml')):
+        return 'html'
+    if text.startswith(b'--') or b'\ncontent-type:' in head.lower():
+        return 'mht'  # 缺少顶层头部的MHT
+    return 'unknown'
+
+
+def detect_generator(top_headers, html_head):
+    """根据顶层头部和HTML开头推断保存MHT的程序"""
+    headers = top_headers.lower()
+    html = html_head.lower()
+    for office in ('word', 'excel', 'powerpoint'):
+        if f'content="microsoft {office}' in html or f'content=microsoft {office}' in html:
+            return office.capitalize() if office != 'powerpoint' else 'PowerPoint'
+    if 'saved by blink' in headers or 'snapshot-content-location:' in headers:
+        return 'Chrome'
+    if 'internet explorer' in headers or 'mimeole' in headers:
+        return 'IE'
+    return None
+
+
+def find_resource_urls(text):
+    """返回 text 中作为资源加载的外部URL(src/href属性值和CSS url())"""
+    urls = []
+    for match in URL_PATTERN.finditer(text):
+        if RESOURCE_PREFIX_PATTERN.search(text, max(0, match.start() - 16), match.start()):
+            urls.append(match.group())
+    return urls
+
+
+def decode_part_text(mm, part):
+    """解码文本part的正文"""
+    data = b''.join(iter_mapped_body(mm, part.body_start, part.body_end, part.transfer_encoding))
+    return decode_text(data, part.headers.get('charset'))
+
+
+def base64_incomplete(mm, part):
+    """base64正文的有效字符数不是4的倍数时,正文很可能被截断"""
+    if part.transfer_encoding != 'base64' or part.body_end <= part.body_start:
+        return False
+    body = mm[part.body_start:part.body_end].translate(None, b' \t\r\n')
+    return len(body) % 4 != 0
+
+
+def inspect_mapped(mm, result):
+    """检查内存映射的MHT,把结构信息写入 result"""
+    boundary = find_mapped_boundary(mm)
+    if boundary is None:
+        result['issues'].append('no_boundary')
+        return
+    result['boundary'] = boundary[2:].decode('latin1')
+    header_end = mm.find(boundary)
+    top_headers = mm[:header_end if header_end != -1 else 0].decode('latin1')
+
+    parts = [MappedPart(mm, headers, body_start, body_end)
+             for headers, body_start, body_end in index_mapped_parts(mm, boundary)]
+    result['parts'] = [describe_part(part) for part in parts]
+
+    html_index = next((index for index, part in enumerate(parts) if part.content_type == 'text/html'), None)
+    html = decode_part_text(mm, parts[html_index]) if html_index is not None else ''
+    if html_index is None:
+        result['issues'].append('no_html_part')
+
+    # 与转换时相同: 相对引用按主HTML、样式表或框架各自的位置解析,样式表和框架中的引用递归查找
+    resources = LazyResources()
+    resources.base_url = parts[html_index].location if html_index is not None else None
+    for index, part in enumerate(parts):
+        if index != html_index and (part.location or part.content_id):
+            resources.add(part)
+    referenced, texts = find_referenced_parts(html, resources)
+    referenced_ids = {id(part) for part in referenced}
+    unreferenced = [index for index, part in enumerate(parts)
+                    if index != html_index and id(part) not in referenced_ids]
+    result['unreferenced'] = unreferenced
+    result['unreferenced_bytes'] = sum(parts[index].encoded_size() for index in unreferenced)
+
+    # 外部URL在主HTML和所有样式表、框架HTML中查找
+    corpus = [html]
+    for index, part in enumerate(parts):
+        if index != html_index and part.content_type in ('text/css', 'text/html'):
+            corpus.append(texts[id(part)] if id(part) in texts else decode_part_text(mm, part))
+    corpus = '\n'.join(corpus)
+
+    locations = {part.location for part in parts if part.location}
+    external = sorted({url for url in find_resource_urls(corpus) if url not in locations})
+    result['external_url_count'] = len(external)
+    result['external_urls'] = external[:MAX_EXTERNAL_URLS]
+
+    result['generator'] = detect_generator(top_headers, html[:SNIFF_BYTES])
+
+    # 截断迹象: 缺少结束分隔符、最后一个part的base64不完整、HTML未闭合
+    if mm.rfind(boundary + b'--') == -1:
+        result['issues'].append('missing_final_boundary')
+    if parts and base64_incomplete(mm, parts[-1]):
+        result['issues'].append('base64_incomplete')
+    if html and '</html' not in html[-4096:].lower():
+        result['issues'].append('html_unclosed')
+    result['truncated'] = any(issue in result['issues']
+                              for issue in ('missing_final_boundary', 'base64_incomplete'))
+
+
+def inspect_mht_file(path):
+    """检查单个文件,返回可序列化为JSON的字典;出错时包含 'error'"""
+    start = time.perf_counter()
+    result = {
+        'path': path,
+        'size': None,
+        'kind': None,
+        'generator': None,
+        'boundary': None,
+        'parts': [],
+        'unreferenced': [],
+        'unreferenced_bytes': 0,
+        'external_url_count': 0,
+        'external_urls': [],
+        'truncated': False,
+        'issues': [],
+    }
+    try:
+        result['size'] = size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            result['kind'] = sniff_kind(f.read(SNIFF_BYTES))
+            if result['kind'] == 'mht' and size:
+                # 解析函数会打印进度信息,检查结果写到标准输出时不能混入
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                        contextlib.redirect_stdout(io.StringIO()):
+                    inspect_mapped(mm, result)
+            elif result['kind'] != 'html':
+                result['issues'].append('not_mht')
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = round(time.perf_counter() - start, 6)
+    return result
+
+
+def find_files(paths, extensions=('.mht', '.mhtml'), recursive=True):
+    """展开文件和目录参数;目录中只收集扩展名在 extensions 中的文件(为None时收集全部)"""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if extensions is None or os.path.splitext(name)[1].lower() in extensions:
+                    yield os.path.join(root, name)
+            if not recursive:
+                break
+
+
+def iter_inspect(paths, workers=None, chunksize=32):
+    """按输入顺序产出每个文件的检查结果,workers 大于1时在进程池中并行"""
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        for path in paths:
+            yield inspect_mht_file(path)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(inspect_mht_file, paths, chunksize=chunksize)
@@ -0,0 +1,554 @@
+"""转换流程的分阶段计时与批量性能报告
+
+DocumentMetrics 记录单个文档各阶段的耗时(time.monotonic)和字节数,
+BatchReport 汇总一批文档,给出各阶段 p50/p95/max、最慢的文件和吞吐,
+并可导出为 JSON、CSV 以及 Prometheus 文本格式(供 node exporter 的
+textfile collector 采集).
+"""
+import os
+import sys
+import csv
+import json
+import math
+import time
+from contextlib import contextmanager, nullcontext
+from urllib.parse import urlsplit
+
+try:
+    import psutil
+except ImportError:  # 可选依赖,缺失时使用平台相关的回退实现
+    psutil = None
+
+# 报告中各阶段的固定顺序,未列出的阶段排在后面
+STAGE_ORDER = ('read', 'decode', 'parse', 'images', 'temp_write',
+               'load', 'optimize', 'print', 'verify', 'postprocess', 'link')
+
+# Prometheus 中没有状态的文档使用的 status 标签值
+UNKNOWN_STATUS = 'unknown'
+
+
+def percentile(values, fraction):
+    """最近秩法百分位数,values 为空时返回0"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def ordered_stages(names):
+    return sorted(names, key=lambda name: (STAGE_ORDER.index(name) if name in STAGE_ORDER else len(STAGE_ORDER), name))
+
+
+def measure(metrics, name, nbytes=0):
+    """metrics 为 None 时不计时,便于在可选计时的函数中使用"""
+    if metrics is None:
+        return nullcontext()
+    return metrics.stage(name, nbytes)
+
+
+def process_rss(pid):
+    """返回进程的常驻内存(字节),无法获取时返回None"""
+    if not pid:
+        return None
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except (psutil.Error, OSError):
+            return None
+    if sys.platform.startswith('linux'):
+        try:
+            with open(f'/proc/{pid}/status', 'r', encoding='ascii', errors='ignore') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) * 1024
+        except (OSError, ValueError, IndexError):
+            return None
+        return None
+    if sys.platform == 'win32':
+        return _windows_working_set(pid)
+    return None
+
+
+def available_memory():
+    """返回系统可用内存(字节),无法获取时返回None"""
+    if psutil is not None:
+        return psutil.virtual_memory().available
+    if sys.platform.startswith('linux'):
+        try:
+            with open('/proc/meminfo', 'r', encoding='ascii', errors='ignore') as f:
+                for line in f:
+                    if line.startswith('MemAvailable:'):
+                        return int(line.split()[1]) * 1024
+        except (OSError, ValueError, IndexError):
+            return None
+        return None
+    if sys.platform == 'win32':
+        return _windows_available_memory()
+    return None
+
+
+def cpu_percent():
+    """返回自上次调用以来的系统CPU使用率(0-100),无法获取时返回None
+
+    没有psutil时用1分钟平均负载除以CPU数近似.
+    """
+    if psutil is not None:
+        return psutil.cpu_percent(interval=None)
+    if hasattr(os, 'getloadavg'):
+        try:
+            return min(100.0, os.getloadavg()[0] / (os.cpu_count() or 1) * 100)
+        except OSError:
+            return None
+    return None
+
+
+def _windows_available_memory():
+    """通过 GlobalMemoryStatusEx 读取可用物理内存"""
+    import ctypes
+    from ctypes import wintypes
+
+    class MEMORYSTATUSEX(ctypes.Structure):
+        _fields_ = [('dwLength', wintypes.DWORD), ('dwMemoryLoad', wintypes.DWORD),
+                    ('ullTotalPhys', ctypes.c_ulonglong), ('ullAvailPhys', ctypes.c_ulonglong),
+                    ('ullTotalPageFile', ctypes.c_ulonglong), ('ullAvailPageFile', ctypes.c_ulonglong),
+                    ('ullTotalVirtual', ctypes.c_ulonglong), ('ullAvailVirtual', ctypes.c_ulonglong),
+                    ('ullAvailExtendedVirtual', ctypes.c_ulonglong)]
+
+    status = MEMORYSTATUSEX()
+    status.dwLength = ctypes.sizeof(status)
+    if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+        return status.ullAvailPhys
+    return None
+
+
+def _windows_working_set(pid):
+    """通过 K32GetProcessMemoryInfo 读取进程工作集大小"""
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                    ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+    kernel32 = ctypes.windll.kernel32
+    handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+    if not handle:
+        return None
+    try:
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        if kernel32.K32GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+        return None
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+class DocumentMetrics:
+    """单个文档的分阶段耗时(秒)与字节计数
+
+    同步阶段使用 stage() 上下文管理器,嵌套阶段的耗时不会重复计入外层阶段;
+    跨Qt回调的阶段使用 begin()/end().同一阶段多次计时会累加.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.started = time.monotonic()
+        self.finished = None
+        self.status = None
+        self.error = None
+        self.seconds = {}
+        self.bytes = {}
+        self.blocked_urls = []  # 离线模式下被拦截的远程URL
+        self._open = {}
+        self._nested = []
+
+    def add(self, name, seconds, nbytes=0):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        if nbytes:
+            self.bytes[name] = self.bytes.get(name, 0) + nbytes
+
+    def add_bytes(self, name, nbytes):
+        self.bytes[name] = self.bytes.get(name, 0) + nbytes
+
+    def add_blocked_urls(self, urls):
+        self.blocked_urls.extend(urls)
+
+    @contextmanager
+    def stage(self, name, nbytes=0):
+        start = time.monotonic()
+        self._nested.append(0.0)
+        try:
+            yield self
+        finally:
+            elapsed = time.monotonic() - start
+            self.add(name, elapsed - self._nested.pop(), nbytes)
+            if self._nested:
+                self._nested[-1] += elapsed
+
+    def begin(self, name):
+        self._open[name] = time.monotonic()
+
+    def end(self, name, nbytes=0):
+        start = self._open.pop(name, None)
+        if start is not None:
+            self.add(name, time.monotonic() - start, nbytes)
+
+    def finish(self, status, error=None):
+        """结束计时,status 为 'ok' 或失败类型"""
+        if self.finished is None:
+            self.finished = time.monotonic()
+            self.status = status
+            self.error = error
+
+    @property
+    def total_seconds(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    def to_dict(self):
+        return {
+            'source': str(self.source),
+            'status': self.status,
+            'error': self.error,
+            'total_seconds': round(self.total_seconds, 6),
+            'stages': {name: round(self.seconds[name], 6) for name in ordered_stages(self.seconds)},
+            'bytes': {name: self.bytes[name] for name in ordered_stages(self.bytes)},
+            'blocked_urls': self.blocked_urls,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """从 to_dict() 的结果恢复,用于合并报告"""
+        metrics = cls(data['source'])
+        metrics.started = 0.0
+        metrics.finished = data['total_seconds']
+        metrics.status = data.get('status')
+        metrics.error = data.get('error')
+        metrics.seconds = dict(data.get('stages', {}))
+        metrics.bytes = dict(data.get('bytes', {}))
+        metrics.blocked_urls = list(data.get('blocked_urls', []))
+        return metrics
+
+
+class BatchReport:
+    """一批文档的性能汇总"""
+
+    def __init__(self, slowest=10):
+        self.slowest = slowest
+        self.started = time.monotonic()
+        self.started_wall = time.time()
+        self.finished = None
+        self.documents = []
+        self.memory_samples = []
+        self.concurrency_changes = []
+        self.first_pdf_seconds = None  # 从批量开始到第一个PDF生成
+        self.time_to_first_pdf = None  # 从进程/转换器启动到第一个PDF生成(冷启动)
+        self.warm_up_seconds = None
+        self.shards = []  # 分片运行时为 ['i/N'],合并报告中为所有参与合并的分片
+
+    def add(self, metrics):
+        self.documents.append(metrics)
+
+    def add_memory_sample(self, renderer_pid, renderer_rss, recycled_reason=None):
+        """记录一次内存采样,recycled_reason 非空表示本次采样后回收了渲染页面"""
+        self.memory_samples.append({
+            'document': len(self.documents),
+            'elapsed_seconds': round(time.monotonic() - self.started, 3),
+            'renderer_pid': renderer_pid,
+            'renderer_rss': renderer_rss,
+            'process_rss': process_rss(os.getpid()),
+            'recycled': recycled_reason,
+        })
+
+    def mark_first_pdf(self, time_to_first_pdf=None, warm_up_seconds=None):
+        """记录第一个PDF生成的时间,之后的调用被忽略"""
+        if self.first_pdf_seconds is not None:
+            return
+        self.first_pdf_seconds = time.monotonic() - self.started
+        self.time_to_first_pdf = time_to_first_pdf
+        self.warm_up_seconds = warm_up_seconds
+
+    def startup_summary(self):
+        return {
+            'first_pdf_seconds': self.first_pdf_seconds and round(self.first_pdf_seconds, 6),
+            'time_to_first_pdf_seconds': self.time_to_first_pdf and round(self.time_to_first_pdf, 6),
+            'warm_up_seconds': self.warm_up_seconds and round(self.warm_up_seconds, 6),
+        }
+
+    def add_concurrency_change(self, old, new, reason):
+        """记录一次并发数调整"""
+        self.concurrency_changes.append({
+            'document': len(self.documents),
+            'elapsed_seconds': round(time.monotonic() - self.started, 3),
+            'from': old,
+            'to': new,
+            'reason': reason,
+        })
+
+    def blocked_summary(self, top=10):
+        """离线模式下被拦截的请求数及最常见的主机"""
+        hosts = {}
+        for doc in self.documents:
+            for url in doc.blocked_urls:
+                host = urlsplit(url).hostname or url
+                hosts[host] = hosts.get(host, 0) + 1
+        return {
+            'documents': sum(1 for doc in self.documents if doc.blocked_urls),
+            'requests': sum(len(doc.blocked_urls) for doc in self.documents),
+            'hosts': dict(sorted(hosts.items(), key=lambda item: item[1], reverse=True)[:top]),
+        }
+
+    def memory_summary(self):
+        renderer = [sample['renderer_rss'] for sample in self.memory_samples if sample['renderer_rss']]
+        process = [sample['process_rss'] for sample in self.memory_samples if sample['process_rss']]
+        return {
+            'samples': len(self.memory_samples),
+            'recycles': sum(1 for sample in self.memory_samples if sample['recycled']),
+            'max_renderer_rss': max(renderer) if renderer else None,
+            'max_process_rss': max(process) if process else None,
+        }
+
+    def finish(self):
+        if self.finished is None:
+            self.finished = time.monotonic()
+
+    @property
+    def wall_seconds(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    def stage_names(self):
+        names = set()
+        for doc in self.documents:
+            names.update(doc.seconds)
+        return ordered_stages(names)
+
+    def summary(self):
+        """汇总为可序列化的字典"""
+        wall = self.wall_seconds
+        input_bytes = sum(doc.bytes.get('read', 0) for doc in self.documents)
+        statuses = {}
+        for doc in self.documents:
+            statuses[doc.status] = statuses.get(doc.status, 0) + 1
+
+        stages = {}
+        for name in self.stage_names():
+            values = [doc.seconds[name] for doc in self.documents if name in doc.seconds]
+            stages[name] = {
+                'count': len(values),
+                'sum': round(sum(values), 6),
+                'p50': round(percentile(values, 0.50), 6),
+                'p95': round(percentile(values, 0.95), 6),
+                'max': round(max(values), 6),
+                'bytes': sum(doc.bytes.get(name, 0) for doc in self.documents),
+            }
+        totals = [doc.total_seconds for doc in self.documents]
+        stages['total'] = {
+            'count': len(totals),
+            'sum': round(sum(totals), 6),
+            'p50': round(percentile(totals, 0.50), 6),
+            'p95': round(percentile(totals, 0.95), 6),
+            'max': round(max(totals), 6) if totals else 0.0,
+            'bytes': input_bytes,
+        }
+
+        slowest = sorted(self.documents, key=lambda doc: doc.total_seconds, reverse=True)[:self.slowest]
+        return {
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_wall)),
+            'wall_seconds': round(wall, 6),
+            'documents': len(self.documents),
+            'statuses': statuses,
+            'input_bytes': input_bytes,
+            'documents_per_second': round(len(self.documents) / wall, 6) if wall > 0 else 0.0,
+            'bytes_per_second': round(input_bytes / wall, 3) if wall > 0 else 0.0,
+            'stages': stages,
+            'slowest': [{'source': str(doc.source), 'total_seconds': round(doc.total_seconds, 6),
+                         'status': doc.status} for doc in slowest],
+            'memory': self.memory_summary(),
+            'startup': self.startup_summary(),
+            'pdf': {
+                'postprocessed': sum(1 for doc in self.documents if 'pdf_after' in doc.bytes),
+                'bytes_before': sum(doc.bytes.get('pdf_before', 0) for doc in self.documents),
+                'bytes_after': sum(doc.bytes.get('pdf_after', 0) for doc in self.documents),
+            },
+            'resources': {
+                'referenced_bytes': sum(doc.bytes.get('resources_referenced', 0) for doc in self.documents),
+                'unused_bytes': sum(doc.bytes.get('resources_unused', 0) for doc in self.documents),
+            },
+            'blocked': self.blocked_summary(),
+            'shards': self.shards,
+        }
+
+    def write_json(self, path):
+        data = self.summary()
+        data['started_timestamp'] = self.started_wall
+        data['files'] = [doc.to_dict() for doc in self.documents]
+        data['memory_samples'] = self.memory_samples
+        data['concurrency_changes'] = self.concurrency_changes
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+    @classmethod
+    def merge(cls, paths, slowest=10):
+        """合并多个 write_json 写出的报告(例如各分片的报告)
+
+        墙钟时间取最早开始到最晚结束;同一源文件出现在多个报告中时(分片重跑)以后面的报告为准.
+        """
+        report = cls(slowest)
+        documents = {}
+        spans = []
+        first_pdfs = []
+        for path in paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            start = data.get('started_timestamp')
+            if start is None:
+                start = time.mktime(time.strptime(data['started'], '%Y-%m-%dT%H:%M:%S'))
+            spans.append((start, start + data['wall_seconds']))
+            for item in data.get('files', []):
+                documents[item['source']] = DocumentMetrics.from_dict(item)
+            report.memory_samples.extend(data.get('memory_samples', []))
+            report.concurrency_changes.extend(data.get('concurrency_changes', []))
+            report.shards.extend(data.get('shards') or [os.path.basename(path)])
+            startup = data.get('startup', {})
+            if startup.get('first_pdf_seconds') is not None:
+                first_pdfs.append((start + startup['first_pdf_seconds'], startup))
+
+        report.documents = list(documents.values())
+        if spans:
+            report.started_wall = min(start for start, _ in spans)
+            report.started = 0.0
+            report.finished = max(end for _, end in spans) - report.started_wall
+        if first_pdfs:
+            first, startup = min(first_pdfs, key=lambda item: item[0])
+            report.first_pdf_seconds = first - report.started_wall
+            report.time_to_first_pdf = startup.get('time_to_first_pdf_seconds')
+            report.warm_up_seconds = startup.get('warm_up_seconds')
+        return report
+
+    def write_csv(self, path):
+        """每个文档一行,各阶段耗时与字节数各占一列"""
+        stages = self.stage_names()
+        byte_stages = ordered_stages({name for doc in self.documents for name in doc.bytes})
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['source', 'status', 'total_seconds'] +
+                            [f'{name}_seconds' for name in stages] +
+                            [f'{name}_bytes' for name in byte_stages] + ['blocked_requests', 'error'])
+            for doc in self.documents:
+                writer.writerow([doc.source, doc.status, f'{doc.total_seconds:.6f}'] +
+                                [f'{doc.seconds[name]:.6f}' if name in doc.seconds else '' for name in stages] +
+                                [doc.bytes.get(name, '') for name in byte_stages] +
+                                [len(doc.blocked_urls), doc.error or ''])
+
+    def prometheus_text(self, prefix='mht2pdf'):
+        data = self.summary()
+        lines = [
+            f'# HELP {prefix}_batch_documents Documents processed in the last batch by status.',
+            f'# TYPE {prefix}_batch_documents gauge',
+        ]
+        # 未结束的文档没有状态,归入固定的标签值
+        labels = {}
+        for status, count in data['statuses'].items():
+            label = status or UNKNOWN_STATUS
+            labels[label] = labels.get(label, 0) + count
+        for status, count in sorted(labels.items()):
+            lines.append(f'{prefix}_batch_documents{{status="{status}"}} {count}')
+        lines += [
+            f'# HELP {prefix}_batch_wall_seconds Wall-clock duration of the last batch.',
+            f'# TYPE {prefix}_batch_wall_seconds gauge',
+            f'{prefix}_batch_wall_seconds {data["wall_seconds"]}',
+            f'# HELP {prefix}_batch_documents_per_second Throughput of the last batch.',
+            f'# TYPE {prefix}_batch_documents_per_second gauge',
+            f'{prefix}_batch_documents_per_second {data["documents_per_second"]}',
+            f'# HELP {prefix}_batch_input_bytes_per_second Input bytes read per second in the last batch.',
+            f'# TYPE {prefix}_batch_input_bytes_per_second gauge',
+            f'{prefix}_batch_input_bytes_per_second {data["bytes_per_second"]}',
+            f'# HELP {prefix}_batch_timestamp_seconds Unix time the last batch started.',
+            f'# TYPE {prefix}_batch_timestamp_seconds gauge',
+            f'{prefix}_batch_timestamp_seconds {int(self.started_wall)}',
+            f'# HELP {prefix}_stage_seconds Per-document stage duration in the last batch.',
+            f'# TYPE {prefix}_stage_seconds summary',
+        ]
+        for name, stats in data['stages'].items():
+            lines.append(f'{prefix}_stage_seconds{{stage="{name}",quantile="0.5"}} {stats["p50"]}')
+            lines.append(f'{prefix}_stage_seconds{{stage="{name}",quantile="0.95"}} {stats["p95"]}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {stats["sum"]}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {stats["count"]}')
+        lines += [
+            f'# HELP {prefix}_stage_max_seconds Slowest per-document stage duration in the last batch.',
+            f'# TYPE {prefix}_stage_max_seconds gauge',
+        ]
+        for name, stats in data['stages'].items():
+            lines.append(f'{prefix}_stage_max_seconds{{stage="{name}"}} {stats["max"]}')
+        lines += [
+            f'# HELP {prefix}_stage_bytes Bytes handled per stage in the last batch.',
+            f'# TYPE {prefix}_stage_bytes gauge',
+        ]
+        for name, stats in data['stages'].items():
+            if stats['bytes']:
+                lines.append(f'{prefix}_stage_bytes{{stage="{name}"}} {stats["bytes"]}')
+        for key, help_text in (
+                ('first_pdf_seconds', 'Seconds from batch start to the first PDF.'),
+                ('time_to_first_pdf_seconds', 'Seconds from converter startup to the first PDF.'),
+                ('warm_up_seconds', 'Seconds spent warming up the renderer.')):
+            value = data['startup'][key]
+            if value is not None:
+                lines += [
+                    f'# HELP {prefix}_{key} {help_text}',
+                    f'# TYPE {prefix}_{key} gauge',
+                    f'{prefix}_{key} {value}',
+                ]
+        pdf = data['pdf']
+        if pdf['postprocessed']:
+            lines += [
+                f'# HELP {prefix}_pdf_bytes Total size of post-processed PDFs before and after optimization.',
+                f'# TYPE {prefix}_pdf_bytes gauge',
+                f'{prefix}_pdf_bytes{{phase="before"}} {pdf["bytes_before"]}',
+                f'{prefix}_pdf_bytes{{phase="after"}} {pdf["bytes_after"]}',
+            ]
+        if data['blocked']['requests']:
+            lines += [
+                f'# HELP {prefix}_blocked_requests Remote requests blocked in offline mode in the last batch.',
+                f'# TYPE {prefix}_blocked_requests gauge',
+                f'{prefix}_blocked_requests {data["blocked"]["requests"]}',
+            ]
+        memory = data['memory']
+        lines += [
+            f'# HELP {prefix}_renderer_recycles Renderer pages recycled in the last batch.',
+            f'# TYPE {prefix}_renderer_recycles gauge',
+            f'{prefix}_renderer_recycles {memory["recycles"]}',
+        ]
+        for key, help_text in (('max_renderer_rss', 'Peak sampled renderer process RSS in the last batch.'),
+                               ('max_process_rss', 'Peak sampled converter process RSS in the last batch.')):
+            if memory[key] is not None:
+                lines += [
+                    f'# HELP {prefix}_{key}_bytes {help_text}',
+                    f'# TYPE {prefix}_{key}_bytes gauge',
+                    f'{prefix}_{key}_bytes {memory[key]}',
+                ]
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """先写临时文件再改名,避免采集到写了一半的文件"""
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8', newline='\n') as f:
+            f.write(self.prometheus_text())
+        os.replace(temp_path, path)
+
+    def write_all(self, directory, basename=None, prometheus_name='mht2pdf.prom'):
+        """在目录中写出 JSON/CSV 报告和 Prometheus 文件,返回写出的路径列表"""
+        self.finish()
+        os.makedirs(directory, exist_ok=True)
+        if basename is None:
+            basename = 'mht2pdf_batch_' + time.strftime('%Y%m%d_%H%M%S', time.localtime(self.started_wall))
+        paths = [os.path.join(directory, f'{basename}.json'),
+                 os.path.join(directory, f'{basename}.csv'),
+                 os.path.join(directory, prometheus_name)]
+        self.write_json(paths[0])
+        self.write_csv(paths[1])
+        self.write_prometheus(paths[2])
+        return paths
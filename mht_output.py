@@ -0,0 +1,211 @@
+"""批量输出的事务式写入(不依赖Qt)
+
+PDF先写到同目录下的 .part 临时文件(文件名含进程号和随机串,并行运行的多个进程互不覆盖),
+校验文件头和结尾标记后 fsync,再用 os.replace 原子地替换为最终文件名;
+崩溃或中断只会留下 .part 文件,不会出现截断的PDF.
+
+删除原始文件由 OutputCommitter 延迟到检查点执行:检查点先 fsync 已提交的PDF及其目录,
+确认输出已落盘后才删除对应的原始文件.
+
+resolve_output_paths 处理输出文件名冲突,例如同一目录中的 a.mht 和 a.mhtml 都对应 a.pdf.
+write_result 以同样的方式写出PDF及其缩略图.
+"""
+import os
+import uuid
+
+# 临时输出文件的后缀
+PART_SUFFIX = '.part'
+
+# 校验PDF结尾标记时读取的末尾字节数
+PDF_TRAILER_BYTES = 1024
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# 累积多少个待删除的原始文件后执行一次检查点
+DEFAULT_CHECKPOINT_FILES = 100
+
+
+def part_path_for(final_path):
+    """返回 final_path 对应的临时文件路径,与最终文件在同一目录以保证重命名是原子的"""
+    return f"{final_path}.{os.getpid()}-{uuid.uuid4().hex[:8]}{PART_SUFFIX}"
+
+
+def validate_pdf(path):
+    """检查PDF是否完整,返回问题描述,完整时返回 None"""
+    size = os.path.getsize(path)
+    if size == 0:
+        return "PDF文件为空"
+    with open(path, 'rb') as f:
+        if not f.read(1024).lstrip().startswith(b'%PDF-'):
+            return "缺少PDF文件头"
+        f.seek(max(0, size - PDF_TRAILER_BYTES))
+        if b'%%EOF' not in f.read():
+            return "缺少PDF结尾标记,文件可能被截断"
+    return None
+
+
+def validate_png(path):
+    """检查PNG是否完整,返回问题描述,完整时返回 None"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        if f.read(8) != PNG_SIGNATURE:
+            return "缺少PNG文件头"
+        f.seek(max(0, size - 12))
+        if b'IEND' not in f.read():
+            return "缺少PNG结尾标记,文件可能被截断"
+    return None
+
+
+def fsync_file(path):
+    """把文件内容刷新到磁盘"""
+    with open(path, 'rb+') as f:
+        os.fsync(f.fileno())
+
+
+def fsync_directory(path):
+    """把目录项(重命名结果)刷新到磁盘;Windows不支持打开目录,由NTFS日志保证"""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(path or '.', os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def discard_part(part_path):
+    """删除未提交的临时文件"""
+    try:
+        os.remove(part_path)
+    except FileNotFoundError:
+        pass
+
+
+def commit_output(part_path, final_path, validate=validate_pdf):
+    """校验并 fsync 临时文件,再原子地替换为 final_path;校验失败时删除临时文件并抛出 ValueError"""
+    try:
+        problem = validate(part_path)
+    except OSError:
+        discard_part(part_path)
+        raise
+    if problem:
+        discard_part(part_path)
+        raise ValueError(problem)
+    fsync_file(part_path)
+    os.replace(part_path, final_path)
+    return final_path
+
+
+def write_output(final_path, data, validate=validate_pdf):
+    """把PDF(或由 validate 校验的其他)数据经临时文件原子地写入 final_path"""
+    os.makedirs(os.path.dirname(final_path) or '.', exist_ok=True)
+    part_path = part_path_for(final_path)
+    try:
+        with open(part_path, 'wb') as f:
+            f.write(data)
+    except OSError:
+        discard_part(part_path)
+        raise
+    return commit_output(part_path, final_path, validate)
+
+
+def write_result(pdf_path, result):
+    """写出 ConversionResult 的PDF及其缩略图(与PDF同名、后缀见 ThumbnailOptions),返回写出的路径"""
+    paths = [write_output(pdf_path, result.pdf)]
+    stem = os.path.splitext(pdf_path)[0]
+    for suffix, png in result.thumbnails:
+        paths.append(write_output(stem + suffix, png, validate_png))
+    return paths
+
+
+def resolve_output_paths(sources, output_path):
+    """返回 {源文件: PDF路径},output_path(源文件) 给出默认路径
+
+    多个源文件对应同一PDF时,按源文件路径排序后第一个保留默认名,
+    其余在文件名后加原扩展名(a.mhtml -> a_mhtml.pdf),仍冲突时再加序号.
+    结果只取决于源文件列表,不同机器、不同次运行得到相同的映射.
+    """
+    defaults = {source: output_path(source) for source in dict.fromkeys(sources)}
+    groups = {}
+    for source, path in defaults.items():
+        groups.setdefault(os.path.normcase(os.path.abspath(path)), []).append(source)
+
+    taken = set(groups)
+    resolved = {}
+    for group in groups.values():
+        group.sort()
+        resolved[group[0]] = defaults[group[0]]
+        for source in group[1:]:
+            stem, ext = os.path.splitext(defaults[source])
+            source_ext = os.path.splitext(source)[1].lstrip('.').lower() or 'file'
+            candidate = f"{stem}_{source_ext}{ext}"
+            counter = 2
+            while os.path.normcase(os.path.abspath(candidate)) in taken:
+                candidate = f"{stem}_{source_ext}_{counter}{ext}"
+                counter += 1
+            taken.add(os.path.normcase(os.path.abspath(candidate)))
+            resolved[source] = candidate
+    return resolved
+
+
+class OutputCommitter:
+    """提交批量输出并延迟删除原始文件
+
+    commit() 原子地提交一个PDF;defer_delete() 登记输出已提交的原始文件,
+    累积 checkpoint_every 个后自动执行 checkpoint(),批量结束时需再调用一次 checkpoint().
+    """
+
+    def __init__(self, checkpoint_every=DEFAULT_CHECKPOINT_FILES):
+        self.checkpoint_every = checkpoint_every
+        self.pending = []  # [(原始文件, PDF路径)]
+        self.deleted = []
+        self.errors = []  # [(原始文件, 错误)]
+
+    def part_path(self, final_path):
+        os.makedirs(os.path.dirname(final_path) or '.', exist_ok=True)
+        return part_path_for(final_path)
+
+    def commit(self, part_path, final_path):
+        return commit_output(part_path, final_path)
+
+    def defer_delete(self, source, output_path):
+        """登记 source 在 output_path 落盘后删除,返回本次触发的检查点删除的文件"""
+        self.pending.append((source, output_path))
+        if len(self.pending) >= self.checkpoint_every:
+            return self.checkpoint()
+        return []
+
+    def checkpoint(self):
+        """fsync 待删除原始文件对应的PDF和目录,然后删除原始文件,返回删除的文件列表"""
+        pending, self.pending = self.pending, []
+        confirmed = []
+        directories = set()
+        for source, output_path in pending:
+            # 输出提交后可能被后处理替换,这里重新校验并刷新当前文件
+            try:
+                problem = validate_pdf(output_path)
+                if problem:
+                    raise ValueError(problem)
+                fsync_file(output_path)
+            except (OSError, ValueError) as e:
+                self.errors.append((source, f"输出未确认,保留原始文件: {e}"))
+                continue
+            directories.add(os.path.dirname(os.path.abspath(output_path)))
+            confirmed.append(source)
+
+        for directory in directories:
+            try:
+                fsync_directory(directory)
+            except OSError:
+                pass
+
+        deleted = []
+        for source in confirmed:
+            try:
+                os.remove(source)
+            except OSError as e:
+                self.errors.append((source, str(e)))
+            else:
+                deleted.append(source)
+        self.deleted.extend(deleted)
+        return deleted
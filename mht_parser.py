@@ -0,0 +1,1182 @@
+"""MHT文件解析与预处理
+
+本模块不依赖Qt,GUI与无界面转换器(mht_converter)共用.
+"""
+import os
+import re
+import mmap
+import html
+import tempfile
+import binascii
+from pathlib import Path
+from collections.abc import Mapping
+from urllib.parse import urljoin, urlsplit, unquote
+
+from mht_metrics import measure
+
+# 尝试读取MHT文件时使用的编码顺序
+MHT_ENCODINGS = ['utf-8', 'gbk', 'gb2312', 'gb18030', 'utf-16', 'latin1']
+
+# HTML part未声明或声明错误字符集时依次尝试的编码
+HTML_CHARSETS = ['utf-8', 'gbk', 'gb2312', 'gb18030']
+
+# base64正文每批解码的行数(76字符/行时约38KB)
+BASE64_BATCH_LINES = 512
+
+# 超过该大小的MHT使用内存映射的大文件模式
+LARGE_FILE_THRESHOLD = 64 * 1024 * 1024
+
+# 大文件模式下单个文档常驻内存的解码数据上限
+DEFAULT_MEMORY_BUDGET = 512 * 1024 * 1024
+
+# 大文件模式下解码后超过该大小的资源直接写入临时目录
+SPILL_THRESHOLD = 1024 * 1024
+
+# 大文件模式下每次从映射中解码的字节数
+MMAP_CHUNK_SIZE = 4 * 1024 * 1024
+
+# 大文件模式下查找part头部结束位置时优先搜索的字节数
+HEADER_SEARCH_BYTES = 16 * 1024
+
+# HTML属性中可能引用MHT资源的属性值
+HTML_REFERENCE_PATTERN = re.compile(
+    r'''(\b(?:src|href|background|data|poster|lowsrc)\s*=\s*)(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))''',
+    re.IGNORECASE)
+HTML_SRCSET_PATTERN = re.compile(r'''(\bsrcset\s*=\s*)(?:"([^"]*)"|'([^']*)')''', re.IGNORECASE)
+
+# CSS中的 url() 和 @import 引用
+CSS_URL_PATTERN = re.compile(r'''(url\(\s*)(?:"([^"]*)"|'([^']*)'|([^\s"')]+))(\s*\))''', re.IGNORECASE)
+CSS_IMPORT_PATTERN = re.compile(r'''(@import\s+)(?:"([^"]*)"|'([^']*)')''', re.IGNORECASE)
+CSS_CHARSET_PATTERN = re.compile(r'''^\ufeff?\s*@charset\s+["'][^"']*["']\s*;''', re.IGNORECASE)
+
+# 渐进式预览禁止加载任何资源,只显示文本和内联样式
+PREVIEW_CSP_META = ('<meta http-equiv="Content-Security-Policy" '
+                    'content="default-src \'none\'; style-src \'unsafe-inline\'">')
+HEAD_TAG_PATTERN = re.compile(r'<head\b[^>]*>', re.IGNORECASE)
+
+# HTML中的字符集声明,预处理后的文件统一以UTF-8写出
+META_CHARSET_PATTERN = re.compile(r'''(<meta\b[^>]*?\bcharset\s*=\s*["']?)([\w.:-]+)''', re.IGNORECASE)
+
+# 按Content-Type确定保存资源时使用的扩展名,file://加载时Chromium按扩展名判断类型
+RESOURCE_EXTENSIONS = {
+    'text/html': '.html', 'text/css': '.css',
+    'text/javascript': '.js', 'application/javascript': '.js', 'application/x-javascript': '.js',
+    'image/png': '.png', 'image/jpeg': '.jpg', 'image/pjpeg': '.jpg', 'image/gif': '.gif',
+    'image/bmp': '.bmp', 'image/webp': '.webp', 'image/svg+xml': '.svg', 'image/x-icon': '.ico',
+    'image/vnd.microsoft.icon': '.ico', 'image/x-wmf': '.wmf', 'image/x-emz': '.emz',
+    'font/woff': '.woff', 'font/woff2': '.woff2', 'font/ttf': '.ttf', 'font/otf': '.otf',
+    'application/font-woff': '.woff', 'application/font-woff2': '.woff2', 'application/x-font-woff': '.woff',
+    'application/x-font-ttf': '.ttf', 'application/font-sfnt': '.ttf', 'application/x-font-otf': '.otf',
+    'application/vnd.ms-fontobject': '.eot',
+}
+
+# 常见的MHT boundary行前缀(IE/Word等)
+BOUNDARY_PREFIXES = ('------=', '----boundary', '--======')
+
+# 找不到HTML part时,按顺序搜索的HTML起始标记
+HTML_START_PATTERNS = ('<html', '<HTML', '<!DOCTYPE', '<!doctype')
+
+# A4打印优化的高保真度转换CSS,预处理时注入到<head>中
+ENHANCED_CSS = """
+<style type="text/css">
+/* A4打印优化的高保真度转换CSS */
+
+/* 设置A4页面尺寸和边距 */
+@page {
+    size: A4 portrait;
+    margin: 1cm 1.5cm;
+}
+
+/* 确保颜色和背景在PDF中正确显示 */
+* {
+    -webkit-print-color-adjust: exact !important;
+    color-adjust: exact !important;
+    print-color-adjust: exact !important;
+    box-sizing: border-box !important;
+}
+
+/* 页面内容适配A4尺寸 */
+body {
+    margin: 0 !important;
+    padding: 10px !important;
+    font-family: "Microsoft YaHei", "SimSun", Arial, sans-serif !important;
+    font-size: 12px !important;
+    line-height: 1.3 !important;
+    max-width: 100% !important;
+    width: 100% !important;
+}
+
+/* 表格优化 - 适配A4宽度 */
+table {
+    width: 100% !important;
+    border-collapse: collapse !important;
+    margin: 0 auto 10px auto !important;
+    page-break-inside: avoid !important;
+    table-layout: auto !important;
+}
+
+/* 表格边框样式 */
+table, td, th {
+    border: 1px solid #000 !important;
+}
+
+td, th {
+    padding: 4px 6px !important;
+    vertical-align: top !important;
+    word-wrap: break-word !important;
+    word-break: break-all !important;
+    font-size: 12px !important;
+    line-height: 1.2 !important;
+}
+
+/* 表头样式 */
+th {
+    background-color: #f0f0f0 !important;
+    font-weight: bold !important;
+    text-align: center !important;
+}
+
+/* 图片优化 - 适配表格单元格 */
+img {
+    max-width: 120px !important;
+    max-height: 150px !important;
+    width: auto !important;
+    height: auto !important;
+    display: block !important;
+    margin: 2px auto !important;
+    page-break-inside: avoid !important;
+    object-fit: contain !important;
+}
+
+/* 标题居中 */
+h1, h2, h3 {
+    text-align: center !important;
+    margin: 10px 0 !important;
+    font-size: 16px !important;
+    font-weight: bold !important;
+}
+
+/* 文本对齐优化 */
+.text-center, [align="center"] { 
+    text-align: center !important; 
+}
+.text-left, [align="left"] { 
+    text-align: left !important; 
+}
+.text-right, [align="right"] { 
+    text-align: right !important; 
+}
+
+/* 特殊单元格样式保持 */
+[bgcolor] { 
+    background-color: attr(bgcolor) !important; 
+}
+
+/* 打印专用样式 */
+@media print {
+    /* 确保所有颜色在打印时保持 */
+    * {
+        -webkit-print-color-adjust: exact !important;
+        color-adjust: exact !important;
+        print-color-adjust: exact !important;
+    }
+    
+    /* A4页面设置 */
+    @page {
+        size: A4 portrait;
+        margin: 1cm 1.5cm;
+    }
+    
+    /* 页面内容 */
+    body {
+        margin: 0 !important;
+        padding: 5px !important;
+        width: 100% !important;
+        max-width: 100% !important;
+    }
+    
+    /* 表格在打印时的优化 */
+    table {
+        width: 100% !important;
+        page-break-inside: avoid !important;
+        border-collapse: collapse !important;
+    }
+    
+    tr {
+        page-break-inside: avoid !important;
+    }
+    
+    td, th {
+        page-break-inside: avoid !important;
+        border: 1px solid #000 !important;
+        padding: 3px 5px !important;
+        font-size: 11px !important;
+    }
+    
+    /* 图片在打印时的优化 */
+    img {
+        max-width: 100px !important;
+        max-height: 120px !important;
+        page-break-inside: avoid !important;
+    }
+    
+    /* 防止内容溢出 */
+    * {
+        overflow: visible !important;
+    }
+}
+
+/* 响应式调整 - 确保内容适配页面 */
+@media (max-width: 21cm) {
+    body {
+        font-size: 11px !important;
+    }
+    
+    td, th {
+        font-size: 11px !important;
+        padding: 3px 4px !important;
+    }
+    
+    img {
+        max-width: 100px !important;
+        max-height: 120px !important;
+    }
+}
+
+</style>
+"""
+
+
+def read_mht_file(mht_path, metrics=None):
+    """读取MHT文件并解码为文本"""
+    with measure(metrics, 'read'):
+        with open(mht_path, 'rb') as f:
+            data = f.read()
+    if metrics:
+        metrics.add_bytes('read', len(data))
+
+    with measure(metrics, 'decode'):
+        return decode_mht_bytes(data)
+
+
+def decode_mht_bytes(data):
+    """将MHT字节解码为文本,依次尝试不同的编码"""
+    for encoding in MHT_ENCODINGS:
+        try:
+            content = data.decode(encoding, errors='ignore')
+        except (UnicodeDecodeError, UnicodeError):
+            continue
+        print(f"Successfully read MHT file with encoding: {encoding}")
+        break
+    else:
+        content = data.decode('latin1', errors='replace')
+
+    # 与文本模式读取一致,统一换行符
+    return content.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def preprocess_mht_file(mht_path, temp_dir=None, metrics=None, memory_budget=None,
+                        large_file_threshold=LARGE_FILE_THRESHOLD, on_preview=None):
+    """预处理MHT文件以更好地保持样式和图片,返回处理后的HTML路径
+
+    文件大小达到 large_file_threshold 时使用大文件模式(见 preprocess_large_mht_file),
+    超出内存预算时抛出 MemoryBudgetExceeded.
+    给出 on_preview 时,主HTML解码后、保存资源前先写出纯文本预览并调用 on_preview(预览路径).
+    """
+    try:
+        if large_file_threshold and os.path.getsize(mht_path) >= large_file_threshold:
+            return preprocess_large_mht_file(mht_path, temp_dir, metrics, memory_budget, on_preview=on_preview)
+        content = read_mht_file(mht_path, metrics)
+        return preprocess_mht_content(content, temp_dir, metrics, on_preview)
+    except MemoryBudgetExceeded:
+        raise
+    except Exception as e:
+        print(f"Error preprocessing MHT file: {e}")
+        return None
+
+
+def preprocess_mht_content(content, temp_dir=None, metrics=None, on_preview=None):
+    """预处理已读入的MHT文本,写出临时HTML文件并返回其路径"""
+    try:
+        # 创建临时文件夹
+        if temp_dir is None:
+            temp_dir = tempfile.mkdtemp()
+        temp_html_path = os.path.join(temp_dir, "processed.html")
+
+        with measure(metrics, 'parse'):
+            # 解析MHT格式,提取HTML和图片
+            html_content, images = extract_html_and_images_from_mht(content, metrics)
+
+            if html_content:
+                # 将图片保存到临时目录并更新HTML中的引用
+                if images:
+                    if on_preview:
+                        on_preview(write_preview_html(html_content, temp_dir))
+                    with measure(metrics, 'images'):
+                        html_content = process_mht_resources(html_content, images, temp_dir, metrics)
+
+                html_content = inject_enhanced_css(html_content)
+
+        if html_content:
+            # 写入处理后的HTML文件
+            encoded = html_content.encode('utf-8', errors='replace')
+            with measure(metrics, 'temp_write', len(encoded)):
+                with open(temp_html_path, 'wb') as f:
+                    f.write(encoded)
+
+            return temp_html_path
+
+        return None
+
+    except Exception as e:
+        print(f"Error preprocessing MHT file: {e}")
+        return None
+
+
+def write_preview_html(html_content, temp_dir):
+    """写出只含文本和内联样式的预览HTML(不加载任何资源),返回其路径"""
+    match = HEAD_TAG_PATTERN.search(html_content)
+    pos = match.end() if match else 0
+    preview = inject_enhanced_css(html_content[:pos] + PREVIEW_CSP_META + html_content[pos:])
+    path = os.path.join(temp_dir, "preview.html")
+    with open(path, 'wb') as f:
+        f.write(preview.encode('utf-8', errors='replace'))
+    return path
+
+
+def inject_enhanced_css(html_content):
+    """补充编码声明并在head标签中插入A4打印优化CSS"""
+    # 确保HTML有正确的编码声明;正文已解码,写出时为UTF-8,原有声明(如gbk)一并改为UTF-8
+    html_content = declare_utf8(html_content)
+    if '<meta charset=' not in html_content.lower() and '<meta http-equiv="content-type"' not in html_content.lower():
+        charset_meta = '<meta charset="UTF-8">\n'
+        if '<head>' in html_content:
+            html_content = html_content.replace('<head>', f'<head>\n{charset_meta}')
+        elif '<HEAD>' in html_content:
+            html_content = html_content.replace('<HEAD>', f'<HEAD>\n{charset_meta}')
+
+    # 在head标签中插入CSS
+    if '<head>' in html_content:
+        html_content = html_content.replace('<head>', f'<head>\n{ENHANCED_CSS}')
+    elif '<HEAD>' in html_content:
+        html_content = html_content.replace('<HEAD>', f'<HEAD>\n{ENHANCED_CSS}')
+    else:
+        # 如果没有head标签,在html标签后添加
+        if '<html' in html_content:
+            insert_pos = html_content.find('>', html_content.find('<html')) + 1
+            html_content = html_content[:insert_pos] + f'\n<head>\n{ENHANCED_CSS}\n</head>\n' + html_content[insert_pos:]
+
+    return html_content
+
+
+def declare_utf8(html_content):
+    """把HTML中meta标签声明的字符集改为UTF-8"""
+    return META_CHARSET_PATTERN.sub(lambda match: match.group(1) + 'UTF-8', html_content)
+
+
+def is_boundary_line(line):
+    """判断是否为MHT part分隔行"""
+    return line.startswith(BOUNDARY_PREFIXES)
+
+
+def parse_part_headers(lines, index):
+    """解析 index 所在part的头部,返回 (头部字典, 正文起始行)
+
+    头部名统一为小写,支持折行的头部;Content-Type 中的 charset 单独保存为 'charset'.
+    """
+    # 向前找到头部起点,兼容 Content-Type 不是第一个头部的情况
+    start = index
+    while start > 0 and lines[start - 1].strip() and not is_boundary_line(lines[start - 1]):
+        start -= 1
+
+    headers = {}
+    name = None
+    i = start
+    while i < len(lines) and lines[i].strip() != '':
+        line = lines[i]
+        if line[:1] in (' ', '\t') and name:
+            headers[name] += ' ' + line.strip()
+        elif ':' in line:
+            name, value = line.split(':', 1)
+            name = name.strip().lower()
+            headers[name] = value.strip()
+        i += 1
+
+    for key in ('content-transfer-encoding',):
+        if key in headers:
+            headers[key] = headers[key].lower()
+    content_type = headers.get('content-type', '')
+    for param in content_type.split(';')[1:]:
+        key, _, value = param.partition('=')
+        if key.strip().lower() == 'charset':
+            headers['charset'] = value.strip().strip('"\'').lower()
+
+    # 跳过空行
+    return headers, i + 1
+
+
+def find_section_end(lines, body_start):
+    """返回正文结束行(下一个boundary行或文件末尾)"""
+    i = body_start
+    count = len(lines)
+    while i < count and not lines[i].startswith(BOUNDARY_PREFIXES):
+        i += 1
+    return i
+
+
+def decode_base64_lines(lines, start, end, sink=None):
+    """分批解码base64正文
+
+    每次解码 BASE64_BATCH_LINES 行(a2b_base64会跳过换行等非编码字符,无需去除空白),
+    结果写入预分配的 bytearray 并返回;传入 sink 时直接写入 sink.write() 并返回写入的字节数.
+    """
+    buffer = view = None
+    if sink is None:
+        capacity = sum(map(len, lines[start:end]))
+        buffer = bytearray(capacity * 3 // 4 + 3)
+        view = memoryview(buffer)
+    written = 0
+
+    i = start
+    while i < end:
+        batch_end = min(i + BASE64_BATCH_LINES, end)
+        try:
+            chunk = binascii.a2b_base64('\n'.join(lines[i:batch_end]))
+        except binascii.Error:
+            # 行长度不是4的倍数等非标准换行时,批次边界可能截断编码单元,整体解码剩余部分
+            chunk = binascii.a2b_base64('\n'.join(lines[i:end]))
+            batch_end = end
+        if sink is None:
+            view[written:written + len(chunk)] = chunk
+        else:
+            sink.write(chunk)
+        written += len(chunk)
+        i = batch_end
+
+    if sink is not None:
+        return written
+    view.release()
+    del buffer[written:]
+    return buffer
+
+
+def decode_quoted_printable_lines(lines, start, end):
+    """用 binascii.a2b_qp 解码quoted-printable正文"""
+    return binascii.a2b_qp('\n'.join(lines[start:end]).encode('utf-8'))
+
+
+def decode_part_body(lines, start, end, transfer_encoding, sink=None):
+    """按 Content-Transfer-Encoding 解码part正文,返回bytes-like(或写入sink)"""
+    if transfer_encoding == 'base64':
+        return decode_base64_lines(lines, start, end, sink)
+    if transfer_encoding == 'quoted-printable':
+        data = decode_quoted_printable_lines(lines, start, end)
+    else:
+        # 7bit/8bit/binary: 原样返回正文
+        data = '\n'.join(lines[start:end]).encode('utf-8')
+    if sink is not None:
+        sink.write(data)
+        return len(data)
+    return data
+
+
+def decode_text_with_encoding(data, charset=None):
+    """按part声明的字符集解码文本,失败时依次尝试常见中文编码,返回 (文本, 使用的编码)"""
+    candidates = [charset] if charset else []
+    candidates += [encoding for encoding in HTML_CHARSETS if encoding != charset]
+    for encoding in candidates:
+        try:
+            return bytes(data).decode(encoding), encoding
+        except (UnicodeDecodeError, LookupError):
+            continue
+    return bytes(data).decode('utf-8', errors='replace'), None
+
+
+def decode_text(data, charset=None):
+    """按part声明的字符集解码文本,失败时依次尝试常见中文编码"""
+    return decode_text_with_encoding(data, charset)[0]
+
+
+def decode_html_text(data, charset=None):
+    """解码主HTML正文,并打印使用的编码"""
+    text, encoding = decode_text_with_encoding(data, charset)
+    if encoding:
+        print(f"Successfully decoded HTML with {encoding}")
+    return text
+
+
+def decode_section_text(lines, start, end, headers, decoder=decode_text):
+    """解码文本part(HTML、样式表等)的正文,decoder 为 decode_text 或 decode_html_text"""
+    if start >= end:
+        return None
+    transfer_encoding = headers.get('content-transfer-encoding')
+    charset = headers.get('charset')
+    if transfer_encoding in ('quoted-printable', 'base64'):
+        return decoder(decode_part_body(lines, start, end, transfer_encoding), charset)
+
+    text = '\n'.join(lines[start:end])
+    # 缺少传输编码头部时,沿用quoted-printable特征判断
+    if transfer_encoding is None and '=E' in text and '=9' in text:
+        return decoder(binascii.a2b_qp(text.encode('utf-8')), charset)
+    return text
+
+
+def decode_html_section(lines, start, end, headers):
+    """解码主HTML part的正文"""
+    return decode_section_text(lines, start, end, headers, decode_html_text)
+
+
+class MhtPart:
+    """MHT中的一个part,只记录头部和正文所在的行,正文在首次访问时才解码"""
+
+    def __init__(self, lines, headers, body_start, body_end):
+        self.lines = lines
+        self.headers = headers
+        self.body_start = body_start
+        self.body_end = body_end
+        self.data = None  # 解码后的正文,首次调用 decode() 后缓存
+        self.text_decoded = False  # 是否已通过 decode_text() 以文本方式解码
+
+    @property
+    def content_type(self):
+        return self.headers.get('content-type', '').split(';')[0].strip().lower()
+
+    @property
+    def location(self):
+        return self.headers.get('content-location')
+
+    @property
+    def content_id(self):
+        value = self.headers.get('content-id')
+        return value.strip('<>') if value else None
+
+    @property
+    def transfer_encoding(self):
+        return self.headers.get('content-transfer-encoding')
+
+    def encoded_size(self):
+        """正文编码后的大小(含换行)"""
+        return sum(map(len, self.lines[self.body_start:self.body_end])) + self.body_end - self.body_start
+
+    def estimated_size(self):
+        """未解码时估算的正文大小"""
+        if self.transfer_encoding == 'base64':
+            return self.encoded_size() * 3 // 4
+        return self.encoded_size()
+
+    def decode(self, metrics=None):
+        if self.data is None:
+            with measure(metrics, 'images'):
+                self.data = decode_part_body(self.lines, self.body_start, self.body_end, self.transfer_encoding)
+            if metrics:
+                metrics.add_bytes('images', len(self.data))
+        return self.data
+
+    def decode_as_text(self):
+        """把样式表、框架HTML等文本part解码为str"""
+        self.text_decoded = True
+        return decode_section_text(self.lines, self.body_start, self.body_end, self.headers) or ''
+
+    def loaded_size(self):
+        """已解码的正文大小,从未解码时为None"""
+        if self.data is not None:
+            return len(self.data)
+        return self.estimated_size() if self.text_decoded else None
+
+
+class LazyResources(Mapping):
+    """按 Content-Location 和 cid: 索引的资源表,值在首次访问时才解码
+
+    未被HTML引用的part(跟踪像素、备用分辨率图片等)永远不会被解码或写盘.
+    """
+
+    def __init__(self, metrics=None):
+        self.metrics = metrics
+        self.base_url = None  # 主HTML的Content-Location,用于解析相对引用
+        self.parts = []
+        self._by_key = {}
+        self._by_unquoted = {}
+
+    def add(self, part):
+        self.parts.append(part)
+        for key in self.part_keys(part):
+            self._by_key.setdefault(key, part)
+            self._by_unquoted.setdefault(unquote(key), part)
+
+    @staticmethod
+    def part_keys(part):
+        keys = []
+        if part.location:
+            keys.append(part.location)
+        if part.content_id:
+            keys.append(f"cid:{part.content_id}")
+        return keys
+
+    def part(self, key):
+        return self._by_key[key]
+
+    def resolve(self, reference, base=None):
+        """按引用查找part: 依次尝试原样、HTML实体解码后、相对 base 解析后的URL,找不到时返回None"""
+        reference = reference.strip()
+        if not reference or reference.startswith(('#', 'data:', 'javascript:', 'about:')):
+            return None
+        candidates = [reference]
+        unescaped = html.unescape(reference)
+        if unescaped != reference:
+            candidates.append(unescaped)
+        for candidate in candidates:
+            candidate = candidate.split('#', 1)[0]
+            urls = [candidate]
+            if base and not candidate.startswith('cid:'):
+                urls.append(urljoin(base, candidate))
+            for url in urls:
+                part = self._by_key.get(url) or self._by_unquoted.get(unquote(url))
+                if part is not None:
+                    return part
+        return None
+
+    def __getitem__(self, key):
+        return self._by_key[key].decode(self.metrics)
+
+    def __iter__(self):
+        return iter(self._by_key)
+
+    def __len__(self):
+        return len(self._by_key)
+
+    def referenced_bytes(self):
+        """已解码(被引用)资源的字节数"""
+        return sum(part.loaded_size() or 0 for part in self.parts)
+
+    def unused_bytes(self):
+        """从未解码的资源的估算字节数"""
+        return sum(part.estimated_size() for part in self.parts if part.loaded_size() is None)
+
+
+def extract_html_and_images_from_mht(content, metrics=None):
+    """从MHT内容中提取主HTML和资源表
+
+    第一个 text/html part 为主页面;其余part(图片、样式表、字体、框架HTML、脚本等)
+    按 Content-Location/Content-ID 建立索引,被引用时才解码.
+    """
+    try:
+        lines = content.split('\n')
+        html_content = None
+        images = LazyResources(metrics)
+
+        i = 0
+        while i < len(lines):
+            lowered = lines[i].lower()
+            if 'content-type:' not in lowered or 'content-type: multipart/' in lowered:
+                i += 1
+                continue
+
+            headers, body_start = parse_part_headers(lines, i)
+            body_end = find_section_end(lines, body_start)
+            part = MhtPart(lines, headers, body_start, body_end)
+
+            if part.content_type == 'text/html' and html_content is None:
+                try:
+                    html_content = decode_html_section(lines, body_start, body_end, headers)
+                    images.base_url = part.location
+                    print("Found HTML section")
+                except (binascii.Error, ValueError) as e:
+                    print(f"Error decoding HTML section: {e}")
+            elif (part.location or part.content_id) and body_start < body_end:
+                # 只建立索引,引用时才解码
+                images.add(part)
+                print(f"Found resource: {part.content_type} {part.location or part.content_id}")
+            i = max(body_end, i + 1)
+
+        # 如果没有找到HTML section,尝试简单搜索
+        if not html_content:
+            for pattern in HTML_START_PATTERNS:
+                start_pos = content.find(pattern)
+                if start_pos != -1:
+                    html_content = content[start_pos:]
+                    # 查找可能的结束boundary
+                    for boundary in BOUNDARY_PREFIXES:
+                        boundary_pos = html_content.find(boundary)
+                        if boundary_pos != -1:
+                            html_content = html_content[:boundary_pos]
+                            break
+                    print("Found HTML using simple search")
+                    break
+
+        return html_content, images
+
+    except Exception as e:
+        print(f"Error extracting HTML and images from MHT: {e}")
+        return None, {}
+
+
+def extract_section_content(lines, start_index, is_binary=False):
+    """提取MHT section的原始正文文本"""
+    try:
+        _, body_start = parse_part_headers(lines, start_index)
+        body_end = find_section_end(lines, body_start)
+        return '\n'.join(lines[body_start:body_end]) if body_start < body_end else None
+
+    except Exception as e:
+        print(f"Error extracting section content: {e}")
+        return None
+
+
+class _ResourceWriter:
+    """把被引用的part保存到临时目录,返回其本地URL
+
+    样式表和框架HTML保存前会递归改写其中的引用,相对引用按该part自身的位置解析.
+    """
+
+    def __init__(self, resources, temp_dir, metrics=None):
+        self.resources = resources
+        self.temp_dir = temp_dir
+        self.metrics = metrics
+        self.saved = {}  # id(part) -> 本地URL,同一part的多个索引(location/cid)共用一个文件
+        self.names = set()
+
+    def rewrite_html(self, text, base):
+        text = HTML_REFERENCE_PATTERN.sub(lambda match: self._replace(match, base, '"'), text)
+        text = HTML_SRCSET_PATTERN.sub(lambda match: self._replace_srcset(match, base), text)
+        # <style> 块和 style 属性中的 url()
+        return self.rewrite_css(text, base)
+
+    def rewrite_css(self, text, base):
+        text = CSS_URL_PATTERN.sub(lambda match: self._replace(match, base, '', match.group(5)), text)
+        return CSS_IMPORT_PATTERN.sub(lambda match: self._replace(match, base, ''), text)
+
+    def _replace(self, match, base, bare_quote, suffix=''):
+        # 保留原有的引号,style 属性中的 url('...') 改成双引号会提前结束属性值
+        quote, reference = next((quote, group) for quote, group in zip(('"', "'", bare_quote), match.groups()[1:4])
+                                if group is not None)
+        local_url = self.local_url(reference, base)
+        if local_url is None:
+            return match.group(0)
+        return f'{match.group(1)}{quote}{local_url}{quote}{suffix}'
+
+    def _replace_srcset(self, match, base):
+        candidates = []
+        for candidate in (match.group(2) if match.group(2) is not None else match.group(3)).split(','):
+            reference, _, descriptor = candidate.strip().partition(' ')
+            local_url = self.local_url(reference, base) if reference else None
+            candidates.append(f'{local_url or reference} {descriptor}'.strip())
+        quote = '"' if match.group(2) is not None else "'"
+        return f'{match.group(1)}{quote}{", ".join(candidates)}{quote}'
+
+    def local_url(self, reference, base):
+        part = self.resources.resolve(reference, base)
+        if part is None:
+            return None
+        key = id(part)
+        if key not in self.saved:
+            self.saved[key] = None  # 防止样式表循环引用
+            try:
+                self.saved[key] = self.save(part)
+            except (binascii.Error, ValueError, UnicodeError) as e:
+                self.saved[key] = None
+                print(f"Error decoding resource {part.location or part.content_id}: {e}")
+        return self.saved[key]
+
+    def filename(self, part, data=None):
+        """生成不重复的文件名,扩展名优先按Content-Type确定"""
+        path = '' if part.location is None or part.location.startswith('cid:') else urlsplit(part.location).path
+        stem, ext = os.path.splitext(os.path.basename(unquote(path)))
+        ext = RESOURCE_EXTENSIONS.get(part.content_type) or ext.lower()
+        if not ext and data is not None:
+            # 根据数据推测格式
+            if data.startswith(b'\xff\xd8\xff'):
+                ext = '.jpg'
+            elif data.startswith(b'\x89PNG'):
+                ext = '.png'
+            elif data.startswith(b'GIF'):
+                ext = '.gif'
+            else:
+                ext = '.jpg' if part.content_type.startswith('image/') else '.bin'
+        stem = re.sub(r'[^\w.-]', '_', stem)[:64] or 'resource'
+        name = f'{stem}{ext}'
+        index = 1
+        while name.lower() in self.names:
+            name = f'{stem}_{index}{ext}'
+            index += 1
+        self.names.add(name.lower())
+        return name
+
+    def save(self, part):
+        if part.content_type in ('text/css', 'text/html'):
+            # 先登记本地URL,样式表互相引用时直接使用
+            path = os.path.join(self.temp_dir, self.filename(part))
+            self.saved[id(part)] = local_url = Path(os.path.abspath(path)).as_uri()
+            text = part.decode_as_text()
+            if part.content_type == 'text/css':
+                text = self.rewrite_css(CSS_CHARSET_PATTERN.sub('', text), part.location)
+            else:
+                text = declare_utf8(self.rewrite_html(text, part.location))
+            data = text.encode('utf-8', errors='replace')
+            with measure(self.metrics, 'temp_write', len(data)):
+                with open(path, 'wb') as f:
+                    f.write(data)
+            print(f"Saved resource: {os.path.basename(path)}")
+            return local_url
+
+        data = part.decode(self.metrics)
+        if not data:
+            return None
+        path = os.path.join(self.temp_dir, self.filename(part, data))
+        if isinstance(data, SpilledPayload):
+            # 大文件模式下已解码到临时目录,只需改名
+            os.replace(data.path, path)
+            data.path = path
+        else:
+            with measure(self.metrics, 'temp_write', len(data)):
+                with open(path, 'wb') as f:
+                    f.write(data)
+        print(f"Saved resource: {os.path.basename(path)}")
+        return Path(os.path.abspath(path)).as_uri()
+
+
+class _ReferenceCollector(_ResourceWriter):
+    """按与 _ResourceWriter 相同的规则遍历引用(包括样式表和框架HTML中的引用),只记录被引用的part
+
+    不解码二进制正文,也不写任何文件;texts 保存遍历过的样式表和框架HTML的正文.
+    """
+
+    def __init__(self, resources):
+        super().__init__(resources, None)
+        self.texts = {}  # id(part) -> 正文
+
+    def save(self, part):
+        self.saved[id(part)] = local_url = f'part:{len(self.saved)}'
+        if part.content_type in ('text/css', 'text/html'):
+            text = self.texts[id(part)] = part.decode_as_text()
+            if part.content_type == 'text/css':
+                self.rewrite_css(text, part.location)
+            else:
+                self.rewrite_html(text, part.location)
+        return local_url
+
+
+def find_referenced_parts(html_content, resources, base_url=None):
+    """返回 (被HTML直接或间接引用的part列表, {id(part): 样式表/框架HTML正文}),解析规则与转换时相同"""
+    if base_url is None:
+        base_url = resources.base_url
+    collector = _ReferenceCollector(resources)
+    collector.rewrite_html(html_content, base_url)
+    return [part for part in resources.parts if id(part) in collector.saved], collector.texts
+
+
+def process_mht_resources(html_content, resources, temp_dir, metrics=None, base_url=None):
+    """把HTML引用的资源(图片、样式表、字体、框架、脚本)保存为本地文件并改写引用
+
+    引用按 Content-Location/cid 解析,相对引用相对 base_url(默认为主HTML的位置);
+    样式表中的 url()/@import 和框架HTML中的引用同样改写,页面加载时不再访问网络.
+    resources 为 LazyResources 时,未被引用的part不会解码.
+    """
+    try:
+        if base_url is None:
+            base_url = getattr(resources, 'base_url', None)
+        writer = _ResourceWriter(resources, temp_dir, metrics)
+        html_content = writer.rewrite_html(html_content, base_url)
+
+        if isinstance(resources, LazyResources):
+            unused = resources.unused_bytes()
+            if metrics:
+                metrics.add_bytes('resources_referenced', resources.referenced_bytes())
+                metrics.add_bytes('resources_unused', unused)
+            skipped = sum(1 for part in resources.parts if part.loaded_size() is None)
+            if skipped:
+                print(f"Skipped {skipped} unreferenced resources (~{unused:,} bytes)")
+        return html_content
+
+    except MemoryBudgetExceeded:
+        raise
+    except Exception as e:
+        print(f"Error processing MHT resources: {e}")
+        return html_content
+
+
+class MemoryBudgetExceeded(MemoryError):
+    """大文件模式下单个文档需要的内存超过预算"""
+
+
+class MemoryBudget:
+    """统计大文件模式下常驻内存的解码数据,超过上限时立即失败而不是等到系统开始换页"""
+
+    def __init__(self, limit):
+        self.limit = limit  # 字节,None或0表示不限制
+        self.used = 0
+        self.peak = 0
+
+    def charge(self, nbytes, what):
+        if self.limit and self.used + nbytes > self.limit:
+            raise MemoryBudgetExceeded(
+                f"{what}需要 {nbytes / 1024 / 1024:.1f} MB 内存, 超出单文档内存预算 "
+                f"{self.limit / 1024 / 1024:.1f} MB (已使用 {self.used / 1024 / 1024:.1f} MB)"
+            )
+        self.used += nbytes
+        self.peak = max(self.peak, self.used)
+
+    def release(self, nbytes):
+        self.used = max(0, self.used - nbytes)
+
+
+class SpilledPayload:
+    """已解码并写入临时目录的资源,代替内存中的bytes"""
+
+    def __init__(self, path, size, head):
+        self.path = path
+        self.size = size
+        self.head = head  # 开头的若干字节,用于判断图片格式
+
+    def __len__(self):
+        return self.size
+
+    def startswith(self, prefix):
+        return self.head.startswith(prefix)
+
+
+def iter_mapped_body(mm, start, end, transfer_encoding, chunk_size=None):
+    """按块解码内存映射中的part正文,逐块产出bytes,内存占用与块大小相当"""
+    chunk_size = chunk_size or MMAP_CHUNK_SIZE
+    if transfer_encoding == 'base64':
+        pending = b''
+        for offset in range(start, end, chunk_size):
+            data = pending + mm[offset:min(offset + chunk_size, end)].translate(None, b' \t\r\n')
+            usable = len(data) - len(data) % 4
+            pending = data[usable:]
+            if usable:
+                yield binascii.a2b_base64(data[:usable])
+        if pending:
+            yield binascii.a2b_base64(pending + b'=' * (-len(pending) % 4))
+        return
+
+    offset = start
+    while offset < end:
+        stop = min(offset + chunk_size, end)
+        if stop < end:
+            # 在行尾切分,避免截断quoted-printable的转义序列和软换行
+            newline = mm.rfind(b'\n', offset, stop)
+            if newline > offset:
+                stop = newline + 1
+        data = mm[offset:stop]
+        yield binascii.a2b_qp(data) if transfer_encoding == 'quoted-printable' else data
+        offset = stop
+
+
+class MappedPart(MhtPart):
+    """内存映射MHT中的part,只保存正文的字节偏移"""
+
+    def __init__(self, mm, headers, body_start, body_end, budget=None, spill_dir=None,
+                 spill_threshold=None):
+        super().__init__(None, headers, body_start, body_end)
+        self.mm = mm
+        self.budget = budget
+        self.spill_dir = spill_dir
+        self.spill_threshold = SPILL_THRESHOLD if spill_threshold is None else spill_threshold
+
+    def encoded_size(self):
+        return self.body_end - self.body_start
+
+    def decode_as_text(self):
+        self.text_decoded = True
+        if self.budget:
+            # 原始字节和解码后的文本同时在内存中
+            self.budget.charge(self.estimated_size() * 2, f"文本资源 {self.location or self.content_id} ")
+        data = b''.join(iter_mapped_body(self.mm, self.body_start, self.body_end, self.transfer_encoding))
+        return decode_text(data, self.headers.get('charset'))
+
+    def decode(self, metrics=None):
+        if self.data is not None:
+            return self.data
+
+        with measure(metrics, 'images'):
+            chunks = iter_mapped_body(self.mm, self.body_start, self.body_end, self.transfer_encoding)
+            if self.spill_dir and self.estimated_size() > self.spill_threshold:
+                # 大资源直接解码到临时文件
+                fd, path = tempfile.mkstemp(prefix='.spill_', dir=self.spill_dir)
+                size = 0
+                head = b''
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in chunks:
+                        if len(head) < 16:
+                            head += chunk[:16 - len(head)]
+                        f.write(chunk)
+                        size += len(chunk)
+                self.data = SpilledPayload(path, size, head)
+            else:
+                if self.budget:
+                    self.budget.charge(self.estimated_size(), f"资源 {self.location or self.content_id} ")
+                self.data = b''.join(chunks)
+        if metrics:
+            metrics.add_bytes('images', len(self.data))
+        return self.data
+
+
+def find_mapped_boundary(mm):
+    """返回MHT的part分隔符(b'--' + boundary)"""
+    header_end = mm.find(b'\n\n')
+    crlf_end = mm.find(b'\r\n\r\n')
+    if header_end == -1 or (crlf_end != -1 and crlf_end < header_end):
+        header_end = crlf_end
+    header = mm[:header_end if header_end != -1 else 64 * 1024].decode('latin1')
+    for line in header.replace('\r', '').replace('\n\t', ' ').replace('\n ', ' ').split('\n'):
+        if line.lower().startswith('content-type:') and 'boundary=' in line.lower():
+            value = line[line.lower().index('boundary=') + len('boundary='):]
+            return b'--' + value.split(';')[0].strip().strip('"\'').encode('latin1')
+
+    # 缺少顶层头部时,用第一条已知前缀的分隔行
+    for prefix in BOUNDARY_PREFIXES:
+        encoded = prefix.encode('ascii')
+        pos = 0 if mm[:len(encoded)] == encoded else mm.find(b'\n' + encoded)
+        if pos != -1:
+            pos += 0 if pos == 0 else 1
+            end = mm.find(b'\n', pos)
+            return mm[pos:end if end != -1 else len(mm)].rstrip(b'\r')
+    return None
+
+
+def find_mapped_html(mm):
+    """按 HTML_START_PATTERNS 搜索HTML,截止到其后第一个已知分隔符前缀,返回 (起始, 结束) 偏移或 None"""
+    for pattern in HTML_START_PATTERNS:
+        start = mm.find(pattern.encode('ascii'))
+        if start != -1:
+            for prefix in BOUNDARY_PREFIXES:
+                end = mm.find(prefix.encode('ascii'), start)
+                if end != -1:
+                    return start, end
+            return start, len(mm)
+    return None
+
+
+def index_mapped_parts(mm, boundary):
+    """扫描内存映射的MHT,返回 [(头部字典, 正文起始偏移, 正文结束偏移)]"""
+    parts = []
+    delimiter = b'\n' + boundary
+    if mm[:len(boundary)] == boundary:
+        pos = 0
+    else:
+        pos = mm.find(delimiter)
+        pos = pos + 1 if pos != -1 else -1
+
+    while pos != -1:
+        after = pos + len(boundary)
+        line_end = mm.find(b'\n', after)
+        if line_end == -1 or mm[after:after + 2] == b'--':
+            break  # 结束分隔符
+
+        header_start = line_end + 1
+        next_delimiter = mm.find(delimiter, line_end)
+        part_end = next_delimiter if next_delimiter != -1 else len(mm)
+
+        # 只在本part范围内查找头部结束的空行,先在头部通常所在的开头部分查找
+        search_end = min(part_end, header_start + HEADER_SEARCH_BYTES)
+        blank = mm.find(b'\n\n', header_start, search_end)
+        crlf_blank = mm.find(b'\r\n\r\n', header_start, search_end)
+        if blank == -1 and crlf_blank == -1 and search_end < part_end:
+            blank = mm.find(b'\n\n', header_start, part_end)
+            crlf_blank = mm.find(b'\r\n\r\n', header_start, part_end)
+        if crlf_blank != -1 and (blank == -1 or crlf_blank < blank):
+            header_end, body_start = crlf_blank, crlf_blank + 4
+        elif blank != -1:
+            header_end, body_start = blank, blank + 2
+        else:
+            header_end = body_start = part_end
+
+        body_end = part_end
+        if body_end > body_start and mm[body_end - 1:body_end] == b'\r':
+            body_end -= 1
+
+        header_lines = mm[header_start:header_end].decode('latin1').replace('\r', '').split('\n')
+        headers, _ = parse_part_headers(header_lines, 0)
+        parts.append((headers, body_start, max(body_start, body_end)))
+        pos = next_delimiter + 1 if next_delimiter != -1 else -1
+    return parts
+
+
+def list_mht_parts(mht_path):
+    """不解码正文,列出MHT中每个part的类型、编码、位置和编码后大小"""
+    if os.path.getsize(mht_path) == 0:
+        return []
+    with open(mht_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        boundary = find_mapped_boundary(mm)
+        if boundary is None:
+            raise ValueError("未找到MHT part分隔符")
+        return [describe_part(MappedPart(mm, headers, body_start, body_end))
+                for headers, body_start, body_end in index_mapped_parts(mm, boundary)]
+
+
+def describe_part(part):
+    """part的头部信息和编码后大小,不解码正文"""
+    return {
+        'content_type': part.content_type,
+        'charset': part.headers.get('charset'),
+        'transfer_encoding': part.transfer_encoding,
+        'location': part.location,
+        'content_id': part.content_id,
+        'offset': part.body_start,
+        'encoded_size': part.encoded_size(),
+    }
+
+
+def preprocess_large_mht_file(mht_path, temp_dir=None, metrics=None, memory_budget=None,
+                              spill_threshold=None, on_preview=None):
+    """大文件模式: 内存映射读取MHT,只索引part偏移,大资源直接解码到临时目录
+
+    常驻内存的解码数据超过 memory_budget 字节时抛出 MemoryBudgetExceeded.
+    """
+    budget = MemoryBudget(DEFAULT_MEMORY_BUDGET if memory_budget is None else memory_budget)
+    if temp_dir is None:
+        temp_dir = tempfile.mkdtemp()
+    temp_html_path = os.path.join(temp_dir, "processed.html")
+
+    with open(mht_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if metrics:
+            metrics.add_bytes('read', len(mm))
+        print(f"Large-file mode: mapping {len(mm):,} bytes")
+
+        with measure(metrics, 'parse'):
+            boundary = find_mapped_boundary(mm)
+            html_part = None
+            images = LazyResources(metrics)
+            if boundary is not None:
+                for headers, body_start, body_end in index_mapped_parts(mm, boundary):
+                    part = MappedPart(mm, headers, body_start, body_end, budget, temp_dir, spill_threshold)
+                    if part.content_type == 'text/html' and html_part is None:
+                        html_part = part
+                        images.base_url = part.location
+                    elif part.location or part.content_id:
+                        images.add(part)
+                print(f"Indexed {len(images.parts)} resource parts")
+
+            if html_part is not None:
+                # HTML需要整体在内存中处理: 原始字节、解码后的文本以及替换引用时的副本
+                encoded_size = html_part.estimated_size()
+                budget.charge(encoded_size * 3, "HTML正文")
+                html_bytes = b''.join(iter_mapped_body(mm, html_part.body_start, html_part.body_end,
+                                                       html_part.transfer_encoding))
+                html_content = decode_html_text(html_bytes, html_part.headers.get('charset'))
+            else:
+                # 没有分隔符或HTML part时与文本模式一样搜索HTML起始标记,只解码找到的范围
+                html_range = find_mapped_html(mm)
+                if html_range is None:
+                    return None
+                start, end = html_range
+                budget.charge((end - start) * 3, "HTML正文")
+                html_bytes = mm[start:end]
+                html_content = decode_mht_bytes(html_bytes)
+                print("Found HTML using simple search")
+            del html_bytes
+
+            if images:
+                if on_preview:
+                    on_preview(write_preview_html(html_content, temp_dir))
+                with measure(metrics, 'images'):
+                    html_content = process_mht_resources(html_content, images, temp_dir, metrics)
+            html_content = inject_enhanced_css(html_content)
+
+    encoded = html_content.encode('utf-8', errors='replace')
+    with measure(metrics, 'temp_write', len(encoded)):
+        with open(temp_html_path, 'wb') as f:
+            f.write(encoded)
+    if metrics:
+        metrics.add_bytes('memory_budget_peak', budget.peak)
+    return temp_html_path
@@ -0,0 +1,182 @@
+"""慢文档分析(可选)
+
+启用后每个文档的预处理在 cProfile 下运行并记录 tracemalloc 快照,页面在创建时注册
+PerformanceObserver 收集长任务(long task),打印前通过 runJavaScript 取回 Performance API 数据.
+转换耗时超过阈值的文档把这些数据保存为一个目录(见 SlowDocumentProfiler.save),
+用于离线判断时间花在了Python解析、JS优化还是Chromium布局上;未超过阈值的数据直接丢弃.
+
+cProfile 只分析预处理线程;tracemalloc 是进程全局的,并发渲染时内存数据包含同时预处理的其他文档.
+分析本身会使预处理变慢数倍,只应在排查问题时启用.
+"""
+import os
+import re
+import json
+import pstats
+import hashlib
+import cProfile
+import tracemalloc
+
+# 默认阈值(秒)
+DEFAULT_PROFILE_THRESHOLD = 30.0
+
+# tracemalloc 保存的调用栈深度
+DEFAULT_MEMORY_FRAMES = 10
+
+# 文本摘要中列出的函数/代码行数
+SUMMARY_LINES = 40
+
+# 分析结果目录中的索引文件,每个慢文档一行JSON
+PROFILE_INDEX = 'index.jsonl'
+
+# 文档创建时注入: 记录长任务(主线程上超过50ms的任务,包括样式计算和布局)
+PERFORMANCE_OBSERVER_JS = """
+(function() {
+    window.__mht2pdfLongTasks = [];
+    try {
+        new PerformanceObserver(function(list) {
+            list.getEntries().forEach(function(entry) {
+                window.__mht2pdfLongTasks.push({
+                    name: entry.name,
+                    startTime: entry.startTime,
+                    duration: entry.duration,
+                    attribution: (entry.attribution || []).map(function(item) {
+                        return [item.containerType, item.containerName, item.containerSrc].join(' ');
+                    })
+                });
+            });
+        }).observe({entryTypes: ['longtask']});
+    } catch (e) {
+        window.__mht2pdfLongTasks = null;  // 不支持 longtask
+    }
+})();
+"""
+
+# 打印前取回的页面性能数据(JSON字符串)
+COLLECT_PERFORMANCE_JS = """
+(function() {
+    function plain(entries) {
+        return entries.map(function(entry) { return entry.toJSON(); });
+    }
+    var resources = performance.getEntriesByType('resource');
+    var slowest = resources.slice().sort(function(a, b) { return b.duration - a.duration; }).slice(0, 20);
+    var memory = performance.memory;
+    return JSON.stringify({
+        now: performance.now(),
+        navigation: plain(performance.getEntriesByType('navigation')),
+        paint: plain(performance.getEntriesByType('paint')),
+        measures: plain(performance.getEntriesByType('measure')),
+        resources: {count: resources.length, slowest: plain(slowest)},
+        longTasks: window.__mht2pdfLongTasks,
+        memory: memory ? {usedJSHeapSize: memory.usedJSHeapSize, totalJSHeapSize: memory.totalJSHeapSize} : null,
+        dom: {
+            elements: document.getElementsByTagName('*').length,
+            tables: document.getElementsByTagName('table').length,
+            rows: document.getElementsByTagName('tr').length,
+            scrollHeight: document.documentElement ? document.documentElement.scrollHeight : null
+        }
+    });
+})();
+"""
+
+
+def parse_page_performance(data):
+    """解析 COLLECT_PERFORMANCE_JS 的结果"""
+    try:
+        return json.loads(data) if data else None
+    except (TypeError, ValueError):
+        return {'error': f"无法解析页面性能数据: {data!r:.200}"}
+
+
+class PreprocessCapture:
+    """一个文档预处理阶段的 cProfile 数据和 tracemalloc 快照"""
+
+    def __init__(self, profile, snapshot=None, peak_bytes=None):
+        self.profile = profile
+        self.snapshot = snapshot
+        self.peak_bytes = peak_bytes
+
+
+class SlowDocumentProfiler:
+    """为超过 threshold_seconds 的文档保存分析数据到 output_dir(一般为批量报告目录下的 profiles)"""
+
+    def __init__(self, output_dir, threshold_seconds=DEFAULT_PROFILE_THRESHOLD, memory_frames=DEFAULT_MEMORY_FRAMES):
+        self.output_dir = output_dir
+        self.threshold_seconds = threshold_seconds
+        self.memory_frames = memory_frames
+        self.saved = []
+        self._started_tracemalloc = False
+
+    def start(self):
+        if self.memory_frames and not tracemalloc.is_tracing():
+            tracemalloc.start(self.memory_frames)
+            self._started_tracemalloc = True
+
+    def close(self):
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def profile_call(self, capture_holder, fn, *args):
+        """在当前线程中以 cProfile 运行 fn(*args),把 PreprocessCapture 追加到 capture_holder"""
+        profile = cProfile.Profile()
+        if tracemalloc.is_tracing() and hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        try:
+            return profile.runcall(fn, *args)
+        finally:
+            snapshot = peak = None
+            if tracemalloc.is_tracing():
+                snapshot = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+            capture_holder.append(PreprocessCapture(profile, snapshot, peak))
+
+    def bundle_dir(self, source):
+        name = re.sub(r'[^\w.-]', '_', os.path.basename(str(source)))[:64] or 'document'
+        digest = hashlib.sha1(str(source).encode('utf-8', errors='replace')).hexdigest()[:8]
+        return os.path.join(self.output_dir, f"{name}_{digest}")
+
+    def save(self, metrics, capture=None, page_performance=None):
+        """文档耗时超过阈值时保存分析数据,返回目录;否则返回 None
+
+        目录中包含:
+            metrics.json             各阶段耗时和状态
+            preprocess.prof          cProfile 数据(pstats / snakeviz 等可直接打开)
+            preprocess_top.txt       按累计耗时排序的函数
+            memory.snapshot          tracemalloc 快照(tracemalloc.Snapshot.load)
+            memory_top.txt           按代码行汇总的内存分配
+            page_performance.json    Performance API 数据和长任务
+        """
+        if metrics.total_seconds < self.threshold_seconds:
+            return None
+        directory = self.bundle_dir(metrics.source)
+        os.makedirs(directory, exist_ok=True)
+        files = ['metrics.json']
+        with open(os.path.join(directory, 'metrics.json'), 'w', encoding='utf-8') as f:
+            json.dump(metrics.to_dict(), f, indent=2, ensure_ascii=False)
+
+        if capture is not None:
+            capture.profile.dump_stats(os.path.join(directory, 'preprocess.prof'))
+            with open(os.path.join(directory, 'preprocess_top.txt'), 'w', encoding='utf-8') as f:
+                pstats.Stats(capture.profile, stream=f).sort_stats('cumulative').print_stats(SUMMARY_LINES)
+            files += ['preprocess.prof', 'preprocess_top.txt']
+            if capture.snapshot is not None:
+                capture.snapshot.dump(os.path.join(directory, 'memory.snapshot'))
+                with open(os.path.join(directory, 'memory_top.txt'), 'w', encoding='utf-8') as f:
+                    if capture.peak_bytes is not None:
+                        f.write(f"Peak traced memory: {capture.peak_bytes:,} bytes\n\n")
+                    for stat in capture.snapshot.statistics('lineno')[:SUMMARY_LINES]:
+                        f.write(f"{stat}\n")
+                files += ['memory.snapshot', 'memory_top.txt']
+
+        if page_performance is not None:
+            with open(os.path.join(directory, 'page_performance.json'), 'w', encoding='utf-8') as f:
+                json.dump(page_performance, f, indent=2, ensure_ascii=False)
+            files.append('page_performance.json')
+
+        entry = {'source': str(metrics.source), 'status': metrics.status,
+                 'total_seconds': round(metrics.total_seconds, 3), 'bundle': os.path.basename(directory),
+                 'files': files}
+        with open(os.path.join(self.output_dir, PROFILE_INDEX), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.saved.append(directory)
+        return directory
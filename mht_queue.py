@@ -0,0 +1,314 @@
+"""基于SQLite的持久化转换任务队列(不依赖Qt)
+
+任务状态保存在本地SQLite文件中,关闭程序或崩溃后重新打开同一队列即可从中断处继续:
+    pending  等待转换(包括等待重试的任务,next_attempt 之前不会被领取)
+    running  已被某个worker领取,租约(lease_until)到期前其他worker不会领取
+    done     转换成功
+    dead     失败次数达到上限或为不可重试的错误,不再自动重试
+
+多个worker进程可同时打开同一队列: claim() 在 BEGIN IMMEDIATE 事务中选取并标记任务,
+同一任务不会被两个worker领取;worker崩溃后其租约到期,任务自动回到可领取状态.
+
+    python htm2pdf.py queue add jobs.sqlite D:/archive -o out
+    python htm2pdf.py queue work jobs.sqlite          # 可在多个进程中同时运行
+    python htm2pdf.py queue status jobs.sqlite --state dead
+"""
+import os
+import time
+import hashlib
+import random
+import socket
+import sqlite3
+
+# 默认最多尝试次数(含第一次)
+DEFAULT_MAX_ATTEMPTS = 3
+
+# 重试退避: 第n次失败后等待 BACKOFF_BASE * 2^(n-1) 秒(加随机抖动),不超过 BACKOFF_MAX
+BACKOFF_BASE = 30.0
+BACKOFF_MAX = 3600.0
+
+# 领取任务的租约时长,worker 在转换过程中用 renew() 续约
+DEFAULT_LEASE_SECONDS = 600.0
+
+# 以这些前缀开头的错误重试也不会成功(例如MHT解析失败),直接进入 dead
+PERMANENT_ERROR_PREFIXES = ("预处理失败", "源文件不存在")
+
+STATES = ('pending', 'running', 'done', 'dead')
+
+# 图形界面批量转换的队列目录,每个输出目录一个队列文件,批量正常结束后删除
+GUI_QUEUE_DIR = os.path.join(os.path.expanduser('~'), '.mht2pdf', 'queues')
+
+# SQLite WAL模式下与队列文件一起存在的文件
+QUEUE_FILE_SUFFIXES = ('', '-wal', '-shm', '-journal')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL UNIQUE,
+    output TEXT,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    error TEXT,
+    seconds REAL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, next_attempt);
+"""
+
+
+def gui_queue_path(output_dir, queue_dir=GUI_QUEUE_DIR):
+    """图形界面批量转换到 output_dir 时使用的队列文件,不写入输出目录"""
+    key = os.path.normcase(os.path.abspath(output_dir))
+    return os.path.join(queue_dir, hashlib.sha1(key.encode('utf-8')).hexdigest()[:16] + '.sqlite')
+
+
+def remove_queue(path):
+    """删除队列文件及其WAL/SHM文件,队列必须已关闭"""
+    for suffix in QUEUE_FILE_SUFFIXES:
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def default_worker_id():
+    """主机名:进程号,同一主机上的不同worker进程互不相同"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def host_worker_id(name):
+    """固定的worker标识(名称@主机名),程序重启后可以重新领取自己之前未完成的任务"""
+    return f"{name}@{socket.gethostname()}"
+
+
+def is_permanent_error(error):
+    return bool(error) and str(error).startswith(PERMANENT_ERROR_PREFIXES)
+
+
+def backoff_seconds(attempts, base=BACKOFF_BASE, maximum=BACKOFF_MAX):
+    """第 attempts 次失败后的等待时间,带 ±20% 抖动,避免多个worker同时重试"""
+    delay = min(maximum, base * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class Job:
+    """从队列领取的一个任务"""
+
+    __slots__ = ('id', 'source', 'output', 'attempts', 'worker')
+
+    def __init__(self, id, source, output, attempts, worker):
+        self.id = id
+        self.source = source
+        self.output = output
+        self.attempts = attempts
+        self.worker = worker
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.source!r} attempt {self.attempts}>"
+
+
+class JobQueue:
+    """SQLite任务队列,每个进程(线程)使用自己的 JobQueue 实例"""
+
+    def __init__(self, path, max_attempts=DEFAULT_MAX_ATTEMPTS, lease_seconds=DEFAULT_LEASE_SECONDS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # 自行管理事务;busy timeout 让并发的worker等待写锁而不是立即报错
+        self.db = sqlite3.connect(path, timeout=30.0, isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _transaction(self, statements):
+        """在 BEGIN IMMEDIATE 事务中执行 statements(cursor),返回其结果"""
+        cursor = self.db.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            result = statements(cursor)
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            raise
+        cursor.execute('COMMIT')
+        return result
+
+    def enqueue(self, sources, outputs=None):
+        """加入任务,已在队列中的源文件保持原状态(重新运行同一批量时从中断处继续),返回新增数"""
+        outputs = outputs or {}
+        now = time.time()
+        rows = [(source, outputs.get(source), now, now) for source in sources]
+
+        def insert(cursor):
+            before = self.db.total_changes
+            cursor.executemany('INSERT OR IGNORE INTO jobs (source, output, created, updated) VALUES (?, ?, ?, ?)',
+                               rows)
+            return self.db.total_changes - before
+        return self._transaction(insert)
+
+    def claim(self, worker, limit=1):
+        """领取最多 limit 个可执行的任务: 到期的 pending 任务,或租约已过期的 running 任务
+
+        租约过期说明之前的worker在处理该任务时退出或卡住;这样的任务尝试次数已达上限时
+        直接标记为 dead,使导致worker崩溃的文件不会反复拖垮worker.
+        """
+        now = time.time()
+
+        def select(cursor):
+            rows = cursor.execute(
+                "SELECT id, source, output, attempts, state FROM jobs "
+                "WHERE (state = 'pending' AND next_attempt <= ?) OR (state = 'running' AND lease_until < ?) "
+                "ORDER BY id LIMIT ?", (now, now, limit)).fetchall()
+            abandoned = [row[0] for row in rows if row[4] == 'running' and row[3] >= self.max_attempts]
+            cursor.executemany(
+                "UPDATE jobs SET state = 'dead', error = ?, lease_until = NULL, updated = ? WHERE id = ?",
+                [("处理中断次数过多(worker退出或超时)", now, id) for id in abandoned])
+            rows = [row[:4] for row in rows if row[0] not in abandoned]
+            cursor.executemany(
+                "UPDATE jobs SET state = 'running', worker = ?, lease_until = ?, attempts = attempts + 1, "
+                "updated = ? WHERE id = ?", [(worker, now + self.lease_seconds, now, row[0]) for row in rows])
+            return [Job(id, source, output, attempts + 1, worker) for id, source, output, attempts in rows]
+        return self._transaction(select)
+
+    def claim_source(self, worker, source):
+        """领取指定源文件的任务;该文件已完成、已放弃或正由其他worker处理时返回 None
+
+        同一worker之前领取但未完成的任务(例如程序崩溃后重新打开)可以再次领取.
+        """
+        now = time.time()
+
+        def select(cursor):
+            row = cursor.execute(
+                "SELECT id, output, attempts FROM jobs WHERE source = ? AND "
+                "(state = 'pending' OR (state = 'running' AND (lease_until < ? OR worker = ?)))",
+                (source, now, worker)).fetchone()
+            if row is None:
+                return None
+            cursor.execute(
+                "UPDATE jobs SET state = 'running', worker = ?, lease_until = ?, attempts = attempts + 1, "
+                "updated = ? WHERE id = ?", (worker, now + self.lease_seconds, now, row[0]))
+            return Job(row[0], source, row[1], row[2] + 1, worker)
+        return self._transaction(select)
+
+    def renew(self, jobs):
+        """延长 jobs 的租约,长时间转换期间定期调用"""
+        now = time.time()
+        self._transaction(lambda cursor: cursor.executemany(
+            "UPDATE jobs SET lease_until = ?, updated = ? WHERE id = ? AND worker = ? AND state = 'running'",
+            [(now + self.lease_seconds, now, job.id, job.worker) for job in jobs]))
+
+    def complete(self, job, seconds=None):
+        """标记任务成功;任务已被其他worker接手(租约过期)时返回 False"""
+        now = time.time()
+        updated = self._transaction(lambda cursor: cursor.execute(
+            "UPDATE jobs SET state = 'done', error = NULL, seconds = ?, lease_until = NULL, updated = ? "
+            "WHERE id = ? AND worker = ? AND state = 'running'", (seconds, now, job.id, job.worker)).rowcount)
+        return updated > 0
+
+    def fail(self, job, error, permanent=None):
+        """记录失败,返回任务的新状态: 'pending'(稍后重试)或 'dead'
+
+        permanent 为 None 时按 is_permanent_error(error) 判断.
+        """
+        if permanent is None:
+            permanent = is_permanent_error(error)
+        now = time.time()
+        if permanent or job.attempts >= self.max_attempts:
+            state, next_attempt = 'dead', 0
+        else:
+            state, next_attempt = 'pending', now + backoff_seconds(job.attempts)
+        self._transaction(lambda cursor: cursor.execute(
+            "UPDATE jobs SET state = ?, error = ?, next_attempt = ?, lease_until = NULL, updated = ? "
+            "WHERE id = ? AND worker = ? AND state = 'running'",
+            (state, str(error), next_attempt, now, job.id, job.worker)))
+        return state
+
+    def release(self, job):
+        """放回未处理的任务(例如worker被中断),不计入尝试次数"""
+        now = time.time()
+        self._transaction(lambda cursor: cursor.execute(
+            "UPDATE jobs SET state = 'pending', attempts = MAX(0, attempts - 1), lease_until = NULL, updated = ? "
+            "WHERE id = ? AND worker = ? AND state = 'running'", (now, job.id, job.worker)))
+
+    def retry_dead(self, sources=None):
+        """把 dead 任务重新设为 pending 并清零尝试次数,返回数量"""
+        now = time.time()
+        if sources is None:
+            sql, params = "UPDATE jobs SET state = 'pending', attempts = 0, next_attempt = 0, updated = ? " \
+                          "WHERE state = 'dead'", [(now,)]
+        else:
+            sql = "UPDATE jobs SET state = 'pending', attempts = 0, next_attempt = 0, updated = ? " \
+                  "WHERE state = 'dead' AND source = ?"
+            params = [(now, source) for source in sources]
+
+        def update(cursor):
+            before = self.db.total_changes
+            cursor.executemany(sql, params)
+            return self.db.total_changes - before
+        return self._transaction(update)
+
+    def counts(self):
+        """{状态: 任务数},包含所有状态"""
+        counts = dict.fromkeys(STATES, 0)
+        counts.update(self.db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+        return counts
+
+    def states(self, sources):
+        """{源文件: 状态},不在队列中的源文件不出现在结果中"""
+        result = {}
+        sources = list(sources)
+        for start in range(0, len(sources), 500):
+            chunk = sources[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            result.update(self.db.execute(
+                f"SELECT source, state FROM jobs WHERE source IN ({placeholders})", chunk).fetchall())
+        return result
+
+    def next_retry(self, sources=None):
+        """返回最早可重试的 pending 任务 (源文件, 还需等待的秒数);没有时返回 None"""
+        rows = self.db.execute(
+            "SELECT source, next_attempt FROM jobs WHERE state = 'pending' AND attempts > 0 "
+            "ORDER BY next_attempt").fetchall()
+        sources = set(sources) if sources is not None else None
+        for source, next_attempt in rows:
+            if sources is None or source in sources:
+                return source, max(0.0, next_attempt - time.time())
+        return None
+
+    def jobs(self, state=None, limit=None):
+        """列出任务 [dict],按 id 排序"""
+        sql = "SELECT id, source, output, state, attempts, next_attempt, worker, error, seconds, updated FROM jobs"
+        params = []
+        if state:
+            sql += " WHERE state = ?"
+            params.append(state)
+        sql += " ORDER BY id"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        columns = ('id', 'source', 'output', 'state', 'attempts', 'next_attempt', 'worker', 'error', 'seconds',
+                   'updated')
+        return [dict(zip(columns, row)) for row in self.db.execute(sql, params)]
+
+    def wait_seconds(self):
+        """没有可领取的任务时,距离下一个任务可领取还需等待的秒数;队列中已没有未完成任务时返回 None"""
+        now = time.time()
+        row = self.db.execute(
+            "SELECT MIN(CASE WHEN state = 'pending' THEN next_attempt ELSE lease_until END) FROM jobs "
+            "WHERE state IN ('pending', 'running')").fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - now)
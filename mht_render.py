@@ -0,0 +1,773 @@
+"""MhtConverter 的渲染实现(依赖 QtWebEngine)
+
+由 mht_converter 在首次访问 MhtConverter 时导入,一般不需要直接导入本模块.
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import asyncio
+import threading
+from collections import deque
+
+from PyQt5.QtCore import QUrl, QTimer, QEventLoop
+from PyQt5.QtWebEngineCore import QWebEngineUrlRequestInterceptor
+from PyQt5.QtWebEngineWidgets import QWebEnginePage, QWebEngineProfile, QWebEngineScript
+from PyQt5.QtWidgets import QApplication
+
+from mht_parser import read_mht_file, decode_mht_bytes, preprocess_mht_content, preprocess_large_mht_file
+from mht_metrics import DocumentMetrics, process_rss, cpu_percent, available_memory
+from pdf_postprocess import (POSTPROCESS_AVAILABLE, PdfPostprocessor, PostprocessResult, record_result,
+                             merge_pdf_bytes)
+from mht_chunk import split_html_file
+from pdf_thumbnails import render_thumbnails
+from mht_profile import PERFORMANCE_OBSERVER_JS, COLLECT_PERFORMANCE_JS, parse_page_performance
+from mht_converter import (MHT_EXTENSIONS, RENDERING_IMPROVEMENTS_JS, FINAL_PRINT_JS, WARMUP_HTML,
+                           ConversionError, ConversionProfile, ConversionResult, RecyclePolicy,
+                           BackgroundTask, configure_page_settings)
+
+# 由本模块创建的QApplication,保持引用避免被回收
+_app = None
+
+# 离线模式下允许加载的URL协议
+LOCAL_URL_SCHEMES = ('file', 'data', 'blob', 'qrc', 'about')
+
+# 轮询后台预处理是否完成的间隔(毫秒)
+TASK_POLL_MS = 10
+
+
+def ensure_application():
+    """获取或创建QApplication,无界面时使用offscreen平台"""
+    global _app
+    app = QApplication.instance()
+    if app is None:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        _app = app = QApplication([sys.argv[0] if sys.argv else 'mht_converter'])
+    return app
+
+
+class OfflineRequestInterceptor(QWebEngineUrlRequestInterceptor):
+    """离线模式: 立即拦截页面发出的所有非本地请求,并按页面记录被拦截的URL
+
+    只拦截通过 watch() 登记的页面(按请求的第一方URL匹配),同一配置中的其他页面不受影响.
+    被拦截的请求立即失败,页面不再等待网络超时后才触发 loadFinished.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._lock = threading.Lock()  # 旧版本Qt在IO线程中调用 interceptRequest
+        self._blocked = {}  # 页面URL -> [被拦截的URL]
+
+    def interceptRequest(self, info):
+        url = info.requestUrl()
+        if url.scheme().lower() in LOCAL_URL_SCHEMES:
+            return
+        page_url = info.firstPartyUrl().toString()
+        with self._lock:
+            blocked = self._blocked.get(page_url)
+            if blocked is None:
+                return
+            blocked.append(url.toString())
+        info.block(True)
+
+    def watch(self, page_url):
+        """开始拦截 page_url 页面的远程请求"""
+        with self._lock:
+            self._blocked.setdefault(page_url.toString(), [])
+
+    def blocked_urls(self, page_url):
+        """目前为止 page_url 页面被拦截的URL"""
+        with self._lock:
+            return list(self._blocked.get(page_url.toString(), ()))
+
+    def release(self, page_url):
+        """停止拦截 page_url 页面,返回被拦截的URL"""
+        with self._lock:
+            return self._blocked.pop(page_url.toString(), [])
+
+
+def install_request_interceptor(web_profile, interceptor):
+    """为WebEngine配置安装请求拦截器(Qt 5.13起为 setUrlRequestInterceptor)"""
+    if hasattr(web_profile, 'setUrlRequestInterceptor'):
+        web_profile.setUrlRequestInterceptor(interceptor)
+    else:
+        web_profile.setRequestInterceptor(interceptor)
+
+
+def prepare_html(source, profile, metrics, temp_dir):
+    """预处理输入(路径或MHT字节),资源写入 temp_dir,返回需要加载的HTML路径"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        metrics.add_bytes('read', len(source))
+        with metrics.stage('decode'):
+            content = decode_mht_bytes(bytes(source))
+    else:
+        path = os.path.abspath(os.fspath(source))
+        if os.path.splitext(path)[1].lower() not in MHT_EXTENSIONS:
+            # HTML文件直接加载
+            metrics.add_bytes('read', os.path.getsize(path))
+            return path
+        if os.path.getsize(path) >= profile.large_file_mb * 1024 * 1024:
+            html_path = preprocess_large_mht_file(path, temp_dir, metrics, profile.memory_budget_mb * 1024 * 1024)
+            if not html_path:
+                raise ConversionError("未能从MHT中提取HTML内容")
+            return html_path
+        content = read_mht_file(path, metrics)
+
+    html_path = preprocess_mht_content(content, temp_dir, metrics)
+    if not html_path:
+        raise ConversionError("未能从MHT中提取HTML内容")
+    return html_path
+
+
+class StageWatchdog:
+    """为渲染流程的当前阶段计时,超过 StageTimeouts 中的时间时调用 on_timeout(阶段)"""
+
+    def __init__(self, timeouts, on_timeout):
+        self.timeouts = timeouts
+        self.on_timeout = on_timeout
+        self.stage = None
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._expired)
+
+    def enter(self, stage):
+        """进入新阶段并重新计时"""
+        self.stage = stage
+        seconds = self.timeouts.seconds(stage)
+        if seconds:
+            self._timer.start(int(seconds * 1000))
+        else:
+            self._timer.stop()
+
+    def stop(self):
+        self.stage = None
+        self._timer.stop()
+
+    def _expired(self):
+        stage, self.stage = self.stage, None
+        if stage is not None:
+            self.on_timeout(stage)
+
+
+def poll_task(task, callback, interval_ms=TASK_POLL_MS):
+    """在Qt事件循环中轮询 BackgroundTask,完成后调用 callback(task);返回轮询用的QTimer,放弃时调用其 stop()"""
+    timer = QTimer()
+    timer.setInterval(interval_ms)
+
+    def check():
+        if task.done():
+            timer.stop()
+            callback(task)
+
+    timer.timeout.connect(check)
+    timer.start()
+    return timer
+
+
+class _RenderJob:
+    """单个文档的渲染流程: 预处理 -> 加载 -> 优化 -> 打印 -> 校验
+
+    每个阶段由 StageWatchdog 限时.超时或渲染进程崩溃时以 'timeout'/'crashed' 结束,
+    并设置 discard_reason,由转换器销毁并替换该页面;之后到达的回调被忽略.
+    传入 SlowDocumentProfiler 时预处理在 cProfile 下运行(captures),打印前取回页面性能数据(page_performance).
+    """
+
+    def __init__(self, source, profile, callback, interceptor=None, profiler=None):
+        self.source = source
+        self.profile = profile
+        self.callback = callback
+        self.interceptor = interceptor
+        self.profiler = profiler
+        self.captures = []
+        self.page_performance = None
+        self.page = None
+        self.url = None
+        self.temp_dir = None
+        self.task = None
+        self.done = False
+        self.discard_reason = None
+        self._poll = None
+        self.watchdog = StageWatchdog(profile.timeouts, self._on_stage_timeout)
+        label = '<bytes>' if isinstance(source, (bytes, bytearray, memoryview)) else os.fspath(source)
+        self.metrics = DocumentMetrics(label)
+
+    def start(self, page):
+        self.page = page
+        page.renderProcessTerminated.connect(self._on_render_process_terminated)
+        self.watchdog.enter('preprocess')
+        # 预处理在后台线程中进行,期间事件循环继续驱动其他页面
+        if self.profiler is not None:
+            self.task = BackgroundTask(self.profiler.profile_call, self.captures, self._prepare)
+        else:
+            self.task = BackgroundTask(self._prepare)
+        self._poll = poll_task(self.task, self._on_prepared)
+
+    def _on_prepared(self, task):
+        self._poll = None
+        try:
+            url = task.result()
+        except Exception as e:
+            self._finish(None, f"预处理失败: {e}")
+            return
+
+        self.watchdog.enter('load')
+        self.metrics.begin('load')
+        if self.profile.offline and self.interceptor is not None:
+            self.url = url
+            self.interceptor.watch(url)
+        self.page.loadFinished.connect(self._on_load_finished)
+        self.page.load(url)
+
+    def _prepare(self):
+        """预处理输入,返回需要加载的URL"""
+        self.temp_dir = tempfile.mkdtemp(prefix='mht2pdf_')
+        return QUrl.fromLocalFile(prepare_html(self.source, self.profile, self.metrics, self.temp_dir))
+
+    def _on_load_finished(self, ok):
+        self.page.loadFinished.disconnect(self._on_load_finished)
+        self.metrics.end('load')
+        if not ok:
+            self._finish(None, "页面加载失败")
+            return
+
+        self.watchdog.enter('optimize')
+        self._run_optimization(RENDERING_IMPROVEMENTS_JS, self.profile.settle_ms, self._apply_final_styles)
+
+    def _apply_final_styles(self):
+        if not self.done:
+            self._run_optimization(FINAL_PRINT_JS, self.profile.print_delay_ms, self._print)
+
+    def _run_optimization(self, script, delay_ms, next_step):
+        """执行优化脚本,脚本完成后等待 delay_ms 再进入下一步"""
+        if not self.profile.optimize_js:
+            QTimer.singleShot(delay_ms, next_step)
+            return
+
+        def on_script_done(_result):
+            if self.done:
+                return
+            self.metrics.end('optimize')
+            QTimer.singleShot(delay_ms, next_step)
+
+        self.metrics.begin('optimize')
+        self.page.runJavaScript(script, on_script_done)
+
+    def _print(self):
+        if self.done:
+            return
+        if self.profiler is not None and self.page_performance is None:
+            self.page.runJavaScript(COLLECT_PERFORMANCE_JS, self._on_performance_collected)
+            return
+        self.watchdog.enter('print')
+        self.metrics.begin('print')
+        try:
+            self.page.printToPdf(self._on_pdf_printed, self.profile.page_layout())
+        except Exception as e:
+            self._finish(None, f"PDF导出失败: {e}")
+
+    def _on_performance_collected(self, data):
+        if self.done:
+            return
+        self.page_performance = parse_page_performance(data) or {'error': "页面未返回性能数据"}
+        self._print()
+
+    def _on_stage_timeout(self, stage):
+        if stage != 'preprocess':
+            # 页面可能卡在加载或脚本中,销毁后由新页面处理后续文档
+            self.discard_reason = f"{stage} timeout"
+            self.metrics.end(stage)
+        self._finish(None, self.profile.timeouts.describe(stage), 'timeout')
+
+    def _on_render_process_terminated(self, status, exit_code):
+        if self.done:
+            return
+        self.discard_reason = "renderer terminated"
+        self._finish(None, f"渲染进程异常退出(状态 {int(status)}, 退出码 {exit_code})", 'crashed')
+
+    def _on_pdf_printed(self, data):
+        if self.done:
+            return
+        pdf = bytes(data)
+        self.metrics.end('print', len(pdf))
+        with self.metrics.stage('verify'):
+            valid = pdf.startswith(b'%PDF')
+        if valid:
+            self._finish(pdf, None)
+        else:
+            self._finish(None, "PDF文件为空或无效")
+
+    def _finish(self, pdf, error, status=None):
+        if self.done:
+            return
+        self.done = True
+        self.watchdog.stop()
+        if self._poll is not None:
+            self._poll.stop()
+            self._poll = None
+        for signal, slot in ((self.page.loadFinished, self._on_load_finished),
+                             (self.page.renderProcessTerminated, self._on_render_process_terminated)):
+            try:
+                signal.disconnect(slot)
+            except TypeError:
+                pass  # 未连接
+        if self.url is not None:
+            self.metrics.add_blocked_urls(self.interceptor.release(self.url))
+            self.url = None
+        if self.task is not None and not self.task.done():
+            # 预处理超时: 线程结束后再删除它写出的临时文件
+            self.task.abandon(self._remove_temp_dir)
+        else:
+            self._remove_temp_dir()
+        self.metrics.finish(status or ('ok' if error is None else 'failed'), error)
+        self.callback(self, pdf, error)
+
+    def _remove_temp_dir(self):
+        if self.temp_dir:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+            self.temp_dir = None
+
+
+class _WarmUpJob:
+    """在页面上渲染一次预热文档并打印为PDF(结果丢弃)"""
+
+    def __init__(self, page, profile, callback):
+        self.page = page
+        self.profile = profile
+        self.callback = callback
+
+    def start(self):
+        self.page.loadFinished.connect(self._on_load_finished)
+        self.page.setHtml(WARMUP_HTML, QUrl('file:///'))
+
+    def _on_load_finished(self, ok):
+        self.page.loadFinished.disconnect(self._on_load_finished)
+        if not ok:
+            self.callback(self)
+            return
+        try:
+            self.page.printToPdf(lambda _data: self.callback(self), self.profile.page_layout())
+        except Exception as e:
+            print(f"Warm-up print failed: {e}")
+            self.callback(self)
+
+
+class MhtConverter:
+    """不依赖GUI的MHT/HTML转PDF转换器
+
+    convert() 与 convert_many() 为同步接口,在内部运行Qt事件循环直到完成;
+    convert_async() 与 convert_many_async() 在asyncio事件循环中驱动Qt事件.
+    所有方法都必须在创建转换器的线程中调用.
+    """
+
+    def __init__(self, profile=None, concurrency=1, poll_interval=0.01, recycle=None,
+                 postprocess_workers=1, adaptive=None, warm_up=False, profiler=None):
+        self.created = time.monotonic()
+        self.time_to_first_pdf = None  # 从创建转换器到第一个PDF生成的秒数
+        self.warm_up_seconds = None
+        self.profile = profile or ConversionProfile()
+        # 传入 ConcurrencyController 时,concurrency 由控制器在运行中调整
+        self.adaptive = adaptive
+        self.concurrency = adaptive.current if adaptive else max(1, int(concurrency))
+        self.poll_interval = poll_interval  # asyncio模式下处理Qt事件的间隔(秒)
+        self.recycle = recycle or RecyclePolicy()
+        self.postprocess_workers = postprocess_workers
+        self._postprocessors = {}  # linearize -> PdfPostprocessor,首次使用时创建
+        # 传入 SlowDocumentProfiler 时为超过阈值的文档保存分析数据(见 mht_profile)
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.start()
+        self._app = ensure_application()
+        # 独立的off-the-record配置,缓存只在内存中,回收页面时一并清理
+        self._web_profile = QWebEngineProfile()
+        # 离线模式的文档通过拦截器阻止远程请求,其余文档不受影响
+        self._interceptor = OfflineRequestInterceptor(self._web_profile)
+        install_request_interceptor(self._web_profile, self._interceptor)
+        self._pages = []
+        self._idle_pages = []
+        self._page_documents = {}
+        if warm_up:
+            self.warm_up()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """释放所有渲染页面和后处理进程池"""
+        for postprocessor in self._postprocessors.values():
+            postprocessor.shutdown()
+        self._postprocessors = {}
+        if self.profiler is not None:
+            self.profiler.close()
+        for page in self._pages:
+            page.deleteLater()
+        self._pages = []
+        self._idle_pages = []
+        self._page_documents = {}
+
+    def _acquire_page(self):
+        if self._idle_pages:
+            return self._idle_pages.pop()
+        page = QWebEnginePage(self._web_profile)
+        configure_page_settings(page.settings())
+        if self.profiler is not None:
+            # 在页面脚本之前注册 PerformanceObserver,加载和优化期间的长任务都能记录
+            script = QWebEngineScript()
+            script.setName('mht2pdf-performance-observer')
+            script.setSourceCode(PERFORMANCE_OBSERVER_JS)
+            script.setInjectionPoint(QWebEngineScript.DocumentCreation)
+            script.setWorldId(QWebEngineScript.MainWorld)
+            page.scripts().insert(script)
+        self._pages.append(page)
+        self._page_documents[page] = 0
+        return page
+
+    def warm_up(self, pages=None, timeout_ms=30000):
+        """预先创建渲染页面,并用转换参数渲染一次预热文档,返回耗时(秒)
+
+        第一个真实文档不再承担渲染进程启动、配置创建和中文字体回退查找的开销.
+        """
+        start = time.monotonic()
+        count = max(1, pages or self.concurrency)
+        warm_pages = [self._acquire_page() for _ in range(count)]
+        loop = QEventLoop()
+        remaining = [len(warm_pages)]
+
+        def finished(job):
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                loop.quit()
+
+        jobs = [_WarmUpJob(page, self.profile, finished) for page in warm_pages]
+        for job in jobs:
+            job.start()
+        QTimer.singleShot(timeout_ms, loop.quit)
+        if remaining[0]:
+            loop.exec_()
+
+        # 预热不计入页面的文档数
+        self._idle_pages.extend(warm_pages)
+        self.warm_up_seconds = time.monotonic() - start
+        print(f"Renderer warm-up: {count} page(s) in {self.warm_up_seconds:.2f}s")
+        return self.warm_up_seconds
+
+    def _release_page(self, page, report=None, discard_reason=None):
+        """归还页面;按回收策略检查文档数和渲染进程内存,必要时销毁页面
+
+        discard_reason 非空(文档超时或渲染进程崩溃)时总是销毁页面.
+        """
+        documents = self._page_documents.get(page, 0) + 1
+        self._page_documents[page] = documents
+        pid = page.renderProcessPid()
+        rss = process_rss(pid)
+        reason = discard_reason or self.recycle.reason(documents, rss)
+        if report is not None:
+            report.add_memory_sample(pid, rss, reason)
+
+        if reason:
+            print(f"Recycling renderer page (pid {pid}): {reason}")
+            self._pages.remove(page)
+            del self._page_documents[page]
+            page.deleteLater()
+            self._web_profile.clearHttpCache()
+        elif len(self._pages) > self.concurrency:
+            # 并发数已下调,多余的页面直接释放
+            self._pages.remove(page)
+            del self._page_documents[page]
+            page.deleteLater()
+        else:
+            self._idle_pages.append(page)
+
+    def _observe(self, result, report=None):
+        """把完成的文档交给并发控制器,到评估时机时调整并发数"""
+        adaptive = self.adaptive
+        if adaptive is None or result.metrics is None:
+            return
+        adaptive.record(result.metrics.total_seconds)
+        if not adaptive.due():
+            return
+        pids = {page.renderProcessPid() for page in self._pages}
+        renderer_rss = sum(process_rss(pid) or 0 for pid in pids)
+        old = self.concurrency
+        new, reason = adaptive.adjust(cpu_percent(), available_memory(), renderer_rss)
+        if reason:
+            self.concurrency = new
+            print(f"Concurrency {old} -> {new}: {reason}")
+            if report is not None:
+                report.add_concurrency_change(old, new, reason)
+
+    def _postprocessor(self, profile):
+        """profile 要求后处理且 pikepdf 可用时返回进程池,否则返回None"""
+        if not (profile.postprocess_pdf and POSTPROCESS_AVAILABLE):
+            return None
+        postprocessor = self._postprocessors.get(profile.linearize_pdf)
+        if postprocessor is None:
+            postprocessor = PdfPostprocessor(self.postprocess_workers, profile.linearize_pdf)
+            self._postprocessors[profile.linearize_pdf] = postprocessor
+        return postprocessor
+
+    @staticmethod
+    def _apply_postprocess(result, optimized):
+        """把后处理结果合并到 ConversionResult,失败时保留原PDF"""
+        pdf, outcome = optimized
+        if pdf is not None and not outcome.error:
+            result.pdf = pdf
+            record_result(result.metrics, outcome)
+        else:
+            print(f"PDF post-processing failed for {result.source}: {outcome.error}")
+        return result
+
+    @staticmethod
+    def _add_thumbnails(result, profile):
+        """从同一次渲染的PDF生成缩略图;失败时只打印错误,PDF不受影响"""
+        if profile.thumbnails is None or not result.ok:
+            return
+        try:
+            with result.metrics.stage('thumbnails'):
+                result.thumbnails = render_thumbnails(result.pdf, profile.thumbnails)
+        except Exception as e:
+            print(f"Thumbnail rendering failed for {result.source}: {e}")
+
+    def _save_profile(self, job):
+        """文档超过阈值时保存分析数据;写入失败只打印错误"""
+        capture = job.captures[0] if job.captures else None
+        try:
+            directory = self.profiler.save(job.metrics, capture, job.page_performance)
+        except Exception as e:
+            print(f"Saving profile for {job.metrics.source} failed: {e}")
+            return
+        if directory:
+            print(f"Slow document {job.metrics.source} ({job.metrics.total_seconds:.1f}s), profile: {directory}")
+
+    def _submit(self, source, profile, on_done, report=None):
+        """启动一个渲染任务,完成后以 ConversionResult 调用 on_done"""
+        def finished(job, pdf, error):
+            if pdf and self.time_to_first_pdf is None:
+                self.time_to_first_pdf = time.monotonic() - self.created
+                print(f"Time to first PDF: {self.time_to_first_pdf:.2f}s")
+            if report is not None:
+                report.add(job.metrics)
+                if pdf:
+                    report.mark_first_pdf(self.time_to_first_pdf, self.warm_up_seconds)
+            self._release_page(job.page, report, job.discard_reason)
+            if self.profiler is not None:
+                self._save_profile(job)
+            result = ConversionResult(job.source, pdf, error, job.metrics)
+            self._add_thumbnails(result, profile or self.profile)
+            on_done(result)
+
+        job = _RenderJob(source, profile or self.profile, finished, self._interceptor, self.profiler)
+        job.start(self._acquire_page())
+
+    def convert(self, source, profile=None):
+        """转换单个文档,source为文件路径或MHT字节内容,返回PDF字节"""
+        result = next(self.convert_many([source], profile))
+        if not result.ok:
+            raise ConversionError(f"{result.source}: {result.error}")
+        return result.pdf
+
+    def convert_chunked(self, source, profile=None, report=None):
+        """分段渲染单个超长文档,返回 ConversionResult
+
+        预处理后的HTML在安全的边界切成约 profile.chunk_kb 的若干段(见 mht_chunk),
+        各段作为独立文档在页面池中并行渲染(最多 concurrency 段同时渲染),再按顺序合并.
+        HTML不够长时整体渲染.合并需要 pikepdf,未安装时整体渲染.
+        """
+        profile = profile or self.profile
+        label = '<bytes>' if isinstance(source, (bytes, bytearray, memoryview)) else os.fspath(source)
+        metrics = DocumentMetrics(label)
+        temp_dir = tempfile.mkdtemp(prefix='mht2pdf_')
+        try:
+            try:
+                html_path = prepare_html(source, profile, metrics, temp_dir)
+                if POSTPROCESS_AVAILABLE:
+                    with metrics.stage('split'):
+                        chunks = split_html_file(html_path, profile.chunk_kb * 1024, temp_dir)
+                else:
+                    print("pikepdf is not installed, rendering without chunks")
+                    chunks = [html_path]
+            except Exception as e:
+                result = ConversionResult(source, None, f"预处理失败: {e}", metrics)
+            else:
+                result = self._render_chunks(source, chunks, profile, metrics)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        metrics.finish('ok' if result.ok else (metrics.status or 'failed'), result.error)
+        if result.ok and self.time_to_first_pdf is None:
+            self.time_to_first_pdf = time.monotonic() - self.created
+        if report is not None:
+            report.add(metrics)
+            if result.ok:
+                report.mark_first_pdf(self.time_to_first_pdf, self.warm_up_seconds)
+        return result
+
+    def _render_chunks(self, source, chunks, profile, metrics):
+        """渲染各段并按顺序合并,各段的阶段耗时累加到 metrics"""
+        if len(chunks) > 1:
+            print(f"Rendering {metrics.source} in {len(chunks)} chunks")
+        chunk_profile = profile.replace(chunk_kb=0, postprocess_pdf=False, thumbnails=None)
+        results = {result.source: result for result in self.convert_many(chunks, chunk_profile)}
+        pdfs = []
+        for index, chunk in enumerate(chunks, 1):
+            result = results[chunk]
+            for name, seconds in result.metrics.seconds.items():
+                metrics.add(name, seconds, result.metrics.bytes.get(name, 0))
+            metrics.add_blocked_urls(result.metrics.blocked_urls)
+            if not result.ok:
+                # 保留超时、崩溃等失败类型
+                metrics.status = result.metrics.status
+                error = result.error if len(chunks) == 1 else f"第 {index}/{len(chunks)} 段: {result.error}"
+                return ConversionResult(source, None, error, metrics)
+            pdfs.append(result.pdf)
+
+        if len(pdfs) == 1:
+            pdf = pdfs[0]
+        else:
+            try:
+                with metrics.stage('merge'):
+                    pdf = merge_pdf_bytes(pdfs)
+            except Exception as e:
+                return ConversionResult(source, None, f"合并分段PDF失败: {e}", metrics)
+        result = ConversionResult(source, pdf, None, metrics)
+        self._add_thumbnails(result, profile)
+
+        postprocessor = self._postprocessor(profile)
+        if postprocessor is not None:
+            try:
+                optimized = postprocessor.submit_bytes(pdf).result()
+            except Exception as e:  # 工作进程异常退出等
+                optimized = (None, PostprocessResult(None, len(pdf), error=str(e)))
+            postprocessor.collect()
+            result = self._apply_postprocess(result, optimized)
+        return result
+
+    def _convert_many_chunked(self, sources, profile, report=None):
+        """HTML可能超过两段的文档逐个分段渲染,其余文档按常规方式并行渲染"""
+        threshold = 2 * profile.chunk_kb * 1024
+        regular = []
+        for source in sources:
+            try:
+                size = len(source) if isinstance(source, (bytes, bytearray, memoryview)) else os.path.getsize(source)
+            except OSError:
+                size = 0  # 由常规流程报告错误
+            if size >= threshold:
+                yield self.convert_chunked(source, profile, report)
+            else:
+                regular.append(source)
+        yield from self.convert_many(regular, profile.replace(chunk_kb=0), report)
+
+    def convert_many(self, sources, profile=None, report=None):
+        """批量转换,最多concurrency个文档同时渲染,按完成顺序产出 ConversionResult
+
+        传入 BatchReport 时会记录每个文档的分阶段耗时和内存采样.
+        profile.chunk_kb 非0时,较大的文档逐个分段渲染(见 convert_chunked),每个文档使用整个页面池.
+        """
+        if (profile or self.profile).chunk_kb:
+            yield from self._convert_many_chunked(sources, profile or self.profile, report)
+            return
+        pending = iter(sources)
+        completed = deque()
+        loop = QEventLoop()
+        in_flight = 0
+        exhausted = False
+        postprocessor = self._postprocessor(profile or self.profile)
+
+        def on_done(result):
+            completed.append(result)
+            loop.quit()
+
+        while True:
+            while not exhausted and in_flight < self.concurrency:
+                try:
+                    source = next(pending)
+                except StopIteration:
+                    exhausted = True
+                    break
+                in_flight += 1
+                self._submit(source, profile, on_done, report)
+
+            if not completed and in_flight:
+                if postprocessor is not None and postprocessor.pending:
+                    # 有后处理任务时定期退出事件循环以取回结果
+                    QTimer.singleShot(50, loop.quit)
+                loop.exec_()
+            elif not completed and postprocessor is not None:
+                postprocessor.wait_any()
+
+            while completed:
+                in_flight -= 1
+                result = completed.popleft()
+                self._observe(result, report)
+                if postprocessor is not None and result.ok:
+                    # 后处理在进程池中进行,期间继续渲染下一个文档
+                    postprocessor.submit_bytes(result.pdf, result)
+                else:
+                    yield result
+
+            if postprocessor is not None:
+                for result, optimized in postprocessor.collect():
+                    yield self._apply_postprocess(result, optimized)
+
+            if exhausted and not in_flight and not (postprocessor is not None and postprocessor.pending):
+                break
+
+    async def convert_async(self, source, profile=None):
+        """异步转换单个文档,返回PDF字节"""
+        result = await self._convert_result_async(source, profile)
+        if not result.ok:
+            raise ConversionError(f"{result.source}: {result.error}")
+        return result.pdf
+
+    async def convert_many_async(self, sources, profile=None, report=None):
+        """异步批量转换,按完成顺序产出 ConversionResult;不进行分段渲染"""
+        running = 0
+
+        async def bounded(source):
+            nonlocal running
+            # 并发数可能被控制器调整,每次启动前按当前值检查
+            while running >= self.concurrency:
+                await asyncio.sleep(self.poll_interval)
+            running += 1
+            try:
+                result = await self._convert_result_async(source, profile, report)
+            finally:
+                running -= 1
+            self._observe(result, report)
+            return result
+
+        tasks = [asyncio.ensure_future(bounded(source)) for source in sources]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _convert_result_async(self, source, profile, report=None):
+        future = asyncio.get_running_loop().create_future()
+
+        def on_done(result):
+            if not future.done():
+                future.set_result(result)
+
+        self._submit(source, profile, on_done, report)
+        # Qt回调在processEvents中执行,与asyncio处于同一线程
+        while not future.done():
+            self._app.processEvents()
+            await asyncio.sleep(self.poll_interval)
+        result = future.result()
+
+        postprocessor = self._postprocessor(profile or self.profile)
+        if postprocessor is not None and result.ok:
+            # 等待后处理期间其他任务继续驱动Qt事件
+            try:
+                optimized = await asyncio.wrap_future(postprocessor.submit_bytes(result.pdf))
+            except Exception as e:  # 工作进程异常退出等
+                optimized = (None, PostprocessResult(None, len(result.pdf), error=str(e)))
+            postprocessor.collect()
+            result = self._apply_postprocess(result, optimized)
+        return result
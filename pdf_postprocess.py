@@ -0,0 +1,271 @@
+"""导出PDF的后处理: 重新压缩流、合并重复的图片/字体对象、可选线性化
+
+Chromium printToPdf 的输出部分流未压缩、同一图片或字体在多页中重复出现,
+且没有线性化.后处理依赖可选的 pikepdf,未安装时 POSTPROCESS_AVAILABLE 为 False,
+后处理直接跳过.PdfPostprocessor 在进程池中运行,与下一个文档的渲染重叠.
+"""
+import io
+import os
+import re
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from mht_output import fsync_file
+
+try:
+    import pikepdf
+except ImportError:  # 可选依赖
+    pikepdf = None
+
+POSTPROCESS_AVAILABLE = pikepdf is not None
+
+# 参与合并的资源类别
+DEDUPE_CATEGORIES = ('/XObject', '/Font')
+
+# 未安装 pikepdf 时按页面对象计数(Chromium输出的页面字典不在对象流中)
+PAGE_OBJECT_PATTERN = re.compile(rb'/Type\s*/Page(?![A-Za-z])')
+
+
+class PostprocessResult:
+    """单个PDF的后处理结果,大小单位为字节"""
+
+    def __init__(self, path, before, after=None, seconds=0.0, deduplicated=0, error=None):
+        self.path = path
+        self.before = before
+        self.after = before if after is None else after
+        self.seconds = seconds
+        self.deduplicated = deduplicated  # 合并的重复对象数
+        self.error = error
+
+    @property
+    def saved(self):
+        return self.before - self.after
+
+
+def object_fingerprint(obj, memo=None):
+    """计算PDF对象(含其引用的对象)内容的摘要,内容相同的对象摘要相同"""
+    if memo is None:
+        memo = {}
+    if isinstance(obj, pikepdf.Object) and obj.is_indirect:
+        key = obj.objgen
+        if key in memo:
+            return memo[key]
+        memo[key] = b'cycle'  # 防止循环引用
+    digest = hashlib.sha1()
+
+    if isinstance(obj, pikepdf.Stream):
+        digest.update(b'stream')
+        digest.update(obj.read_raw_bytes())
+        for name in sorted(obj.keys()):
+            if name != '/Length':
+                digest.update(name.encode('latin1'))
+                digest.update(object_fingerprint(obj[name], memo))
+    elif isinstance(obj, pikepdf.Dictionary):
+        digest.update(b'dict')
+        for name in sorted(obj.keys()):
+            if name != '/Parent':
+                digest.update(name.encode('latin1'))
+                digest.update(object_fingerprint(obj[name], memo))
+    elif isinstance(obj, pikepdf.Array):
+        digest.update(b'array')
+        for item in obj:
+            digest.update(object_fingerprint(item, memo))
+    else:
+        digest.update(repr(obj).encode('utf-8', errors='replace'))
+
+    value = digest.digest()
+    if isinstance(obj, pikepdf.Object) and obj.is_indirect:
+        memo[obj.objgen] = value
+    return value
+
+
+def dedupe_resources(pdf):
+    """让各页引用内容相同的图片和字体时指向同一个对象,返回合并的引用数
+
+    被替换的副本不再被引用,保存时不会写出.
+    """
+    canonical = {}
+    memo = {}
+    replaced = 0
+    for page in pdf.pages:
+        resources = page.obj.get('/Resources')
+        if resources is None:
+            continue
+        for category in DEDUPE_CATEGORIES:
+            entries = resources.get(category)
+            if entries is None:
+                continue
+            for name in list(entries.keys()):
+                obj = entries[name]
+                if not obj.is_indirect:
+                    continue
+                first = canonical.setdefault(object_fingerprint(obj, memo), obj)
+                if first.objgen != obj.objgen:
+                    entries[name] = first
+                    replaced += 1
+    return replaced
+
+
+def optimize_document(pdf, output, linearize=False):
+    """合并重复对象并以压缩的对象流写出到 output(路径或文件对象)"""
+    deduplicated = dedupe_resources(pdf)
+    pdf.remove_unreferenced_resources()
+    pdf.save(output,
+             compress_streams=True,
+             recompress_flate=True,
+             object_stream_mode=pikepdf.ObjectStreamMode.generate,
+             linearize=linearize)
+    return deduplicated
+
+
+def optimize_pdf_file(path, linearize=False):
+    """就地优化PDF文件,结果更小(或要求线性化)时才替换原文件"""
+    before = os.path.getsize(path)
+    if pikepdf is None:
+        return PostprocessResult(path, before, error="未安装 pikepdf")
+
+    start = time.monotonic()
+    part_path = path + '.opt.part'
+    try:
+        with pikepdf.open(path) as pdf:
+            deduplicated = optimize_document(pdf, part_path, linearize)
+        after = os.path.getsize(part_path)
+        if after < before or linearize:
+            fsync_file(part_path)
+            os.replace(part_path, path)
+        else:
+            os.remove(part_path)
+            after = before
+        return PostprocessResult(path, before, after, time.monotonic() - start, deduplicated)
+    except Exception as e:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        return PostprocessResult(path, before, seconds=time.monotonic() - start, error=str(e))
+
+
+def optimize_pdf_bytes(data, linearize=False):
+    """优化内存中的PDF,返回 (PDF字节, PostprocessResult)"""
+    before = len(data)
+    if pikepdf is None:
+        return data, PostprocessResult(None, before, error="未安装 pikepdf")
+
+    start = time.monotonic()
+    try:
+        output = io.BytesIO()
+        with pikepdf.open(io.BytesIO(data)) as pdf:
+            deduplicated = optimize_document(pdf, output, linearize)
+        optimized = output.getvalue()
+        if len(optimized) >= before and not linearize:
+            optimized = data
+        return optimized, PostprocessResult(None, before, len(optimized), time.monotonic() - start, deduplicated)
+    except Exception as e:
+        return data, PostprocessResult(None, before, seconds=time.monotonic() - start, error=str(e))
+
+
+def count_pdf_pages(data):
+    """返回PDF字节的页数"""
+    if pikepdf is not None:
+        with pikepdf.open(io.BytesIO(data)) as pdf:
+            return len(pdf.pages)
+    return len(PAGE_OBJECT_PATTERN.findall(data))
+
+
+def merge_pdf_bytes(parts):
+    """按顺序合并多个PDF(分段渲染的各段),返回合并后的PDF字节;需要 pikepdf"""
+    if pikepdf is None:
+        raise RuntimeError("合并PDF需要安装 pikepdf")
+    sources = [pikepdf.open(io.BytesIO(data)) for data in parts]
+    try:
+        with pikepdf.new() as merged:
+            for pdf in sources:
+                merged.pages.extend(pdf.pages)
+            output = io.BytesIO()
+            merged.save(output, compress_streams=True)
+            return output.getvalue()
+    finally:
+        for pdf in sources:
+            pdf.close()
+
+
+def record_result(metrics, result):
+    """把后处理耗时和前后大小记入 DocumentMetrics"""
+    if metrics is None or result.error:
+        return
+    metrics.add('postprocess', result.seconds)
+    metrics.add_bytes('pdf_before', result.before)
+    metrics.add_bytes('pdf_after', result.after)
+
+
+class PdfPostprocessor:
+    """在进程池中后处理PDF
+
+    submit()/submit_bytes() 立即返回,collect() 取回已完成的结果;
+    所有方法都在调用方线程中使用,结果不通过回调跨线程传递.
+    """
+
+    def __init__(self, workers=1, linearize=False):
+        self.workers = max(1, int(workers))
+        self.linearize = linearize
+        self._executor = None
+        self._pending = []  # [(future, tag, 是否为内存中的PDF)]
+
+    @property
+    def available(self):
+        return POSTPROCESS_AVAILABLE
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def submit(self, path, tag=None):
+        """提交一个PDF文件,tag 随结果一起由 collect() 返回"""
+        future = self._pool().submit(optimize_pdf_file, path, self.linearize)
+        self._pending.append((future, tag, False))
+        return future
+
+    def submit_bytes(self, data, tag=None):
+        """提交内存中的PDF,结果为 (PDF字节, PostprocessResult)"""
+        future = self._pool().submit(optimize_pdf_bytes, data, self.linearize)
+        self._pending.append((future, tag, True))
+        return future
+
+    def collect(self, block=False):
+        """返回已完成的 [(tag, 结果)];block 为 True 时等待全部完成
+
+        submit_bytes() 提交的任务结果为 (PDF字节, PostprocessResult),失败时PDF字节为None.
+        """
+        if block and self._pending:
+            wait([entry[0] for entry in self._pending])
+        done = []
+        remaining = []
+        for entry in self._pending:
+            future, tag, in_memory = entry
+            if not future.done():
+                remaining.append(entry)
+                continue
+            try:
+                result = future.result()
+            except Exception as e:  # 工作进程异常退出等
+                result = PostprocessResult(None, 0, error=str(e))
+                if in_memory:
+                    result = (None, result)
+            done.append((tag, result))
+        self._pending = remaining
+        return done
+
+    def wait_any(self, timeout=None):
+        """等待至少一个任务完成"""
+        if self._pending:
+            wait([entry[0] for entry in self._pending], timeout=timeout, return_when=FIRST_COMPLETED)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._pending = []
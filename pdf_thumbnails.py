@@ -0,0 +1,59 @@
+"""从转换得到的PDF生成页面缩略图(PNG)
+
+缩略图由同一次渲染得到的PDF字节栅格化而来,与PDF的分页和版式完全一致,
+不需要为缩略图再加载和渲染一次文档.依赖可选的 PyMuPDF(fitz),
+未安装时 THUMBNAILS_AVAILABLE 为 False,转换照常进行但不生成缩略图.
+
+PyMuPDF 采用 AGPL-3.0(或 Artifex 商业许可),与本项目的 MIT 许可不同: 这里只在运行时按需导入,
+requirements-optional.txt 默认不安装;分发打包了 PyMuPDF 的程序时需遵守 AGPL 或取得商业许可.
+"""
+try:
+    import fitz
+except ImportError:  # 可选依赖
+    fitz = None
+
+THUMBNAILS_AVAILABLE = fitz is not None
+
+# 缩略图的页面选择
+THUMBNAIL_PAGES = ('first', 'all')
+
+
+class ThumbnailOptions:
+    """缩略图参数
+
+    pages 为 'first'(只生成第一页,文件名为 报告.png)或 'all'(每页一张,报告_p0001.png ...);
+    dpi 为栅格化分辨率,max_size 为长边像素上限(0为不限),两者取较小的缩放比例.
+    """
+
+    def __init__(self, pages='first', dpi=72, max_size=256):
+        if pages not in THUMBNAIL_PAGES:
+            raise ValueError(f"pages 应为 {' 或 '.join(THUMBNAIL_PAGES)}: {pages!r}")
+        self.pages = pages
+        self.dpi = dpi
+        self.max_size = max_size
+
+    def suffix(self, page_number):
+        """相对于PDF文件名(去掉扩展名)的缩略图文件名后缀"""
+        return '.png' if self.pages == 'first' else f'_p{page_number:04d}.png'
+
+    def zoom(self, width, height):
+        """页面尺寸(点)到像素的缩放比例"""
+        zoom = self.dpi / 72
+        if self.max_size:
+            zoom = min(zoom, self.max_size / max(width, height, 1))
+        return zoom
+
+
+def render_thumbnails(pdf, options):
+    """栅格化PDF字节中选中的页面,返回 [(文件名后缀, PNG字节)];未安装 PyMuPDF 时返回空列表"""
+    if fitz is None:
+        return []
+    thumbnails = []
+    with fitz.open(stream=pdf, filetype='pdf') as document:
+        count = 1 if options.pages == 'first' else document.page_count
+        for index in range(min(count, document.page_count)):
+            page = document[index]
+            zoom = options.zoom(page.rect.width, page.rect.height)
+            pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            thumbnails.append((options.suffix(index + 1), pixmap.tobytes('png')))
+    return thumbnails
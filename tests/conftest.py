@@ -0,0 +1,49 @@
+"""测试共用的夹具: 把仓库根目录加入导入路径,生成小型MHT文件"""
+import os
+import sys
+import base64
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BOUNDARY = '----=_NextPart_000_TEST'
+PNG_BYTES = b'\x89PNG\r\n\x1a\n' + b'\x00' * 40
+
+# (Content-Type, Content-Location, 正文);正文为 None 的part是base64编码的PNG
+SAMPLE_PARTS = [
+    ('text/html', 'http://example.com/dir/index.html',
+     '<html><head><link rel="stylesheet" href="css/site.css"></head><body>\n'
+     '<p>检验报告</p><img src="img/a.png"><iframe src="frame.html"></iframe>\n'
+     '<img src="https://cdn.example.org/remote.png"></body></html>'),
+    ('text/css', 'http://example.com/dir/css/site.css', 'body { background: url(bg.png) } @import "more.css";'),
+    ('image/png', 'http://example.com/dir/css/bg.png', None),
+    ('image/png', 'http://example.com/dir/img/a.png', None),
+    ('image/png', 'http://example.com/dir/unused.png', None),
+    ('text/html', 'http://example.com/dir/frame.html', '<html><body><img src="f.png"></body></html>'),
+    ('image/png', 'http://example.com/dir/f.png', None),
+    ('text/css', 'http://example.com/dir/css/more.css', 'p { color: red }'),
+]
+
+# SAMPLE_PARTS 中没有被任何HTML、样式表或框架引用的part
+SAMPLE_UNREFERENCED = [4]
+
+
+def build_mht(parts, boundary=BOUNDARY):
+    """按 SAMPLE_PARTS 的格式生成MHT字节"""
+    png = base64.b64encode(PNG_BYTES).decode('ascii')
+    lines = ['MIME-Version: 1.0', f'Content-Type: multipart/related; boundary="{boundary}"', '']
+    for content_type, location, body in parts:
+        charset = '; charset="utf-8"' if body is not None else ''
+        lines += [f'--{boundary}', f'Content-Type: {content_type}{charset}',
+                  f"Content-Transfer-Encoding: {'8bit' if body is not None else 'base64'}",
+                  f'Content-Location: {location}', '', body if body is not None else png]
+    lines += [f'--{boundary}--', '']
+    return '\r\n'.join(lines).encode('utf-8')
+
+
+@pytest.fixture
+def sample_mht(tmp_path):
+    path = tmp_path / 'report.mht'
+    path.write_bytes(build_mht(SAMPLE_PARTS))
+    return str(path)
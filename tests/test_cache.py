@@ -0,0 +1,51 @@
+import os
+
+from mht_cache import PreprocessCache, cache_key
+
+
+def make_entry(tmp_path, name, size=10):
+    directory = tmp_path / name
+    directory.mkdir()
+    path = directory / 'processed.html'
+    path.write_bytes(b'x' * size)
+    return str(path)
+
+
+def test_cache_key_changes_when_file_changes(tmp_path):
+    path = tmp_path / 'a.mht'
+    path.write_text('one')
+    before = cache_key(str(path))
+    path.write_text('longer')
+    assert cache_key(str(path)) != before
+
+
+def test_get_put_and_lru_eviction(tmp_path):
+    cache = PreprocessCache(max_entries=2)
+    a, b, c = (make_entry(tmp_path, name) for name in 'abc')
+    assert cache.get('a') is None
+    assert cache.put('a', a) == []
+    cache.put('b', b)
+    assert cache.get('a') == a  # a 变为最近使用
+    assert cache.put('c', c) == [b]
+    assert not os.path.exists(os.path.dirname(b))
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_eviction_by_size_keeps_newest_entry(tmp_path):
+    cache = PreprocessCache(max_entries=10, max_bytes=100)
+    small = make_entry(tmp_path, 'small', 50)
+    large = make_entry(tmp_path, 'large', 200)
+    cache.put('small', small)
+    assert cache.put('large', large) == [small]
+    assert cache.get('large') == large
+
+
+def test_missing_files_are_dropped_and_clear_removes_directories(tmp_path):
+    cache = PreprocessCache()
+    a, b = make_entry(tmp_path, 'a'), make_entry(tmp_path, 'b')
+    cache.put('a', a)
+    cache.put('b', b)
+    os.remove(a)
+    assert cache.get('a') is None
+    cache.clear()
+    assert cache.entries == {} and not os.path.exists(os.path.dirname(b))
@@ -0,0 +1,56 @@
+import os
+import re
+
+from mht_chunk import split_html, split_html_file
+
+
+def table_html(rows):
+    body = ''.join(f'<tr><td>{index}</td><td>结果 {index}</td></tr>\n' for index in range(rows))
+    return ('<html><head><style>td { border: 1px solid }</style></head><body><h1>检验记录</h1>\n'
+            f'<table><thead><tr><th>序号</th><th>结果</th></tr></thead><tbody>\n{body}</tbody></table>'
+            '<p>结束</p></body></html>')
+
+
+def row_numbers(html):
+    return [int(number) for number in re.findall(r'<tr><td>(\d+)</td>', html)]
+
+
+def test_short_document_is_not_split():
+    html = table_html(10)
+    assert split_html(html, len(html)) == [html]
+    assert split_html(html, 0) == [html]
+
+
+def test_split_preserves_rows_in_order_and_repeats_header():
+    html = table_html(3000)
+    chunks = split_html(html, 16 * 1024)
+    assert len(chunks) > 3
+    assert [number for chunk in chunks for number in row_numbers(chunk)] == list(range(3000))
+    for chunk in chunks:
+        assert chunk.count('<style>') == 1
+        assert chunk.rstrip().endswith('</html>')
+        if row_numbers(chunk):
+            assert chunk.count('<th>序号</th>') == 1
+            assert chunk.count('<table>') == chunk.count('</table>') == 1
+    assert '<h1>检验记录</h1>' in chunks[0] and '<h1>' not in chunks[1]
+    assert '<p>结束</p>' in chunks[-1]
+
+
+def test_split_html_file_writes_chunks_with_base(tmp_path):
+    source = tmp_path / 'src'
+    source.mkdir()
+    html_path = source / 'processed.html'
+    html_path.write_text(table_html(2000), encoding='utf-8')
+    output = tmp_path / 'chunks'
+    output.mkdir()
+    paths = split_html_file(str(html_path), 16 * 1024, str(output))
+    assert len(paths) > 1
+    assert [os.path.basename(path) for path in paths][:2] == ['chunk_0001.html', 'chunk_0002.html']
+    first = open(paths[0], encoding='utf-8').read()
+    assert '<base href="file:///' in first
+
+
+def test_split_html_file_returns_source_when_not_split(tmp_path):
+    html_path = tmp_path / 'processed.html'
+    html_path.write_text(table_html(5), encoding='utf-8')
+    assert split_html_file(str(html_path), 1024 * 1024) == [str(html_path)]
@@ -0,0 +1,42 @@
+import base64
+import binascii
+
+from mht_parser import decode_part_body, decode_mht_bytes, decode_text, preprocess_mht_file
+
+
+def test_base64_decoding_across_batches():
+    data = bytes(range(256)) * 400
+    encoded = base64.encodebytes(data).decode('ascii')
+    lines = encoded.splitlines()
+    assert bytes(decode_part_body(lines, 0, len(lines), 'base64')) == data
+
+
+def test_base64_with_irregular_line_lengths():
+    data = b'irregular line breaks ' * 50
+    encoded = base64.b64encode(data).decode('ascii')
+    lines = [encoded[index:index + 7] for index in range(0, len(encoded), 7)]
+    assert bytes(decode_part_body(lines, 0, len(lines), 'base64')) == data
+
+
+def test_quoted_printable_and_8bit():
+    text = '检验报告 = 正常'
+    lines = binascii.b2a_qp(text.encode('gbk')).decode('ascii').split('\n')
+    assert decode_text(decode_part_body(lines, 0, len(lines), 'quoted-printable'), 'gbk') == text
+    assert decode_part_body(['a', 'b'], 0, 2, '8bit') == b'a\nb'
+
+
+def test_decode_text_falls_back_to_chinese_encodings():
+    assert decode_text('报告'.encode('gb18030')) == '报告'
+    assert decode_text('报告'.encode('utf-8'), 'no-such-charset') == '报告'
+
+
+def test_decode_mht_bytes_normalizes_newlines():
+    assert decode_mht_bytes('a\r\nb\rc\n'.encode('utf-8')) == 'a\nb\nc\n'
+
+
+def test_only_the_main_html_reports_its_encoding(sample_mht, tmp_path, capsys):
+    assert decode_text('样式'.encode('utf-8'), 'utf-8') == '样式'
+    assert capsys.readouterr().out == ''
+    for large in (False, True):
+        preprocess_mht_file(sample_mht, str(tmp_path), large_file_threshold=1 if large else 0)
+        assert capsys.readouterr().out.count('Successfully decoded HTML with') <= 1
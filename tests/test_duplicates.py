@@ -0,0 +1,24 @@
+import os
+
+from mht_batch import find_duplicates, link_or_copy
+
+
+def test_find_duplicates(tmp_path):
+    contents = {'a.mht': b'same', 'b.mht': b'other', 'c.mht': b'same', 'd.mht': b'diff'}
+    paths = []
+    for name, data in contents.items():
+        (tmp_path / name).write_bytes(data)
+        paths.append(str(tmp_path / name))
+    unique, duplicates = find_duplicates(paths + [paths[0]])
+    assert unique == [paths[0], paths[1], paths[3]]
+    assert duplicates == {paths[0]: [paths[2]]}
+
+
+def test_link_or_copy(tmp_path):
+    source = tmp_path / 'a.pdf'
+    source.write_bytes(b'%PDF-1.4')
+    destination = tmp_path / 'sub' / 'b.pdf'
+    assert link_or_copy(str(source), str(destination)) in ('link', 'copy')
+    assert destination.read_bytes() == b'%PDF-1.4'
+    assert link_or_copy(str(source), str(source)) == 'same'
+    assert sorted(os.listdir(tmp_path / 'sub')) == ['b.pdf']
@@ -0,0 +1,29 @@
+from conftest import SAMPLE_UNREFERENCED
+from mht_inspect import inspect_mht_file, sniff_kind
+
+
+def test_inspect_resolves_relative_and_nested_references(sample_mht):
+    result = inspect_mht_file(sample_mht)
+    assert 'error' not in result
+    assert result['kind'] == 'mht'
+    assert len(result['parts']) == 8
+    assert result['unreferenced'] == SAMPLE_UNREFERENCED
+    assert result['unreferenced_bytes'] == result['parts'][4]['encoded_size']
+    assert result['external_urls'] == ['https://cdn.example.org/remote.png']
+    assert not result['truncated']
+
+
+def test_inspect_detects_truncation(sample_mht, tmp_path):
+    data = open(sample_mht, 'rb').read()
+    truncated = tmp_path / 'truncated.mht'
+    truncated.write_bytes(data[:data.rindex(b'--\r\n') - 5])
+    result = inspect_mht_file(str(truncated))
+    assert 'missing_final_boundary' in result['issues']
+    assert result['truncated']
+
+
+def test_sniff_kind():
+    assert sniff_kind(b'') == 'empty'
+    assert sniff_kind(b'%PDF-1.7') == 'pdf'
+    assert sniff_kind(b'<!DOCTYPE html><html>') == 'html'
+    assert sniff_kind(b'MIME-Version: 1.0\r\nContent-Type: multipart/related') == 'mht'
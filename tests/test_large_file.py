@@ -0,0 +1,36 @@
+import pytest
+
+from mht_parser import preprocess_mht_file, list_mht_parts, MemoryBudgetExceeded
+
+
+def test_large_file_mode_enforces_memory_budget(sample_mht, tmp_path):
+    with pytest.raises(MemoryBudgetExceeded):
+        preprocess_mht_file(sample_mht, str(tmp_path), memory_budget=16, large_file_threshold=1)
+
+
+def test_list_mht_parts(sample_mht):
+    parts = list_mht_parts(sample_mht)
+    assert [part['content_type'] for part in parts][:3] == ['text/html', 'text/css', 'image/png']
+    assert parts[2]['transfer_encoding'] == 'base64'
+    assert parts[3]['location'] == 'http://example.com/dir/img/a.png'
+
+
+NO_BOUNDARY = (b'From: <Saved by Windows Internet Explorer>\r\nSubject: report\r\n\r\n'
+               b'<!DOCTYPE html><html><body><p>\xe6\xa3\x80\xe9\xaa\x8c</p></body></html>\r\n')
+NO_HTML_PART = (b'MIME-Version: 1.0\r\nContent-Type: multipart/related; boundary="----=_NextPart_X"\r\n\r\n'
+                b'------=_NextPart_X\r\nContent-Type: text/plain\r\n\r\n'
+                b'<html><body><p>\xe6\xa3\x80\xe9\xaa\x8c</p></body></html>\r\n'
+                b'------=_NextPart_X--\r\n')
+
+
+@pytest.mark.parametrize('data', [NO_BOUNDARY, NO_HTML_PART], ids=['no-boundary', 'no-html-part'])
+@pytest.mark.parametrize('large', [False, True], ids=['text', 'mmap'])
+def test_falls_back_to_searching_for_html(tmp_path, data, large):
+    path = tmp_path / 'plain.mht'
+    path.write_bytes(data)
+    out = tmp_path / 'out'
+    out.mkdir()
+    html_path = preprocess_mht_file(str(path), str(out), large_file_threshold=1 if large else 0)
+    html = open(html_path, encoding='utf-8').read()
+    assert '<p>检验</p>' in html
+    assert '_NextPart' not in html and 'Saved by' not in html
@@ -0,0 +1,87 @@
+import os
+import time
+
+import pytest
+
+from mht_metrics import BatchReport, DocumentMetrics, percentile, ordered_stages
+
+
+def test_percentile_nearest_rank():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([3, 1, 2], 0.5) == 2
+    assert percentile(list(range(1, 101)), 0.95) == 95
+
+
+def test_nested_stages_are_not_counted_twice():
+    metrics = DocumentMetrics('a.mht')
+    start = time.monotonic()
+    with metrics.stage('parse'):
+        time.sleep(0.02)
+        with metrics.stage('images', 100):
+            time.sleep(0.02)
+    elapsed = time.monotonic() - start
+    assert metrics.seconds['images'] >= 0.02
+    assert metrics.seconds['parse'] + metrics.seconds['images'] == pytest.approx(elapsed, abs=0.005)
+    assert metrics.bytes == {'images': 100}
+
+
+def test_begin_end_accumulate_and_ignore_unopened_stage():
+    metrics = DocumentMetrics('a.mht')
+    metrics.end('print')
+    for _ in range(2):
+        metrics.begin('load')
+        metrics.end('load', 10)
+    assert set(metrics.seconds) == {'load'}
+    assert metrics.bytes['load'] == 20
+
+
+def test_to_dict_round_trip():
+    metrics = DocumentMetrics('a.mht')
+    metrics.add('load', 1.5, 42)
+    metrics.add_blocked_urls(['http://tracker.example/x.gif'])
+    metrics.finish('failed', "页面加载失败")
+    restored = DocumentMetrics.from_dict(metrics.to_dict())
+    assert restored.to_dict() == metrics.to_dict()
+
+
+def test_ordered_stages():
+    assert ordered_stages({'zzz', 'print', 'read'}) == ['read', 'print', 'zzz']
+
+
+def make_report():
+    report = BatchReport()
+    for index, status in enumerate(['ok', 'ok', 'timeout', None]):
+        metrics = DocumentMetrics(f'{index}.mht')
+        metrics.add('load', index + 1.0)
+        metrics.add_bytes('read', 1000)
+        if status:
+            metrics.finish(status)
+        report.add(metrics)
+    report.finish()
+    return report
+
+
+def test_summary():
+    summary = make_report().summary()
+    assert summary['documents'] == 4
+    assert summary['statuses'] == {'ok': 2, 'timeout': 1, None: 1}
+    assert summary['input_bytes'] == 4000
+    assert summary['stages']['load']['sum'] == pytest.approx(10.0)
+    assert summary['stages']['load']['p50'] == pytest.approx(2.0)
+    assert summary['stages']['load']['max'] == pytest.approx(4.0)
+
+
+def test_prometheus_labels_missing_status_as_unknown():
+    lines = make_report().prometheus_text().splitlines()
+    documents = sorted(line for line in lines if line.startswith('mht2pdf_batch_documents{'))
+    assert documents == ['mht2pdf_batch_documents{status="ok"} 2',
+                         'mht2pdf_batch_documents{status="timeout"} 1',
+                         'mht2pdf_batch_documents{status="unknown"} 1']
+    assert 'None' not in '\n'.join(lines)
+
+
+def test_write_all(tmp_path):
+    paths = make_report().write_all(str(tmp_path), 'batch')
+    assert [os.path.basename(path) for path in paths] == ['batch.json', 'batch.csv', 'mht2pdf.prom']
+    header = open(paths[1], encoding='utf-8').readline()
+    assert header.startswith('source,status,total_seconds,load_seconds')
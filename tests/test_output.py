@@ -0,0 +1,72 @@
+import os
+import pytest
+
+from mht_output import (PART_SUFFIX, write_output, validate_pdf, resolve_output_paths,
+                        OutputCommitter, part_path_for)
+
+PDF = b'%PDF-1.4\n1 0 obj\n<<>>\nendobj\ntrailer\n<<>>\n%%EOF\n'
+
+
+def leftover_parts(directory):
+    return [name for name in os.listdir(directory) if name.endswith(PART_SUFFIX)]
+
+
+def test_write_output_is_atomic(tmp_path):
+    target = tmp_path / 'sub' / 'a.pdf'
+    assert write_output(str(target), PDF) == str(target)
+    assert target.read_bytes() == PDF
+    assert leftover_parts(target.parent) == []
+
+
+@pytest.mark.parametrize('data, problem', [
+    (b'', "PDF文件为空"),
+    (b'<html>', "缺少PDF文件头"),
+    (PDF[:-8], "缺少PDF结尾标记"),
+])
+def test_invalid_pdf_is_rejected_and_existing_file_kept(tmp_path, data, problem):
+    target = tmp_path / 'a.pdf'
+    target.write_bytes(PDF)
+    with pytest.raises(ValueError, match=problem):
+        write_output(str(target), data)
+    assert target.read_bytes() == PDF
+    assert leftover_parts(tmp_path) == []
+
+
+def test_part_paths_are_unique_and_beside_target(tmp_path):
+    target = str(tmp_path / 'a.pdf')
+    first, second = part_path_for(target), part_path_for(target)
+    assert first != second
+    assert os.path.dirname(first) == str(tmp_path) and first.endswith(PART_SUFFIX)
+
+
+def test_resolve_output_paths_renames_collisions():
+    def output(source):
+        return os.path.splitext(source)[0] + '.pdf'
+    sources = [os.path.join('d', 'a.mhtml'), os.path.join('d', 'a.mht'), os.path.join('d', 'b.mht')]
+    resolved = resolve_output_paths(sources, output)
+    assert resolved[os.path.join('d', 'a.mht')] == os.path.join('d', 'a.pdf')
+    assert resolved[os.path.join('d', 'a.mhtml')] == os.path.join('d', 'a_mhtml.pdf')
+    assert resolved[os.path.join('d', 'b.mht')] == os.path.join('d', 'b.pdf')
+    assert resolve_output_paths(list(reversed(sources)), output) == resolved
+
+
+def test_committer_deletes_sources_only_after_checkpoint(tmp_path):
+    committer = OutputCommitter(checkpoint_every=2)
+    sources = []
+    for name in ('a', 'b', 'c'):
+        source = tmp_path / f'{name}.mht'
+        source.write_text('mht')
+        sources.append(str(source))
+    good = tmp_path / 'a.pdf'
+    part = committer.part_path(str(good))
+    with open(part, 'wb') as f:
+        f.write(PDF)
+    committer.commit(part, str(good))
+    assert validate_pdf(str(good)) is None
+
+    assert committer.defer_delete(sources[0], str(good)) == []
+    assert os.path.exists(sources[0])
+    # 第二个输出不存在: 检查点只删除已确认输出的原始文件
+    assert committer.defer_delete(sources[1], str(tmp_path / 'missing.pdf')) == [sources[0]]
+    assert not os.path.exists(sources[0]) and os.path.exists(sources[1])
+    assert committer.errors and committer.errors[0][0] == sources[1]
@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+from mht_queue import Job, JobQueue, gui_queue_path, remove_queue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    with JobQueue(str(tmp_path / 'jobs.sqlite'), max_attempts=2) as queue:
+        yield queue
+
+
+def test_enqueue_is_idempotent(queue):
+    assert queue.enqueue(['a.mht', 'b.mht']) == 2
+    assert queue.enqueue(['a.mht', 'c.mht']) == 1
+    assert queue.counts()['pending'] == 3
+
+
+def test_claim_and_complete(queue):
+    queue.enqueue(['a.mht', 'b.mht'])
+    jobs = queue.claim('w1', limit=5)
+    assert [job.source for job in jobs] == ['a.mht', 'b.mht']
+    assert jobs[0].attempts == 1
+    assert queue.claim('w2') == []
+    assert queue.complete(jobs[0], 1.5)
+    # 只有领取任务的worker能完成它
+    assert not queue.complete(Job(jobs[1].id, 'b.mht', None, 1, 'w2'))
+    assert queue.states(['a.mht', 'b.mht']) == {'a.mht': 'done', 'b.mht': 'running'}
+
+
+def test_failures_retry_with_backoff_then_die(queue):
+    queue.enqueue(['a.mht'])
+    job = queue.claim('w1')[0]
+    assert queue.fail(job, "页面加载失败") == 'pending'
+    assert queue.claim('w1') == []  # 退避期间不会被领取
+    source, wait = queue.next_retry()
+    assert source == 'a.mht' and wait > 0
+    job = queue.claim_source('w1', 'a.mht')
+    assert job.attempts == 2
+    assert queue.fail(job, "页面加载失败") == 'dead'
+    assert queue.wait_seconds() is None
+    assert queue.retry_dead(['a.mht']) == 1
+    assert queue.states(['a.mht']) == {'a.mht': 'pending'}
+
+
+def test_permanent_errors_go_straight_to_dead(queue):
+    queue.enqueue(['a.mht'])
+    job = queue.claim('w1')[0]
+    assert queue.fail(job, "预处理失败: 格式错误") == 'dead'
+
+
+def test_release_does_not_count_as_attempt(queue):
+    queue.enqueue(['a.mht'])
+    queue.release(queue.claim('w1')[0])
+    assert queue.claim('w2')[0].attempts == 1
+
+
+def test_claim_source_skips_finished_and_foreign_jobs(queue):
+    queue.enqueue(['a.mht', 'b.mht'])
+    queue.complete(queue.claim_source('w1', 'a.mht'))
+    assert queue.claim_source('w1', 'a.mht') is None
+    assert queue.claim_source('w1', 'b.mht') is not None
+    assert queue.claim_source('w2', 'b.mht') is None
+    assert queue.claim_source('w1', 'b.mht') is not None  # 同一worker崩溃后重新领取
+
+
+def test_gui_queue_lives_outside_output_dir(tmp_path):
+    output = tmp_path / 'out'
+    path = gui_queue_path(str(output), str(tmp_path / 'queues'))
+    assert not path.startswith(str(output))
+    assert gui_queue_path(str(output), str(tmp_path / 'queues')) == path
+    with JobQueue(path) as queue:
+        queue.enqueue(['a.mht'])
+    remove_queue(path)
+    assert os.listdir(tmp_path / 'queues') == []
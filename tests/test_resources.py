@@ -0,0 +1,39 @@
+import os
+import re
+
+import pytest
+
+from conftest import PNG_BYTES
+from mht_parser import preprocess_mht_file, ENHANCED_CSS
+
+EXPECTED_FILES = ['a.png', 'bg.png', 'f.png', 'frame.html', 'more.css', 'processed.html', 'site.css']
+
+
+def preprocess(path, temp_dir, large):
+    return preprocess_mht_file(path, str(temp_dir), large_file_threshold=1 if large else 0)
+
+
+@pytest.mark.parametrize('large', [False, True], ids=['text', 'mmap'])
+def test_preprocess_saves_only_referenced_resources(sample_mht, tmp_path, large):
+    out = tmp_path / 'out'
+    out.mkdir()
+    html_path = preprocess(sample_mht, out, large)
+    assert html_path == str(out / 'processed.html')
+    assert sorted(os.listdir(out)) == EXPECTED_FILES
+    assert (out / 'a.png').read_bytes() == PNG_BYTES
+
+
+@pytest.mark.parametrize('large', [False, True], ids=['text', 'mmap'])
+def test_preprocess_rewrites_references_to_local_files(sample_mht, tmp_path, large):
+    out = tmp_path / 'out'
+    out.mkdir()
+    html = open(preprocess(sample_mht, out, large), encoding='utf-8').read()
+    assert '检验报告' in html
+    assert ENHANCED_CSS.strip()[:40] in html
+    for name in ('site.css', 'a.png', 'frame.html'):
+        assert re.search(rf'="file:///[^"]*{name}"', html)
+    # 远程资源不在MHT中,保持原样
+    assert 'https://cdn.example.org/remote.png' in html
+    css = (out / 'site.css').read_text(encoding='utf-8')
+    assert 'bg.png' in css and 'file:///' in css
+    assert 'file:///' in (out / 'frame.html').read_text(encoding='utf-8')
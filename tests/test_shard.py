@@ -0,0 +1,94 @@
+import os
+import json
+from argparse import Namespace
+
+import pytest
+
+import htm2pdf
+from mht_batch import parse_shard, shard_key, select_shard
+from mht_metrics import BatchReport, DocumentMetrics
+
+
+def test_parse_shard():
+    assert parse_shard('2/8') == (2, 8)
+    for text in ('0/8', '9/8', '2', 'a/b', '1/0'):
+        with pytest.raises(ValueError):
+            parse_shard(text)
+
+
+def test_shards_partition_files_independent_of_mount_point(tmp_path):
+    paths = [os.path.join(str(tmp_path), 'archive', f'dir{index % 7}', f'{index}.mht') for index in range(200)]
+    shards = [select_shard(paths, str(tmp_path / 'archive'), index, 4) for index in range(1, 5)]
+    assert sorted(path for shard in shards for path in shard) == sorted(paths)
+    assert all(shards)
+    # 同一相对路径在另一台机器的不同挂载位置上分到同一分片
+    moved = [path.replace(str(tmp_path), os.path.join(str(tmp_path), 'mnt')) for path in shards[1]]
+    assert select_shard(moved, os.path.join(str(tmp_path), 'mnt', 'archive'), 2, 4) == moved
+    assert shard_key(paths[0], str(tmp_path / 'archive')) == 'dir0/0.mht'
+
+
+def plan_args(output=None, base=None):
+    return Namespace(output=output, base=base)
+
+
+def test_plan_outputs_needs_base_only_when_mirroring(tmp_path, monkeypatch):
+    sources = [str(tmp_path / 'a' / 'x.mht'), str(tmp_path / 'b' / 'y.mht')]
+    assert htm2pdf.plan_outputs(plan_args(str(tmp_path / 'out')), sources) == (
+        None, {sources[0]: str(tmp_path / 'out' / 'x.pdf'), sources[1]: str(tmp_path / 'out' / 'y.pdf')})
+    base, output_paths = htm2pdf.plan_outputs(plan_args(str(tmp_path / 'out')), sources, mirror=True)
+    assert base == str(tmp_path)
+    assert output_paths[sources[1]] == str(tmp_path / 'out' / 'b' / 'y.pdf')
+
+    # 不同驱动器上的文件没有公共父目录
+    def no_common_path(paths):
+        raise ValueError("Paths don't have the same drive")
+    monkeypatch.setattr(os.path, 'commonpath', no_common_path)
+    htm2pdf.plan_outputs(plan_args(str(tmp_path / 'out')), sources)
+    with pytest.raises(ValueError, match='--base'):
+        htm2pdf.plan_outputs(plan_args(str(tmp_path / 'out')), sources, mirror=True)
+
+
+def test_plan_outputs_rejects_sources_outside_base(tmp_path):
+    sources = [str(tmp_path / 'a' / 'x.mht'), str(tmp_path / 'ab' / 'y.mht')]
+    with pytest.raises(ValueError, match='不在基础目录'):
+        htm2pdf.plan_outputs(plan_args(str(tmp_path / 'out'), str(tmp_path / 'a')), sources)
+    base, output_paths = htm2pdf.plan_outputs(plan_args(str(tmp_path / 'out'), str(tmp_path)), sources)
+    assert output_paths[sources[1]] == str(tmp_path / 'out' / 'ab' / 'y.pdf')
+
+
+def test_queue_add_reports_sources_outside_base(tmp_path, capsys):
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'a' / 'x.mht').write_bytes(b'')
+    queue = str(tmp_path / 'queue.sqlite')
+    assert htm2pdf.main(['queue', 'add', queue, str(tmp_path / 'a'), '--base', str(tmp_path / 'b')]) == 2
+    assert '不在基础目录' in capsys.readouterr().err
+
+
+def shard_report(directory, index, count, sources, seconds):
+    report = BatchReport()
+    report.shards = [f'{index}/{count}']
+    for source in sources:
+        metrics = DocumentMetrics(source)
+        metrics.add('load', seconds)
+        metrics.finish('ok')
+        report.add(metrics)
+    report.write_all(str(directory), f'mht2pdf_shard_{index}_of_{count}', f'mht2pdf_shard_{index}_of_{count}.prom')
+
+
+def test_merge_reports(tmp_path):
+    shard_report(tmp_path, 1, 2, ['a.mht', 'b.mht'], 1.0)
+    shard_report(tmp_path, 2, 2, ['c.mht'], 3.0)
+    assert htm2pdf.main(['merge-reports', str(tmp_path)]) == 0
+    with open(tmp_path / 'mht2pdf_merged.json', encoding='utf-8') as f:
+        merged = json.load(f)
+    assert merged['documents'] == 3
+    assert merged['statuses'] == {'ok': 3}
+    assert sorted(merged['shards']) == ['1/2', '2/2']
+    assert merged['stages']['load']['sum'] == pytest.approx(5.0)
+    assert (tmp_path / 'mht2pdf_merged.csv').exists()
+
+
+def test_merge_reports_reports_missing_shards(tmp_path):
+    shard_report(tmp_path, 1, 3, ['a.mht'], 1.0)
+    shard_report(tmp_path, 3, 3, ['c.mht'], 1.0)
+    assert htm2pdf.main(['merge-reports', str(tmp_path)]) == 1
@@ -0,0 +1,28 @@
+from types import SimpleNamespace
+
+import pytest
+
+from mht_output import write_result
+from pdf_thumbnails import ThumbnailOptions
+
+PDF = b'%PDF-1.4\n1 0 obj\n<<>>\nendobj\ntrailer\n<<>>\n%%EOF\n'
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 16 + b'IEND\xaeB`\x82'
+
+
+def test_thumbnail_options():
+    assert ThumbnailOptions().suffix(1) == '.png'
+    assert ThumbnailOptions('all').suffix(12) == '_p0012.png'
+    # A4(595x842点)在 72 dpi 下受长边 256 像素限制
+    assert ThumbnailOptions(dpi=72, max_size=256).zoom(595, 842) == pytest.approx(256 / 842)
+    assert ThumbnailOptions(dpi=144, max_size=0).zoom(595, 842) == 2.0
+    with pytest.raises(ValueError):
+        ThumbnailOptions('some')
+
+
+def test_write_result_writes_thumbnails(tmp_path):
+    result = SimpleNamespace(pdf=PDF, thumbnails=[('.png', PNG)])
+    pdf_path = str(tmp_path / 'report.pdf')
+    assert write_result(pdf_path, result) == [pdf_path, str(tmp_path / 'report.png')]
+    truncated = SimpleNamespace(pdf=PDF, thumbnails=[('.png', PNG[:-8])])
+    with pytest.raises(ValueError):
+        write_result(str(tmp_path / 'other.pdf'), truncated)